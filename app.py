@@ -1,9 +1,26 @@
-from fastapi import FastAPI, File, UploadFile, HTTPException, BackgroundTasks
-from fastapi.responses import FileResponse
+from fastapi import FastAPI, File, Request, UploadFile, HTTPException
+from fastapi.responses import FileResponse, JSONResponse, Response, StreamingResponse
 from fastapi.middleware.cors import CORSMiddleware
-import shutil
+from converter import ConversionError, ConversionTimeout, PageLimitExceeded
+from result_cache import ResultCache
+from page_cache import PageCache
+from metrics import REQUEST_BUCKETS, Registry
+from worker_pool import ConversionPool, PoolFull
+from jobs import FINISHED, JobStore
+from documents import DocumentStore
+from preview import MEDIA_TYPES, PREVIEW_FORMATS
+from profiling import ProfileStore
+from batch import BatchError, BatchTooLarge, ZipStream, is_pdf_name, output_names, unpack_zip
+from urllib.parse import quote
+import asyncio
+import base64
+import fitz  # PyMuPDF
+import hmac
+import json
 import os
-from converter import PDFDarkThemeConverter
+import random
+import sqlite3
+import time
 
 from fastapi.staticfiles import StaticFiles
 
@@ -18,66 +35,610 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-UPLOAD_DIR = "uploads"
-OUTPUT_DIR = "outputs"
-os.makedirs(UPLOAD_DIR, exist_ok=True)
-os.makedirs(OUTPUT_DIR, exist_ok=True)
-
 app.mount("/static", StaticFiles(directory="static"), name="static")
 
-converter = PDFDarkThemeConverter()
+# Prometheus metrics of this web worker (GET /metrics), including what its
+# conversion pool's processes report back
+registry = Registry()
+request_seconds = registry.histogram(
+    "nightowl_http_request_seconds", "HTTP request latency", ("method", "route", "status"),
+    buckets=REQUEST_BUCKETS)
+
+@app.middleware("http")
+async def record_latency(request: Request, call_next):
+    start = time.perf_counter()
+    response = await call_next(request)
+    # The route template, not the path - one series per endpoint, not per job id
+    route = request.scope.get("route")
+    request_seconds.observe(time.perf_counter() - start, method=request.method,
+                            route=route.path if route else "unmatched", status=response.status_code)
+    return response
+
+# Conversions run in a bounded process pool, each process with its own
+# converter - the event loop (and /health) stays responsive meanwhile
+pool = ConversionPool(
+    {
+        # fast / balanced / smallest, or auto (fast for large files) - see bench_save.py
+        "save_profile": os.environ.get("SAVE_PROFILE", "auto"),
+        # Runaway documents are refused / stopped
+        "max_pages": int(os.environ.get("MAX_PAGES", "2000")),
+        "time_limit": float(os.environ.get("CONVERT_TIME_LIMIT", "300")),
+        # Long documents are converted this many pages at a time, so a
+        # worker's memory stays bounded by the window (0 = in one go)
+        "window_pages": int(os.environ.get("CONVERT_WINDOW_PAGES", "100")) or None,
+        # Optional: converted pages by fingerprint, so new versions of a
+        # document only convert the pages that changed
+        "page_cache_dir": os.environ.get("PAGE_CACHE_DIR"),
+        "page_cache_bytes": int(os.environ.get("PAGE_CACHE_MB", "200")) * 1024 * 1024,
+    },
+    workers=int(os.environ.get("CONVERT_WORKERS", "1")),
+    queue_size=int(os.environ.get("CONVERT_QUEUE", "4")),
+    metrics=registry,
+)
+
+# Converted PDFs by SHA-256 of input + settings, shared by all workers
+result_cache = ResultCache(
+    os.environ.get("RESULT_CACHE_DIR", "cache"),
+    max_bytes=int(os.environ.get("RESULT_CACHE_MB", "200")) * 1024 * 1024,
+    max_entries=int(os.environ.get("RESULT_CACHE_ENTRIES", "500")),
+)
+
+# Asynchronous conversion jobs (POST /jobs), kept on disk for JOB_TTL seconds
+jobs = JobStore(
+    os.environ.get("JOBS_DIR", "jobs"),
+    ttl=int(os.environ.get("JOB_TTL", "3600")),
+)
+
+# Uploads are read into memory (Starlette spools parts over 1 MB to an
+# anonymous temp file while parsing); anything bigger than this is refused
+MAX_UPLOAD_BYTES = int(os.environ.get("MAX_UPLOAD_MB", "100")) * 1024 * 1024
+UPLOAD_CHUNK = 1024 * 1024
+
+# Documents uploaded for page-by-page viewing (POST /documents), kept
+# DOCUMENT_TTL seconds after their last use
+documents = DocumentStore(
+    os.environ.get("DOCUMENTS_DIR", "documents"),
+    ttl=int(os.environ.get("DOCUMENT_TTL", "3600")),
+)
+PAGE_DPI_RANGE = (36, 300)
+
+# Thumbnails (POST /preview) by SHA-256 of input + settings + preview
+# options, so repeat previews of a file cost one lookup
+preview_cache = ResultCache(
+    os.environ.get("PREVIEW_CACHE_DIR", os.path.join("cache", "previews")),
+    max_bytes=int(os.environ.get("PREVIEW_CACHE_MB", "50")) * 1024 * 1024,
+    max_entries=5000,
+    suffix=".json",
+)
+PREVIEW_MAX_PAGES = 12
+PREVIEW_WIDTH_RANGE = (64, 800)
+
+# Profiled conversions (cProfile + tracemalloc, see profiling.py), kept
+# for GET /admin/profiles. A conversion is profiled when an admin asks
+# for it (X-Profile: 1 or ?profile=true, with X-Admin-Token) or, for
+# PROFILE_SAMPLE_RATE of the uncached conversions, at random. Profiling
+# slows a conversion down, hence the token; without ADMIN_TOKEN the
+# admin endpoints do not exist.
+profiles = ProfileStore(
+    os.environ.get("PROFILES_DIR", "profiles"),
+    max_profiles=int(os.environ.get("PROFILE_MAX", "50")),
+)
+ADMIN_TOKEN = os.environ.get("ADMIN_TOKEN")
+PROFILE_SAMPLE_RATE = float(os.environ.get("PROFILE_SAMPLE_RATE", "0"))
+
+# Batches (POST /convert/batch): at most BATCH_MAX_FILES PDFs and
+# BATCH_MAX_MB in all, uploaded one by one or as one ZIP
+BATCH_MAX_FILES = int(os.environ.get("BATCH_MAX_FILES", "100"))
+BATCH_MAX_BYTES = int(os.environ.get("BATCH_MAX_MB", "200")) * 1024 * 1024
+# How long a batch entry waits before asking a full pool again
+BATCH_RETRY_SECONDS = 0.25
+
+# HTTP status for jobs that failed with these converter errors
+JOB_ERROR_STATUS = {"PageLimitExceeded": 413, "ConversionTimeout": 504, "ConversionError": 422}
+
+def attachment_headers(filename: str) -> dict:
+    """Content-Disposition header for a download, RFC 5987-encoded if needed."""
+    quoted = quote(filename)
+    if quoted != filename:
+        return {"Content-Disposition": f"attachment; filename*=utf-8''{quoted}"}
+    return {"Content-Disposition": f'attachment; filename="{filename}"'}
+
+async def read_upload(file: UploadFile, limit: int = None) -> bytearray:
+    """
+    Read an upload into one in-memory buffer, in chunks, answering 413 as
+    soon as it grows past limit (MAX_UPLOAD_BYTES by default). Nothing is
+    written under the client's file name - concurrent uploads of
+    "lecture.pdf" never meet.
+    """
+    limit = limit or MAX_UPLOAD_BYTES
+    if file.size is not None and file.size > limit:
+        raise HTTPException(status_code=413, detail=f"File is larger than {limit // (1024 * 1024)} MB")
+    buffer = bytearray()
+    while True:
+        chunk = await file.read(UPLOAD_CHUNK)
+        if not chunk:
+            break
+        buffer += chunk
+        if len(buffer) > limit:
+            raise HTTPException(status_code=413, detail=f"File is larger than {limit // (1024 * 1024)} MB")
+    return buffer
+
+def is_admin(request: Request) -> bool:
+    token = request.headers.get("X-Admin-Token")
+    return bool(ADMIN_TOKEN) and token is not None and hmac.compare_digest(token, ADMIN_TOKEN)
+
+def require_admin(request: Request):
+    if not ADMIN_TOKEN:
+        raise HTTPException(status_code=404, detail="Not Found")
+    if not is_admin(request):
+        raise HTTPException(status_code=403, detail="Missing or wrong X-Admin-Token")
+
+def conversion_error(e: Exception) -> HTTPException:
+    """The HTTP error to answer a failed (or refused) conversion with."""
+    if isinstance(e, HTTPException):
+        return e
+    if isinstance(e, PoolFull):
+        return HTTPException(status_code=503, detail=str(e), headers={"Retry-After": str(e.retry_after)})
+    if isinstance(e, PageLimitExceeded):
+        return HTTPException(status_code=413, detail=str(e))
+    if isinstance(e, ConversionTimeout):
+        return HTTPException(status_code=504, detail=str(e))
+    if isinstance(e, ConversionError):
+        return HTTPException(status_code=422, detail=str(e))
+    return HTTPException(status_code=500, detail=str(e))
+
+def read_cached(path):
+    """The bytes of a cache file, or None if it was evicted since the lookup."""
+    try:
+        with open(path, "rb") as f:
+            return f.read()
+    except OSError:
+        return None
 
 @app.post("/convert")
-async def convert_pdf(file: UploadFile = File(...), background_tasks: BackgroundTasks = None):
+async def convert_pdf(request: Request, file: UploadFile = File(...), profile: bool = False):
     if not file.filename.endswith(".pdf"):
         raise HTTPException(status_code=400, detail="File must be a PDF")
     
-    input_path = os.path.join(UPLOAD_DIR, file.filename)
     output_filename = f"dark_{file.filename}"
-    output_path = os.path.join(OUTPUT_DIR, output_filename)
     
+    # Profile on request: admins only, and past the result cache - a cached
+    # answer would say nothing about the conversion
+    requested = profile or request.headers.get("X-Profile", "").lower() in ("1", "true")
+    if requested:
+        require_admin(request)
+
+    # Convert entirely in memory - no uploads/ or outputs/ round trip
+    data = await read_upload(file)
+
+    # Same file with the same settings converted before: send it as is
+    key = result_cache.key(data, pool.settings())
+    cached = None if requested else result_cache.get(key)
+    # Read now: the file may be evicted before a FileResponse got to it
+    output = read_cached(cached) if cached else None
+    if output is not None:
+        return Response(
+            content=output,
+            media_type="application/pdf",
+            headers=attachment_headers(output_filename)
+        )
+
+    profile_id = None
+    try:
+        if requested or random.random() < PROFILE_SAMPLE_RATE:
+            trigger = "request" if requested else "sample"
+            (output, profile_id), stats = await pool.wait(pool.submit_profiled(profiles, data, trigger))
+        else:
+            output, stats = await pool.convert(data)
+    except Exception as e:
+        raise conversion_error(e)
     try:
-        # Save uploaded file
-        with open(input_path, "wb") as buffer:
-            shutil.copyfileobj(file.file, buffer)
-            
-        # Convert PDF
-        converter.convert(input_path, output_path)
-        
-        # Clean up files after response is sent
-        # This prevents disk space issues on Render.com
-        def cleanup():
+        result_cache.put(key, output)
+    except (OSError, sqlite3.Error):
+        # A full disk or a busy index must not fail the conversion itself
+        pass
+    
+    # Return the converted file
+    headers = attachment_headers(output_filename)
+    headers["X-Page-Cache-Hits"] = f"{stats.get('page_cache_hits', 0)}/{stats.get('pages', 0)}"
+    headers["X-Page-Cache-Seconds-Saved"] = f"{stats.get('seconds_saved', 0.0):.3f}"
+    if profile_id and requested:
+        headers["X-Profile-Id"] = profile_id
+    return Response(
+        content=output,
+        media_type="application/pdf",
+        headers=headers
+    )
+
+@app.post("/convert/batch")
+async def convert_batch(files: list[UploadFile] = File(...)):
+    """
+    Convert several PDFs - uploaded as several files, or as one ZIP - and
+    stream back a ZIP of the converted ones. Entries are converted side by
+    side, one per pool worker, and each goes out as soon as it is done;
+    manifest.json, last, says what became of every entry. A file that
+    fails only fails its own entry.
+    """
+    if len(files) == 1 and files[0].filename.lower().endswith(".zip"):
+        data = await read_upload(files[0], BATCH_MAX_BYTES)
+        try:
+            entries = unpack_zip(data, BATCH_MAX_FILES, MAX_UPLOAD_BYTES, BATCH_MAX_BYTES)
+        except BatchError as e:
+            raise HTTPException(status_code=413 if isinstance(e, BatchTooLarge) else 400, detail=str(e))
+        archive_name = f"dark_{files[0].filename}"
+    else:
+        if len(files) > BATCH_MAX_FILES:
+            raise HTTPException(status_code=413, detail=f"More than {BATCH_MAX_FILES} files")
+        entries = []
+        total = 0
+        for file in files:
+            if not is_pdf_name(file.filename):
+                entries.append([file.filename, None, "File must be a PDF"])
+                continue
             try:
-                if os.path.exists(input_path):
-                    os.remove(input_path)
-                if os.path.exists(output_path):
-                    os.remove(output_path)
-            except:
-                pass
-        
-        # Schedule cleanup after response
-        if background_tasks:
-            background_tasks.add_task(cleanup)
-        
-        # Return the converted file
-        return FileResponse(
-            output_path, 
-            media_type="application/pdf", 
-            filename=output_filename
-        )
-        
+                data = await read_upload(file)
+            except HTTPException as e:
+                entries.append([file.filename, None, e.detail])
+                continue
+            total += len(data)
+            if total > BATCH_MAX_BYTES:
+                raise HTTPException(status_code=413, detail=f"Batch is larger than {BATCH_MAX_BYTES // (1024 * 1024)} MB")
+            entries.append([file.filename, data, None])
+        archive_name = "dark_batch.zip"
+    return StreamingResponse(
+        stream_batch(entries),
+        media_type="application/zip",
+        headers=attachment_headers(archive_name)
+    )
+
+async def stream_batch(entries):
+    """
+    The batch's ZIP, piece by piece. entries are [name, data, error]
+    lists, where data may also be a function that reads the bytes (ZIP
+    entries, see batch.unpack_zip) - called only when the entry is
+    scheduled. Keeps one entry per pool worker in flight (single
+    conversions still find room in the pool's queue) and cancels what is
+    left if the client goes away.
+    """
+    start = time.monotonic()
+    archive = ZipStream()
+    names = output_names([name for name, _data, _error in entries])
+    manifest = [{"name": name, "output": None, "status": "failed", "error": error}
+                for name, _data, error in entries]
+    waiting = [index for index, (_name, data, _error) in enumerate(entries) if data is not None]
+    settings = pool.settings()
+    running = {}
+    try:
+        while waiting or running:
+            while waiting and len(running) < max(1, pool.workers):
+                index = waiting.pop(0)
+                data, entries[index][1] = entries[index][1], None
+                if callable(data):
+                    try:
+                        data = data()
+                    except BatchError as e:
+                        manifest[index]["error"] = str(e)
+                        continue
+                running[asyncio.ensure_future(convert_batch_entry(data, settings))] = index
+            if not running:
+                continue
+            done, _ = await asyncio.wait(running, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                index = running.pop(task)
+                try:
+                    output, stats, cached = task.result()
+                except Exception as e:
+                    manifest[index]["error"] = conversion_error(e).detail
+                    continue
+                manifest[index].update(output=names[index], status="converted", cached=cached,
+                                       pages=stats.get("pages"), seconds=round(stats.get("job_seconds", 0.0), 3))
+                yield archive.add(names[index], output)
+        converted = sum(entry["status"] == "converted" for entry in manifest)
+        yield archive.add_manifest({
+            "entries": len(manifest),
+            "converted": converted,
+            "failed": len(manifest) - converted,
+            "seconds": round(time.monotonic() - start, 3),
+            "files": manifest,
+        })
+        yield archive.close()
+    finally:
+        for task in running:
+            task.cancel()
+
+async def convert_batch_entry(data, settings):
+    """(PDF bytes, stats, cached) of one batch entry; waits its turn while the pool is full."""
+    key = result_cache.key(data, settings)
+    cached = result_cache.get(key)
+    output = read_cached(cached) if cached else None
+    if output is not None:
+        return output, {}, True
+    while True:
+        try:
+            future = pool.submit(data)
+            break
+        except PoolFull:
+            await asyncio.sleep(BATCH_RETRY_SECONDS)
+    try:
+        output, stats = await pool.wait(future)
+    except asyncio.CancelledError:
+        # Nobody is reading the batch any more: drop the entry if it has not started
+        future.cancel()
+        raise
+    try:
+        result_cache.put(key, output)
+    except (OSError, sqlite3.Error):
+        pass
+    return output, stats, False
+
+@app.post("/jobs", status_code=202)
+async def create_job(file: UploadFile = File(...)):
+    if not file.filename.endswith(".pdf"):
+        raise HTTPException(status_code=400, detail="File must be a PDF")
+
+    data = await read_upload(file)
+    jobs.cleanup()
+    job_id = jobs.create(file.filename)
+
+    key = result_cache.key(data, pool.settings())
+    cached = result_cache.get(key)
+    if cached:
+        try:
+            jobs.copy_result(job_id, cached)
+        except OSError:
+            # Evicted since the lookup: convert it after all
+            pass
+        else:
+            jobs.update(job_id, status="done", finished=time.time())
+            return jobs.state(job_id)
+
+    try:
+        future = pool.submit_job(jobs, job_id, data)
+    except Exception as e:
+        jobs.delete(job_id)
+        raise conversion_error(e)
+    asyncio.ensure_future(watch_job(job_id, future, key))
+    return jobs.state(job_id)
+
+async def watch_job(job_id, future, key):
+    """Wait for a job in the background: cache its result, record hard failures."""
+    try:
+        await pool.wait(future)
+    except Exception as e:
+        # Errors raised by the converter are already recorded by the worker
+        state = jobs.state(job_id)
+        if state and state["status"] not in FINISHED:
+            jobs.update(job_id, status="failed", error=str(e) or type(e).__name__,
+                        error_type=type(e).__name__)
+        return
+    try:
+        with open(jobs.result_path(job_id), "rb") as f:
+            result_cache.put(key, f.read())
+    except (OSError, sqlite3.Error):
+        pass
+
+def get_job_state(job_id: str):
+    state = jobs.state(job_id)
+    if state is None:
+        raise HTTPException(status_code=404, detail="Unknown or expired job")
+    return state
+
+@app.get("/jobs/{job_id}")
+async def job_status(job_id: str):
+    return get_job_state(job_id)
+
+@app.get("/jobs/{job_id}/events")
+async def job_events(job_id: str):
+    """Server-Sent Events: a "progress" event per change, then "done" or "error"."""
+    get_job_state(job_id)
+
+    async def events():
+        last = None
+        idle = 0.0
+        while True:
+            state = jobs.state(job_id)
+            if state is None:
+                yield "event: error\ndata: {\"error\": \"Unknown or expired job\"}\n\n"
+                return
+            progress = (state["status"], state["pages_done"], state["pages_total"])
+            if progress != last:
+                last = progress
+                idle = 0.0
+                event = {"done": "done", "failed": "error"}.get(state["status"], "progress")
+                yield f"event: {event}\ndata: {json.dumps(state)}\n\n"
+                if state["status"] in FINISHED:
+                    return
+            elif idle >= 15:
+                # Keep proxies from closing a quiet connection
+                idle = 0.0
+                yield ": keep-alive\n\n"
+            await asyncio.sleep(0.25)
+            idle += 0.25
+
+    return StreamingResponse(events(), media_type="text/event-stream",
+                             headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
+
+@app.get("/jobs/{job_id}/result")
+async def job_result(job_id: str):
+    state = get_job_state(job_id)
+    if state["status"] == "failed":
+        raise HTTPException(status_code=JOB_ERROR_STATUS.get(state["error_type"], 500), detail=state["error"])
+    if state["status"] != "done":
+        return JSONResponse(state, status_code=409)
+    return FileResponse(
+        jobs.result_path(job_id),
+        media_type="application/pdf",
+        headers=attachment_headers(f"dark_{state['filename']}")
+    )
+
+@app.post("/documents", status_code=201)
+async def upload_document(file: UploadFile = File(...)):
+    """Keep a PDF server-side; its pages are converted when first requested."""
+    if not file.filename.endswith(".pdf"):
+        raise HTTPException(status_code=400, detail="File must be a PDF")
+    data = await read_upload(file)
+    try:
+        with fitz.open(stream=data, filetype="pdf") as doc:
+            page_count = len(doc)
+    except Exception:
+        raise HTTPException(status_code=400, detail="File is not a readable PDF")
+    documents.cleanup()
+    doc_id = documents.add(data, file.filename, page_count)
+    return documents.meta(doc_id)
+
+def get_document_meta(doc_id: str):
+    meta = documents.meta(doc_id)
+    if meta is None:
+        raise HTTPException(status_code=404, detail="Unknown or expired document")
+    return meta
+
+@app.get("/documents/{doc_id}")
+async def document_info(doc_id: str):
+    return get_document_meta(doc_id)
+
+@app.get("/documents/{doc_id}/pages/{number}")
+async def document_page(doc_id: str, number: int, format: str = "pdf", dpi: int = 110):
+    """
+    Page number (1-based) of an uploaded document, converted: a one-page
+    PDF, or with format=png a PNG rendered at dpi. Converted on first
+    request, then served from the document's page store.
+    """
+    meta = get_document_meta(doc_id)
+    if not 1 <= number <= meta["pages"]:
+        raise HTTPException(status_code=404, detail=f"Page {number} does not exist, the document has {meta['pages']} pages")
+    if format not in ("pdf", "png"):
+        raise HTTPException(status_code=400, detail="format must be pdf or png")
+    if format == "png" and not PAGE_DPI_RANGE[0] <= dpi <= PAGE_DPI_RANGE[1]:
+        raise HTTPException(status_code=400, detail=f"dpi must be between {PAGE_DPI_RANGE[0]} and {PAGE_DPI_RANGE[1]}")
+    dpi = dpi if format == "png" else None
+
+    data = documents.read_page(doc_id, number, dpi)
+    if data is None:
+        # Not produced yet - convert the page (or only render it, if the
+        # converted PDF page exists already)
+        converted = documents.read_page(doc_id, number) if dpi else None
+        try:
+            (pdf, png), _ = await pool.wait(pool.submit_page(documents.source_path(doc_id), number - 1, dpi, converted))
+        except Exception as e:
+            raise conversion_error(e)
+        if converted is None:
+            documents.write_page(doc_id, number, pdf)
+        if dpi:
+            documents.write_page(doc_id, number, png, dpi)
+        data = png if dpi else pdf
+
+    return Response(
+        content=data,
+        media_type="image/png" if dpi else "application/pdf",
+        headers={"Cache-Control": "private, max-age=3600"}
+    )
+
+@app.post("/preview")
+async def preview_pdf(file: UploadFile = File(...), pages: int = 3, sample: bool = False,
+                      width: int = 240, format: str = "png"):
+    """
+    Dark-mode thumbnails of the first pages (or, with sample=true, pages
+    spread over the document) without converting the whole file. Answers
+    JSON with the page count and one data: URL per thumbnail.
+    """
+    if not file.filename.endswith(".pdf"):
+        raise HTTPException(status_code=400, detail="File must be a PDF")
+    if not 1 <= pages <= PREVIEW_MAX_PAGES:
+        raise HTTPException(status_code=400, detail=f"pages must be between 1 and {PREVIEW_MAX_PAGES}")
+    if not PREVIEW_WIDTH_RANGE[0] <= width <= PREVIEW_WIDTH_RANGE[1]:
+        raise HTTPException(status_code=400, detail=f"width must be between {PREVIEW_WIDTH_RANGE[0]} and {PREVIEW_WIDTH_RANGE[1]}")
+    if format not in PREVIEW_FORMATS:
+        raise HTTPException(status_code=400, detail=f"format must be one of {', '.join(PREVIEW_FORMATS)}")
+    data = await read_upload(file)
+
+    options = {"count": pages, "sample": sample, "width": width, "image_format": format}
+    key = preview_cache.key(data, {"converter": pool.settings(), "preview": options})
+    cached = preview_cache.get(key)
+    body = read_cached(cached) if cached else None
+    if body is not None:
+        return Response(content=body, media_type="application/json", headers={"X-Preview-Cache": "hit"})
+
+    try:
+        (page_count, thumbnails), _ = await pool.wait(pool.submit_preview(data, **options))
     except Exception as e:
-        # Clean up on error
-        if os.path.exists(input_path):
-            os.remove(input_path)
-        if os.path.exists(output_path):
-            os.remove(output_path)
-        raise HTTPException(status_code=500, detail=str(e))
+        if isinstance(e, fitz.FileDataError):
+            raise HTTPException(status_code=400, detail="File is not a readable PDF")
+        raise conversion_error(e)
+    body = json.dumps({
+        "pages": page_count,
+        "thumbnails": [
+            {
+                "page": number,
+                "width": w,
+                "height": h,
+                "image": f"data:{MEDIA_TYPES[format]};base64,{base64.b64encode(image).decode()}",
+            }
+            for number, w, h, image in thumbnails
+        ],
+    }).encode()
+    try:
+        preview_cache.put(key, body)
+    except (OSError, sqlite3.Error):
+        pass
+    return Response(content=body, media_type="application/json", headers={"X-Preview-Cache": "miss"})
 
 @app.get("/health")
 async def health_check():
     return {"status": "ok", "message": "PDF Dark Mode Converter API is running"}
 
+@app.get("/cache/stats")
+async def cache_stats():
+    return result_cache.stats()
+
+@app.get("/metrics")
+async def metrics():
+    """Prometheus text format: conversion stages and counts, pool, caches, request latency."""
+    registry.gauge("nightowl_pool_in_flight", "Conversions running or queued").set(pool.pending)
+    registry.gauge("nightowl_pool_capacity", "Conversions that may run or wait at once").set(
+        pool.workers + pool.queue_size)
+    caches = {"result": result_cache, "preview": preview_cache}
+    if pool.config.get("page_cache_dir"):
+        caches["page"] = PageCache(pool.config["page_cache_dir"])
+    events = registry.counter("nightowl_cache_events_total", "Cache lookups and changes", ("cache", "event"))
+    entries = registry.gauge("nightowl_cache_entries", "Entries in the cache", ("cache",))
+    size = registry.gauge("nightowl_cache_bytes", "Bytes in the cache", ("cache",))
+    for name, cache in caches.items():
+        try:
+            stats = cache.stats()
+        except sqlite3.Error:
+            continue
+        # Kept in SQLite, shared by all workers - totals, not per process
+        for event in ("hits", "misses", "stores", "evictions"):
+            events.set(stats.get(event, 0), cache=name, event=event)
+        entries.set(stats["entries"], cache=name)
+        size.set(stats["bytes"], cache=name)
+    return Response(content=registry.render(), media_type="text/plain; version=0.0.4")
+
+@app.get("/admin/profiles")
+async def list_profiles(request: Request):
+    """Profiled conversions, newest first (X-Admin-Token required)."""
+    require_admin(request)
+    return profiles.list()
+
+@app.get("/admin/profiles/{profile_id}")
+async def get_profile(request: Request, profile_id: str):
+    """A profile bundle: timings, top functions and allocations, slowest pages, document structure."""
+    require_admin(request)
+    bundle = profiles.get(profile_id)
+    if bundle is None:
+        raise HTTPException(status_code=404, detail="Unknown profile")
+    return bundle
+
+@app.get("/admin/profiles/{profile_id}/pstats")
+async def get_profile_pstats(request: Request, profile_id: str):
+    """The raw cProfile data - pstats.Stats(path) or snakeviz reads it."""
+    require_admin(request)
+    path = profiles.pstats_path(profile_id)
+    if path is None:
+        raise HTTPException(status_code=404, detail="Unknown profile")
+    return FileResponse(path, media_type="application/octet-stream",
+                        headers=attachment_headers(f"{profile_id}.pstats"))
+
 @app.get("/")
 async def read_root():
     return FileResponse("static/index.html")
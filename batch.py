@@ -0,0 +1,136 @@
+import functools
+import io
+import json
+import posixpath
+import zipfile
+
+# Batch conversion (POST /convert/batch): the entries come in as several
+# uploaded PDFs or as one ZIP of PDFs, and go back as a ZIP written piece
+# by piece - each converted PDF as soon as it is done, manifest.json with
+# the outcome of every entry last. Entries are stored, not deflated: PDFs
+# are compressed already, and the archive stays cheap to stream.
+
+MANIFEST_NAME = "manifest.json"
+# ZIP entries need a timestamp; a fixed one keeps archives reproducible
+_DATE_TIME = (1980, 1, 1, 0, 0, 0)
+
+
+class BatchError(Exception):
+    """The batch as a whole cannot be used (not a ZIP archive, say)."""
+
+
+class BatchTooLarge(BatchError):
+    """The batch has too many entries or too many bytes."""
+
+
+def is_pdf_name(name):
+    return name.lower().endswith(".pdf")
+
+
+def unpack_zip(data, max_entries, max_entry_bytes, max_total_bytes):
+    """
+    The entries of a ZIP archive as [name, read, error] lists, in archive
+    order. read() inflates the entry and returns its bytes, or raises
+    BatchError - nothing is inflated up front, so a batch only holds the
+    entries being converted. Directories and macOS resource forks are left
+    out; an entry that is not a PDF or is larger than max_entry_bytes
+    keeps its place with an error (and no read) so it shows up in the
+    manifest. Sizes are checked against the archive's directory - zipfile
+    stops reading an entry at its declared size, so a lying header cannot
+    inflate past the limits either.
+    """
+    try:
+        archive = zipfile.ZipFile(io.BytesIO(data))
+    except zipfile.BadZipFile:
+        raise BatchError("Not a valid ZIP archive")
+    infos = [info for info in archive.infolist() if not info.is_dir()
+             and not info.filename.startswith("__MACOSX/")
+             and not posixpath.basename(info.filename).startswith("._")]
+    if len(infos) > max_entries:
+        raise BatchTooLarge(f"More than {max_entries} files in the archive")
+    if sum(info.file_size for info in infos if is_pdf_name(info.filename)) > max_total_bytes:
+        raise BatchTooLarge(f"Archive is larger than {max_total_bytes // (1024 * 1024)} MB unpacked")
+    entries = []
+    for info in infos:
+        name = info.filename
+        if not is_pdf_name(name):
+            entries.append([name, None, "File must be a PDF"])
+        elif info.file_size > max_entry_bytes:
+            entries.append([name, None, f"File is larger than {max_entry_bytes // (1024 * 1024)} MB"])
+        else:
+            entries.append([name, functools.partial(_read_entry, archive, info), None])
+    return entries
+
+
+def _read_entry(archive, info):
+    try:
+        return archive.read(info)
+    except (zipfile.BadZipFile, RuntimeError, NotImplementedError, EOFError) as e:
+        # Corrupt, encrypted or in an unsupported compression
+        raise BatchError(f"Cannot unpack: {e}")
+
+
+def output_names(names):
+    """
+    Archive names of the converted entries: dark_<name> in the entry's own
+    folder, made safe to unpack (no absolute paths or ..) and unique.
+    """
+    seen = set()
+    result = []
+    for name in names:
+        parts = [part for part in name.replace("\\", "/").split("/") if part not in ("", ".", "..")]
+        folder, base = parts[:-1], parts[-1] if parts else "document.pdf"
+        candidate = "/".join(folder + [f"dark_{base}"])
+        stem, ext = posixpath.splitext(candidate)
+        number = 2
+        while candidate.lower() in seen:
+            candidate = f"{stem} ({number}){ext}"
+            number += 1
+        seen.add(candidate.lower())
+        result.append(candidate)
+    return result
+
+
+class ZipStream:
+    """
+    A ZIP archive built entry by entry: add() and close() return the bytes
+    of the archive that are ready to send, nothing is kept after that.
+    """
+
+    def __init__(self):
+        self._sink = _Sink()
+        self._archive = zipfile.ZipFile(self._sink, "w", compression=zipfile.ZIP_STORED)
+
+    def add(self, name, data):
+        info = zipfile.ZipInfo(name, date_time=_DATE_TIME)
+        info.compress_type = zipfile.ZIP_STORED
+        self._archive.writestr(info, data)
+        return self._sink.take()
+
+    def add_manifest(self, manifest):
+        return self.add(MANIFEST_NAME, json.dumps(manifest, indent=2).encode())
+
+    def close(self):
+        """The central directory - the end of the archive."""
+        self._archive.close()
+        return self._sink.take()
+
+
+class _Sink:
+    """Write-only file object for zipfile: unseekable, so entries are written once, in order."""
+
+    def __init__(self):
+        self._chunks = []
+
+    def write(self, data):
+        self._chunks.append(bytes(data))
+        return len(data)
+
+    def flush(self):
+        pass
+
+    def take(self):
+        data = b"".join(self._chunks)
+        self._chunks = []
+        return data
+
@@ -0,0 +1,93 @@
+import asyncio
+import os
+import shutil
+import sys
+import tempfile
+import time
+import fitz
+from fastapi.testclient import TestClient
+from result_cache import ResultCache
+from worker_pool import ConversionPool
+
+# A course pack converted as N sequential POST /convert calls (today's
+# workflow) against one POST /convert/batch, with the pool at one worker
+# and at one worker per core. Every pass gets an empty result cache. Also
+# when the first converted entry of the batch is ready to stream, against
+# the time the whole batch takes.
+#
+#   python bench_batch.py [files] [pages]
+
+
+def create_pdf_bytes(pages, seed):
+    doc = fitz.open()
+    for i in range(pages):
+        page = doc.new_page()
+        for line in range(30):
+            page.insert_text((72, 60 + line * 20), f"Handout {seed} page {i + 1} line {line}")
+        page.draw_rect(fitz.Rect(72, 680, 520, 760), color=(0, 0, 0), fill=(0.9, 0.9, 1))
+    data = doc.tobytes()
+    doc.close()
+    return data
+
+
+def single_calls(client, documents):
+    for name, data in documents:
+        response = client.post("/convert", files={"file": (name, data, "application/pdf")})
+        assert response.status_code == 200
+
+
+def batch_call(client, documents):
+    response = client.post("/convert/batch", files=[("files", (name, data, "application/pdf"))
+                                                    for name, data in documents])
+    assert response.status_code == 200
+
+
+async def first_entry(app, documents):
+    """Seconds until the first converted entry is ready, and until the archive is complete."""
+    start = time.perf_counter()
+    first = None
+    async for piece in app.stream_batch([[name, data, None] for name, data in documents]):
+        if first is None:
+            first = time.perf_counter() - start
+    return first, time.perf_counter() - start
+
+
+def run(files=30, pages=4):
+    import app
+    directory = tempfile.mkdtemp(prefix="bench_batch_")
+    documents = [(f"handout{i}.pdf", create_pdf_bytes(pages, i)) for i in range(files)]
+    saved_pool, saved_cache = app.pool, app.result_cache
+    cores = os.cpu_count() or 1
+    print(f"{files} PDFs of {pages} pages, {cores} core(s)")
+    print(f"{'pass':<22} {'workers':>7} {'total s':>8} {'files/s':>8} {'speedup':>8}")
+    baseline = None
+    try:
+        passes = [("sequential /convert", 1, single_calls), ("/convert/batch", 1, batch_call)]
+        if cores > 1:
+            passes.append(("/convert/batch", cores, batch_call))
+        for label, workers, call in passes:
+            app.pool = ConversionPool(saved_pool.config, workers=workers, queue_size=saved_pool.queue_size)
+            app.result_cache = ResultCache(os.path.join(directory, f"{call.__name__}-{workers}"))
+            with TestClient(app.app) as client:
+                # Start the worker processes before timing
+                client.post("/convert", files={"file": ("warmup.pdf", create_pdf_bytes(1, "warmup"), "application/pdf")})
+                start = time.perf_counter()
+                call(client, documents)
+                seconds = time.perf_counter() - start
+            app.pool.shutdown()
+            baseline = baseline or seconds
+            print(f"{label:<22} {workers:>7} {seconds:>8.2f} {files / seconds:>8.1f} {baseline / seconds:>7.2f}x")
+
+        app.pool = ConversionPool(saved_pool.config, workers=cores, queue_size=saved_pool.queue_size)
+        app.result_cache = ResultCache(os.path.join(directory, "stream"))
+        first, total = asyncio.run(first_entry(app, documents))
+        app.pool.shutdown()
+        print(f"batch stream: first entry after {first:.2f} s, archive complete after {total:.2f} s")
+    finally:
+        app.pool, app.result_cache = saved_pool, saved_cache
+        shutil.rmtree(directory)
+
+
+if __name__ == "__main__":
+    run(int(sys.argv[1]) if len(sys.argv) > 1 else 30,
+        int(sys.argv[2]) if len(sys.argv) > 2 else 4)
@@ -0,0 +1,52 @@
+import sys
+import time
+import corpus
+from converter import PDFDarkThemeConverter
+from page_classifier import PAGE_CLASSES, PageContent
+
+# Page classification fast paths against running every step on every
+# page, on the report-shaped "mixed" corpus document (text chapters, blank
+# separators, charts, photo plates, a scanned appendix) and, for the cost
+# of classifying pages that need the full pipeline anyway, vector-dense.
+#
+#   python bench_classifier.py [pages]
+
+
+class FullPipeline(PDFDarkThemeConverter):
+    """Every page counts as drawing text, vector graphics and images - the converter before page classes."""
+
+    def _classify(self, page):
+        return PageContent(text=True, vector=True, images=True)
+
+
+def measure(converter, data, mode, repeat=3):
+    """(fastest seconds, stats of that run)"""
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        converter.convert_bytes(data, mode=mode)
+        seconds = time.perf_counter() - start
+        if best is None or seconds < best[0]:
+            best = (seconds, converter.last_stats)
+    return best
+
+
+def run(pages=80):
+    # Total seconds (save included) and seconds spent on the pages
+    print(f"{'document':<16} {'mode':<8} {'full s':>7} {'classified s':>13} {'speedup':>8} "
+          f"{'pages: full s':>14} {'classified s':>13} {'speedup':>8}  page classes")
+    for kind, count in (("mixed", pages), ("vector-dense", max(1, pages // 8))):
+        data = corpus.generate(kind, count)
+        for mode in ("overlay", "auto"):
+            full, full_stats = measure(FullPipeline(), data, mode)
+            classified, stats = measure(PDFDarkThemeConverter(), data, mode)
+            full_pages, classified_pages = full_stats["convert_seconds"], stats["convert_seconds"]
+            classes = ", ".join(f"{name} {stats['counts'][name + '_pages']}" for name in PAGE_CLASSES
+                                if stats["counts"].get(name + "_pages"))
+            print(f"{kind + '-' + str(count):<16} {mode:<8} {full:>7.2f} {classified:>13.2f} "
+                  f"{full / classified:>7.2f}x {full_pages:>14.2f} {classified_pages:>13.2f} "
+                  f"{full_pages / classified_pages:>7.2f}x  {classes}")
+
+
+if __name__ == "__main__":
+    run(int(sys.argv[1]) if len(sys.argv) > 1 else 80)
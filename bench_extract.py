@@ -0,0 +1,71 @@
+import sys
+import time
+import tracemalloc
+import fitz
+import corpus
+from text_extract import extract_spans
+
+# Step 1 text extraction, before and after text_extract: time and peak
+# Python allocations per page.
+#
+#   python bench_extract.py [pages] [kinds]
+
+
+def legacy_extract(page):
+    """The previous extraction: default dict flags (image blocks with their data), ±5000 clip, two walks."""
+    text_dict = page.get_text("dict", clip=fitz.Rect(-1000, -1000, 5000, 5000))
+    max_x, max_y = page.rect.width, page.rect.height
+    for block in text_dict["blocks"]:
+        if block["type"] == 0:
+            for line in block["lines"]:
+                for span in line["spans"]:
+                    bbox = span["bbox"]
+                    max_x = max(max_x, bbox[2])
+                    max_y = max(max_y, bbox[3])
+    spans = []
+    for block in text_dict["blocks"]:
+        if block["type"] == 0:
+            for line in block["lines"]:
+                for span in line["spans"]:
+                    if span["text"] and span["text"].strip():
+                        spans.append(span)
+    return spans, max_x, max_y
+
+
+def measure(doc, extract):
+    """(seconds per page, peak traced bytes per page, spans) - time and memory in separate runs."""
+    extract(doc[0])     # warm up fonts and caches
+    start = time.perf_counter()
+    for page in doc:
+        spans = extract(page)[0]
+    seconds = (time.perf_counter() - start) / len(doc)
+
+    peak = 0
+    tracemalloc.start()
+    for page in doc:
+        tracemalloc.reset_peak()
+        result = extract(page)
+        peak = max(peak, tracemalloc.get_traced_memory()[1])
+        del result
+    tracemalloc.stop()
+    return seconds, peak, len(spans)
+
+
+def run(pages=10, kinds=("image-heavy", "scanned", "text-dense")):
+    print(f"{'document':<16} {'pass':<8} {'ms/page':>8} {'peak KB/page':>13} {'spans':>6}")
+    for kind in kinds:
+        doc = fitz.open(stream=corpus.generate(kind, pages), filetype="pdf")
+        results = {}
+        for name, extract in (("legacy", legacy_extract), ("lean", extract_spans)):
+            results[name] = measure(doc, extract)
+            seconds, peak, spans = results[name]
+            print(f"{kind:<16} {name:<8} {seconds * 1000:>8.2f} {peak / 1024:>13.0f} {spans:>6}")
+        (old_s, old_peak, _), (new_s, new_peak, _) = results["legacy"], results["lean"]
+        print(f"{'':<16} {'':<8} {old_s / new_s:>7.1f}x {old_peak / max(new_peak, 1):>12.1f}x")
+        doc.close()
+
+
+if __name__ == "__main__":
+    pages = int(sys.argv[1]) if len(sys.argv) > 1 else 10
+    kinds = tuple(sys.argv[2].split(",")) if len(sys.argv) > 2 else ("image-heavy", "scanned", "text-dense")
+    run(pages, kinds)
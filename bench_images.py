@@ -0,0 +1,57 @@
+import fitz
+import sys
+import time
+from image_index import ImagePlacementIndex, redraw_images
+
+
+def create_logo_pdf(pages, shared_resources=False):
+    """
+    Letterhead-style document: the same two images on every page.
+    shared_resources=True deduplicates the pages' resource dictionaries
+    (as garbage=3 writers do); the legacy redraw grows exponentially there.
+    """
+    pix = fitz.Pixmap(fitz.csRGB, fitz.IRect(0, 0, 64, 32), False)
+    pix.clear_with(120)
+    logo = pix.tobytes("png")
+    doc = fitz.open()
+    for i in range(pages):
+        page = doc.new_page()
+        for line in range(30):
+            page.insert_text((72, 120 + line * 20), f"Body text line {line} on page {i + 1}")
+        page.insert_image(fitz.Rect(50, 50, 150, 100), stream=logo)
+        page.insert_image(fitz.Rect(400, 760, 500, 810), stream=logo)
+    data = doc.tobytes(garbage=3 if shared_resources else 0)
+    doc.close()
+    return data
+
+
+def legacy_redraw(doc):
+    """The previous Step 4: get_image_rects + insert_image per placement."""
+    for page in doc:
+        for img in page.get_images(full=True):
+            for rect in page.get_image_rects(img[0]):
+                page.insert_image(rect, xref=img[0], overlay=True)
+
+
+def indexed_redraw(doc):
+    index = ImagePlacementIndex()
+    for page in doc:
+        redraw_images(page, index.add_page(page))
+
+
+def run(pages=40, shared_resources=False):
+    data = create_logo_pdf(pages, shared_resources)
+    print(f"{pages} pages, 2 shared images per page, shared resources: {shared_resources}")
+    print(f"{'stage':>10} {'seconds':>9} {'output':>10}")
+    for name, redraw in (("legacy", legacy_redraw), ("indexed", indexed_redraw)):
+        doc = fitz.open(stream=data, filetype="pdf")
+        start = time.perf_counter()
+        redraw(doc)
+        elapsed = time.perf_counter() - start
+        size = len(doc.tobytes(garbage=3, deflate=True))
+        doc.close()
+        print(f"{name:>10} {elapsed:>9.3f} {size:>10}")
+
+
+if __name__ == "__main__":
+    run(int(sys.argv[1]) if len(sys.argv) > 1 else 40, "--shared-resources" in sys.argv)
@@ -0,0 +1,128 @@
+import sys
+import time
+import tracemalloc
+import fitz
+import corpus
+from converter import PDFDarkThemeConverter
+from page_model import PathTable
+
+# Step 1 capture, Step 1.5 bounds and Step 3 path redraw of one page with
+# many paths: per-path dicts and fitz.Shape calls (before page_model)
+# against the columnar page model. Time per stage, what the captured
+# page holds on to while it is converted, and peak Python allocations.
+#
+#   python bench_page_model.py [paths]
+
+
+def legacy_redraw(converter, shape, drawings, page_rect):
+    """The previous Step 3: style tuples per path, Shape.draw_*() per item, finish() per batch."""
+    style, batch_rects, batch_plain = None, [], True
+    for path in drawings:
+        if path['rect'].width > page_rect.width * 0.9 and \
+           path['rect'].height > page_rect.height * 0.9 and \
+           converter.colors.is_white(path['fill']):
+            continue
+        stroke = converter.colors.map(path['color'], "stroke")
+        fill = converter.colors.map(path['fill'], "fill")
+        dashes = path.get('dashes')
+        if dashes == '[] 0':
+            dashes = None
+        even_odd = bool(path.get('even_odd'))
+        path_style = (stroke, fill, path.get('width') or 0, path.get('lineCap') or 0,
+                      path.get('lineJoin') or 0, dashes, bool(path.get('closePath')), even_odd)
+        plain = all(item[0] == 're' for item in path['items'])
+        if style is not None:
+            joinable = path_style == style
+            if joinable and fill is not None and (even_odd or not (plain and batch_plain)):
+                joinable = not any(path['rect'].intersects(r) for r in batch_rects)
+            if joinable:
+                if style[6]:
+                    shape.draw_cont += "h\n"
+            else:
+                legacy_finish(shape, style)
+                style = None
+        if style is None:
+            style, batch_rects, batch_plain = path_style, [], True
+        batch_rects.append(path['rect'])
+        batch_plain = batch_plain and plain
+        shape.last_point = None
+        for item in path['items']:
+            if item[0] == 'l':
+                shape.draw_line(item[1], item[2])
+            elif item[0] == 're':
+                shape.draw_rect(item[1])
+            elif item[0] == 'qu':
+                shape.draw_quad(item[1])
+            elif item[0] == 'c':
+                shape.draw_bezier(item[1], item[2], item[3], item[4])
+    if style is not None:
+        legacy_finish(shape, style)
+
+
+def legacy_finish(shape, style):
+    stroke, fill, width, line_cap, line_join, dashes, close_path, even_odd = style
+    shape.finish(color=stroke, fill=fill, width=width, lineCap=line_cap, lineJoin=line_join,
+                 dashes=dashes, closePath=close_path, even_odd=even_odd)
+
+
+def legacy(converter, page, shape):
+    drawings = page.get_drawings()
+    yield "capture"
+    max_x, max_y = page.rect.width, page.rect.height
+    for path in drawings:
+        max_x = max(max_x, path['rect'].x1)
+        max_y = max(max_y, path['rect'].y1)
+    yield "bounds"
+    legacy_redraw(converter, shape, drawings, page.rect)
+    yield "paths"
+
+
+def model(converter, page, shape):
+    paths = PathTable.from_drawings(page.get_cdrawings())
+    yield "capture"
+    max_x, max_y = paths.bounds()
+    yield "bounds"
+    converter._redraw_paths(shape, paths, page.rect)
+    yield "paths"
+
+
+def measure(page, run):
+    """({stage: seconds}, traced bytes after capture, peak traced bytes, content length) - time and memory in separate runs."""
+    stages = {}
+    shape = page.new_shape()
+    start = time.perf_counter()
+    for stage in run(PDFDarkThemeConverter(), page, shape):
+        now = time.perf_counter()
+        stages[stage] = now - start
+        start = now
+    content = len(shape.totalcont)
+
+    tracemalloc.start()
+    for stage in run(PDFDarkThemeConverter(), page, page.new_shape()):
+        if stage == "capture":
+            captured = tracemalloc.get_traced_memory()[0]
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return stages, captured, peak, content
+
+
+def run(paths=50000):
+    doc = fitz.open(stream=corpus.vector_dense(1, paths=paths), filetype="pdf")
+    page = doc[0]
+    print(f"one page, {paths} paths")
+    print(f"{'pass':<8} {'capture s':>10} {'bounds s':>9} {'paths s':>8} {'total s':>8} "
+          f"{'held MB':>8} {'peak MB':>8} {'content KB':>11}")
+    results = {}
+    for name, method in (("legacy", legacy), ("model", model)):
+        stages, held, peak, content = results[name] = measure(page, method)
+        print(f"{name:<8} {stages['capture']:>10.3f} {stages['bounds']:>9.4f} {stages['paths']:>8.3f} "
+              f"{sum(stages.values()):>8.3f} {held / 2 ** 20:>8.1f} {peak / 2 ** 20:>8.1f} {content / 1024:>11.0f}")
+    (old, old_held, old_peak, _), (new, new_held, new_peak, _) = results["legacy"], results["model"]
+    print(f"{'':<8} {old['capture'] / new['capture']:>9.1f}x {old['bounds'] / new['bounds']:>8.0f}x "
+          f"{old['paths'] / new['paths']:>7.1f}x {sum(old.values()) / sum(new.values()):>7.1f}x "
+          f"{old_held / new_held:>7.1f}x {old_peak / new_peak:>7.1f}x")
+    doc.close()
+
+
+if __name__ == "__main__":
+    run(int(sys.argv[1]) if len(sys.argv) > 1 else 50000)
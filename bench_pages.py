@@ -0,0 +1,61 @@
+import os
+import sys
+import time
+from fastapi.testclient import TestClient
+from bench_parallel import create_long_pdf
+from converter import PDFDarkThemeConverter
+
+# Time until a viewer can show page 1: full /convert of the document
+# against POST /documents + GET /documents/{id}/pages/1.
+
+
+def run(pages=500):
+    input_file = "bench_pages_input.pdf"
+    create_long_pdf(input_file, pages)
+    with open(input_file, "rb") as f:
+        data = f.read()
+    os.remove(input_file)
+
+    converter = PDFDarkThemeConverter()
+    start = time.perf_counter()
+    converter.convert_bytes(data)
+    full = time.perf_counter() - start
+
+    start = time.perf_counter()
+    converter.convert_page(data, 0)
+    single = time.perf_counter() - start
+
+    import app
+    with TestClient(app.app) as client:
+        # Warm up the worker process
+        warm = client.post("/documents", files={"file": ("warm.pdf", data, "application/pdf")}).json()["id"]
+        client.get(f"/documents/{warm}/pages/1")
+        app.documents.delete(warm)
+
+        start = time.perf_counter()
+        doc_id = client.post("/documents", files={"file": ("bench.pdf", data, "application/pdf")}).json()["id"]
+        uploaded = time.perf_counter() - start
+        client.get(f"/documents/{doc_id}/pages/1")
+        first_page = time.perf_counter() - start
+
+        start = time.perf_counter()
+        client.get(f"/documents/{doc_id}/pages/250?format=png&dpi=110")
+        png_page = time.perf_counter() - start
+
+        start = time.perf_counter()
+        client.get(f"/documents/{doc_id}/pages/1")
+        stored = time.perf_counter() - start
+        app.documents.delete(doc_id)
+
+    print(f"Document: {pages} pages, {len(data) / 1e6:.1f} MB")
+    print(f"{'full conversion (in process)':<40} {full * 1000:>9.0f} ms")
+    print(f"{'convert_page (in process)':<40} {single * 1000:>9.0f} ms")
+    print(f"{'POST /documents':<40} {uploaded * 1000:>9.0f} ms")
+    print(f"{'time to first page (upload + page 1)':<40} {first_page * 1000:>9.0f} ms")
+    print(f"{'page 250 as PNG at 110 dpi':<40} {png_page * 1000:>9.0f} ms")
+    print(f"{'page 1 again (from the store)':<40} {stored * 1000:>9.0f} ms")
+    print(f"time to first page is {full / first_page:.0f}x faster than a full conversion")
+
+
+if __name__ == "__main__":
+    run(int(sys.argv[1]) if len(sys.argv) > 1 else 500)
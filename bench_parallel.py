@@ -0,0 +1,60 @@
+import fitz
+import os
+import sys
+import time
+from converter import PDFDarkThemeConverter
+
+
+def create_long_pdf(filename, pages=400):
+    """Generate a text + vector heavy document that resembles a manual."""
+    doc = fitz.open()
+    for i in range(pages):
+        page = doc.new_page()
+        page.draw_rect(page.rect, fill=(1, 1, 1), color=None)
+        page.insert_text((72, 60), f"Chapter {i // 20 + 1} - Page {i + 1}", fontsize=16)
+        y = 90
+        for line in range(40):
+            page.insert_text((72, y), f"Line {line}: the quick brown fox jumps over the lazy dog {i}", fontsize=9)
+            y += 15
+        # A small table on every page
+        shape = page.new_shape()
+        for row in range(6):
+            for col in range(4):
+                shape.draw_rect(fitz.Rect(72 + col * 110, 700 + row * 18, 182 + col * 110, 718 + row * 18))
+        shape.finish(color=(0, 0, 0), width=0.5)
+        shape.commit()
+    # "Next page" links, added once every target page exists
+    for i in range(pages - 1):
+        doc[i].insert_link({"kind": fitz.LINK_GOTO, "from": fitz.Rect(72, 45, 300, 65), "page": i + 1})
+    doc.set_toc([[1, f"Chapter {c + 1}", c * 20 + 1] for c in range((pages + 19) // 20)])
+    doc.save(filename)
+    doc.close()
+
+
+def run(pages=400):
+    input_file = "bench_parallel_input.pdf"
+    output_file = "bench_parallel_output.pdf"
+    create_long_pdf(input_file, pages)
+
+    converter = PDFDarkThemeConverter()
+    cpus = os.cpu_count() or 1
+    # Always include 2 so the sharded path is exercised even on small boxes
+    worker_counts = [1, 2] + [n for n in (4, 8, 16) if n <= cpus]
+
+    print(f"Document: {pages} pages, {cpus} CPUs")
+    print(f"{'workers':>8} {'seconds':>9} {'pages/s':>9} {'speedup':>8}")
+    baseline = None
+    for workers in worker_counts:
+        start = time.perf_counter()
+        converter.convert(input_file, output_file, workers=workers)
+        elapsed = time.perf_counter() - start
+        if baseline is None:
+            baseline = elapsed
+        print(f"{workers:>8} {elapsed:>9.2f} {pages / elapsed:>9.1f} {baseline / elapsed:>7.2f}x")
+
+    os.remove(input_file)
+    os.remove(output_file)
+
+
+if __name__ == "__main__":
+    run(int(sys.argv[1]) if len(sys.argv) > 1 else 400)
@@ -0,0 +1,84 @@
+import fitz
+import sys
+import time
+from converter import PDFDarkThemeConverter
+
+
+def create_vector_pdf(pages, lines=2000):
+    """Chart/CAD-style document: dense grid lines, table cells and a few fills."""
+    doc = fitz.open()
+    for _ in range(pages):
+        page = doc.new_page()
+        shape = page.new_shape()
+        for i in range(lines):
+            # Thin gray grid - one path per line, as most generators write it
+            x = 20 + (i % 100) * 5.5
+            y = 20 + (i // 100) * 38
+            shape.draw_line((x, y), (x, y + 30))
+            shape.finish(color=(0.8, 0.8, 0.8), width=0.25)
+        for row in range(20):
+            for col in range(5):
+                shape.draw_rect(fitz.Rect(50 + col * 100, 60 + row * 30, 150 + col * 100, 90 + row * 30))
+                shape.finish(color=(0, 0, 0), width=0.5)
+        for i in range(10):
+            shape.draw_circle((100 + i * 40, 780), 15)
+            shape.finish(color=None, fill=(0.2, 0.4, 0.8))
+        shape.commit()
+    data = doc.tobytes()
+    doc.close()
+    return data
+
+
+def legacy_redraw(converter, shape, drawings, page_rect):
+    """The previous Step 3: one finish() per captured path."""
+    finishes = 0
+    for path in drawings:
+        stroke = converter.colors.map(path['color'], "stroke")
+        fill = converter.colors.map(path['fill'], "fill")
+        for item in path['items']:
+            if item[0] == 'l':
+                shape.draw_line(item[1], item[2])
+            elif item[0] == 're':
+                shape.draw_rect(item[1])
+            elif item[0] == 'c':
+                shape.draw_bezier(item[1], item[2], item[3], item[4])
+        dashes = path['dashes']
+        if dashes == '[] 0':
+            dashes = None
+        try:
+            shape.finish(color=stroke, fill=fill, width=path['width'],
+                         lineCap=path['lineCap'], lineJoin=path['lineJoin'],
+                         dashes=dashes, closePath=path['closePath'])
+            finishes += 1
+        except Exception:
+            continue
+    return finishes
+
+
+def batched_redraw(converter, shape, drawings, page_rect):
+    return converter._redraw_paths(shape, drawings, page_rect)
+
+
+def run(pages=10):
+    data = create_vector_pdf(pages)
+    converter = PDFDarkThemeConverter()
+    print(f"{pages} pages, ~2100 paths per page")
+    print(f"{'stage':>10} {'seconds':>9} {'finishes':>9} {'lines':>9} {'output':>10}")
+    for name, redraw in (("legacy", legacy_redraw), ("batched", batched_redraw)):
+        doc = fitz.open(stream=data, filetype="pdf")
+        pages_drawings = [page.get_drawings() for page in doc]
+        finishes = lines = 0
+        start = time.perf_counter()
+        for page, drawings in zip(doc, pages_drawings):
+            shape = page.new_shape()
+            finishes += redraw(converter, shape, drawings, page.rect)
+            lines += shape.totalcont.count("\n")
+            shape.commit(overlay=True)
+        elapsed = time.perf_counter() - start
+        size = len(doc.tobytes(garbage=3, deflate=True))
+        doc.close()
+        print(f"{name:>10} {elapsed:>9.3f} {finishes:>9} {lines:>9} {size:>10}")
+
+
+if __name__ == "__main__":
+    run(int(sys.argv[1]) if len(sys.argv) > 1 else 10)
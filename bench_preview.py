@@ -0,0 +1,57 @@
+import os
+import statistics
+import sys
+import time
+import fitz
+from fastapi.testclient import TestClient
+from bench_parallel import create_long_pdf
+
+# Latency of POST /preview for a typical page (text + a vector table, see
+# bench_parallel.create_long_pdf). Exits with status 1 when the median
+# uncached latency per page is over the budget.
+
+BUDGET_MS = 300
+
+
+def run(pages=3, runs=10):
+    input_file = "bench_preview_input.pdf"
+    create_long_pdf(input_file, 100)
+    doc = fitz.open(input_file)
+    variants = []
+    for i in range(runs + 1):
+        # A different title per upload - same pages, new cache key
+        doc.set_metadata({"title": f"Preview run {i}"})
+        variants.append(doc.tobytes())
+    doc.close()
+    os.remove(input_file)
+
+    import app
+    uncached, cached = [], []
+    with TestClient(app.app) as client:
+        def preview(data):
+            start = time.perf_counter()
+            response = client.post(f"/preview?pages={pages}", files={"file": ("bench.pdf", data, "application/pdf")})
+            assert response.status_code == 200, response.text
+            return (time.perf_counter() - start) * 1000, response.headers["X-Preview-Cache"]
+
+        preview(variants.pop())  # start the worker process
+        for data in variants:
+            ms, state = preview(data)
+            if state == "miss":
+                uncached.append(ms)
+            cached.append(preview(data)[0])
+
+    per_page = statistics.median(uncached) / pages
+    print(f"Document: 100 pages, previews of {pages} pages, {len(uncached)} uploads")
+    print(f"{'uncached p50':<24} {statistics.median(uncached):>8.0f} ms  ({per_page:.0f} ms per page)")
+    print(f"{'uncached max':<24} {max(uncached):>8.0f} ms")
+    print(f"{'cached p50':<24} {statistics.median(cached):>8.0f} ms")
+    if per_page > BUDGET_MS:
+        print(f"FAIL: {per_page:.0f} ms per page is over the {BUDGET_MS} ms budget")
+        return 1
+    print(f"OK: within the {BUDGET_MS} ms per page budget")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(run(int(sys.argv[1]) if len(sys.argv) > 1 else 3))
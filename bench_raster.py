@@ -0,0 +1,54 @@
+import fitz
+import numpy as np
+import resource
+import sys
+import time
+import tracemalloc
+from converter import PDFDarkThemeConverter
+
+
+def create_scanned_pdf(pages=20):
+    """Image-only pages that look like 200 DPI scans (paper noise + a text block)."""
+    rng = np.random.default_rng(0)
+    text_page = fitz.open()
+    page = text_page.new_page()
+    for i in range(45):
+        page.insert_text((72, 80 + i * 15), f"Scanned line {i}: lorem ipsum dolor sit amet", fontsize=10)
+    ink = text_page[0].get_pixmap(dpi=200, colorspace=fitz.csGRAY)
+    ink_samples = np.frombuffer(ink.samples, dtype=np.uint8).reshape(ink.height, ink.width)
+
+    doc = fitz.open()
+    for _ in range(pages):
+        noise = rng.integers(0, 18, size=ink_samples.shape, dtype=np.uint8)
+        scan = np.clip(ink_samples.astype(np.int16) - noise, 0, 255).astype(np.uint8)
+        pix = fitz.Pixmap(fitz.csGRAY, ink.width, ink.height, scan.tobytes(), False)
+        page = doc.new_page()
+        page.insert_image(page.rect, stream=pix.tobytes("jpeg", jpg_quality=80))
+    data = doc.tobytes()
+    doc.close()
+    return data
+
+
+def run(pages=20, dpi=150):
+    data = create_scanned_pdf(pages)
+    converter = PDFDarkThemeConverter()
+    converter.raster_dpi = dpi
+
+    tracemalloc.start()
+    start = time.perf_counter()
+    output = converter.convert_bytes(data, mode="raster")
+    elapsed = time.perf_counter() - start
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    max_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024  # KiB on Linux
+
+    print(f"Raster mode, {pages} scanned pages at {dpi} DPI")
+    print(f"  time:            {elapsed:.2f} s ({pages / elapsed:.1f} pages/s)")
+    print(f"  peak Python/NumPy allocations: {peak / 1e6:.1f} MB")
+    print(f"  peak RSS:        {max_rss:.0f} MB")
+    print(f"  input / output:  {len(data) / 1e6:.1f} MB / {len(output) / 1e6:.1f} MB")
+
+
+if __name__ == "__main__":
+    run(int(sys.argv[1]) if len(sys.argv) > 1 else 20,
+        int(sys.argv[2]) if len(sys.argv) > 2 else 150)
@@ -0,0 +1,41 @@
+import fitz
+import sys
+import time
+from converter import PDFDarkThemeConverter, SAVE_PROFILES
+from bench_images import create_logo_pdf
+from bench_parallel import create_long_pdf
+from bench_paths import create_vector_pdf
+
+
+def create_documents(pages):
+    create_long_pdf("bench_save_input.pdf", pages)
+    with open("bench_save_input.pdf", "rb") as f:
+        long_pdf = f.read()
+    return {
+        f"text x{pages}": long_pdf,
+        "vector x5": create_vector_pdf(5),
+        f"logos x{pages}": create_logo_pdf(pages),
+    }
+
+
+def run(pages=60):
+    converter = PDFDarkThemeConverter()
+    documents = create_documents(pages)
+    print(f"{'document':>12} {'profile':>9} {'save s':>8} {'output':>10}")
+    for name, data in documents.items():
+        for profile in SAVE_PROFILES:
+            # Saving with garbage collection changes the document, so every
+            # profile gets a freshly converted copy
+            doc = converter._convert_document(data)
+            start = time.perf_counter()
+            output = doc.tobytes(**converter._save_options(doc, len(data), profile))
+            elapsed = time.perf_counter() - start
+            doc.close()
+            print(f"{name:>12} {profile:>9} {elapsed:>8.3f} {len(output):>10}")
+        with fitz.open(stream=data, filetype="pdf") as doc:
+            auto = converter.select_save_profile(len(doc), len(data))
+        print(f"{name:>12} {'auto':>9} -> {auto}")
+
+
+if __name__ == "__main__":
+    run(int(sys.argv[1]) if len(sys.argv) > 1 else 60)
@@ -0,0 +1,81 @@
+import fitz
+import sys
+import time
+from text_emitter import TextEmitter
+
+
+def create_dense_page_pdf(pages=5):
+    """Statement-like pages: ~1500 short spans each, several fonts."""
+    doc = fitz.open()
+    fonts = ["helv", "hebo", "tiro", "cour"]
+    for _ in range(pages):
+        page = doc.new_page()
+        y = 30
+        while y < 820:
+            x = 20
+            for col in range(6):
+                page.insert_text((x, y), f"{col * 1234.56:>10.2f}", fontname=fonts[col % 4], fontsize=7)
+                x += 95
+            y += 9
+    data = doc.tobytes()
+    doc.close()
+    return data
+
+
+def collect_spans(page):
+    spans = []
+    for block in page.get_text("dict")["blocks"]:
+        if block["type"] == 0:
+            for line in block["lines"]:
+                for span in line["spans"]:
+                    if span["text"].strip():
+                        spans.append(span)
+    return spans
+
+
+def legacy_emit(page, spans, color):
+    """The previous Step 5: one insert_text call (plus a retry) per span."""
+    for span in spans:
+        try:
+            page.insert_text(span["origin"], span["text"], fontsize=span["size"],
+                             fontname=span["font"], color=color, render_mode=0, overlay=True)
+        except Exception:
+            try:
+                page.insert_text(span["origin"], span["text"], fontsize=span["size"],
+                                 fontname="helv", color=color, render_mode=0, overlay=True)
+            except Exception:
+                pass
+
+
+def batched_emit(page, spans, color):
+    emitter = TextEmitter(page.rect)
+    for span in spans:
+        font = span["font"] if span["font"].lower() in fitz.Base14_fontdict else "helv"
+        emitter.add(span["text"], span["origin"], span["size"], font, color, span["bbox"])
+    emitter.write(page)
+    return emitter
+
+
+def measure(data, emit):
+    doc = fitz.open(stream=data, filetype="pdf")
+    page_spans = [collect_spans(page) for page in doc]
+    total = sum(len(spans) for spans in page_spans)
+    start = time.perf_counter()
+    for page, spans in zip(doc, page_spans):
+        emit(page, spans, (0.96, 0.96, 0.96))
+    elapsed = time.perf_counter() - start
+    size = len(doc.tobytes(garbage=3, deflate=True))
+    doc.close()
+    return total, elapsed, size
+
+
+def run(pages=5):
+    data = create_dense_page_pdf(pages)
+    print(f"{'emitter':>10} {'spans':>7} {'seconds':>9} {'spans/s':>10} {'output':>10}")
+    for name, emit in (("insert", legacy_emit), ("batched", batched_emit)):
+        total, elapsed, size = measure(data, emit)
+        print(f"{name:>10} {total:>7} {elapsed:>9.3f} {total / elapsed:>10.0f} {size:>10}")
+
+
+if __name__ == "__main__":
+    run(int(sys.argv[1]) if len(sys.argv) > 1 else 5)
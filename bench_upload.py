@@ -0,0 +1,75 @@
+import os
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+import fitz
+from fastapi import FastAPI, File, UploadFile
+from fastapi.responses import FileResponse
+from fastapi.testclient import TestClient
+from converter import PDFDarkThemeConverter
+
+
+def create_pdf_bytes(pages, seed):
+    doc = fitz.open()
+    for i in range(pages):
+        page = doc.new_page()
+        for line in range(30):
+            page.insert_text((72, 60 + line * 20), f"Upload {seed} page {i + 1} line {line}")
+    data = doc.tobytes()
+    doc.close()
+    return data
+
+
+def legacy_app(directory):
+    """The previous /convert: uploads/<name> -> convert() -> outputs/dark_<name>."""
+    legacy = FastAPI()
+    converter = PDFDarkThemeConverter()
+    upload_dir = os.path.join(directory, "uploads")
+    output_dir = os.path.join(directory, "outputs")
+    os.makedirs(upload_dir)
+    os.makedirs(output_dir)
+
+    @legacy.post("/convert")
+    async def convert_pdf(file: UploadFile = File(...)):
+        input_path = os.path.join(upload_dir, file.filename)
+        output_path = os.path.join(output_dir, f"dark_{file.filename}")
+        with open(input_path, "wb") as buffer:
+            shutil.copyfileobj(file.file, buffer)
+        converter.convert(input_path, output_path)
+        return FileResponse(output_path, media_type="application/pdf", filename=f"dark_{file.filename}")
+
+    return legacy
+
+
+def measure(client, requests, pages, label):
+    latencies = []
+    for i in range(requests):
+        # A new document every time, so the result cache never hits
+        data = create_pdf_bytes(pages, f"{label}-{i}-{time.time()}")
+        start = time.perf_counter()
+        response = client.post("/convert", files={"file": ("lecture.pdf", data, "application/pdf")})
+        latencies.append(time.perf_counter() - start)
+        assert response.status_code == 200
+    return latencies
+
+
+def run(requests=20, pages=5):
+    import app
+    directory = tempfile.mkdtemp(prefix="bench_upload_")
+    print(f"{requests} sequential uploads of {pages}-page PDFs (all named lecture.pdf)")
+    print(f"{'path':>10} {'p50 ms':>8} {'p95 ms':>8} {'mean ms':>8}")
+    for label, target in (("legacy", legacy_app(directory)), ("memory", app.app)):
+        with TestClient(target) as client:
+            measure(client, 2, pages, label + "-warmup")
+            latencies = sorted(measure(client, requests, pages, label))
+        p95 = latencies[min(len(latencies) - 1, int(len(latencies) * 0.95))]
+        print(f"{label:>10} {statistics.median(latencies) * 1000:>8.1f} {p95 * 1000:>8.1f} "
+              f"{statistics.mean(latencies) * 1000:>8.1f}")
+    shutil.rmtree(directory)
+
+
+if __name__ == "__main__":
+    run(int(sys.argv[1]) if len(sys.argv) > 1 else 20,
+        int(sys.argv[2]) if len(sys.argv) > 2 else 5)
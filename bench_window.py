@@ -0,0 +1,64 @@
+import os
+import sys
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+import corpus
+from benchmark import peak_rss_mb
+from converter import PDFDarkThemeConverter
+
+# Peak RSS against page count, converting in one go and in windows
+# (convert(..., window=N)). One fresh process per conversion.
+#
+#   python bench_window.py [kind] [page counts] [window]
+#   python bench_window.py scanned 25,50,100,200 25
+
+PLOT_WIDTH = 50
+
+
+def measure(path, window):
+    converter = PDFDarkThemeConverter()
+    with tempfile.TemporaryDirectory() as tmp:
+        output = os.path.join(tmp, "output.pdf")
+        start = time.perf_counter()
+        converter.convert(path, output, window=window)
+        seconds = time.perf_counter() - start
+        size = os.path.getsize(output)
+    return {"seconds": seconds, "rss_mb": peak_rss_mb(), "output_mb": size / 1e6}
+
+
+def plot(rows, window):
+    """RSS against page count as horizontal bars, one pair per document."""
+    top = max(max(row["full"]["rss_mb"], row["windowed"]["rss_mb"]) for row in rows)
+    print(f"\nPeak RSS (MB) - '#' in one go, '=' in windows of {window}")
+    for row in rows:
+        for label, mark in (("full", "#"), ("windowed", "=")):
+            rss = row[label]["rss_mb"]
+            bar = mark * max(1, round(rss / top * PLOT_WIDTH))
+            pages = f"{row['pages']:>5}" if label == "full" else " " * 5
+            print(f"{pages} |{bar:<{PLOT_WIDTH}} {rss:.0f}")
+
+
+def run(kind="scanned", sizes=(25, 50, 100, 200), window=25):
+    paths = corpus.build("corpus", [kind], sizes)
+    rows = []
+    print(f"{kind}, window {window}")
+    print(f"{'pages':>5} {'one go s':>9} {'RSS MB':>7} {'out MB':>7} {'windowed s':>11} {'RSS MB':>7} {'out MB':>7}")
+    for pages, path in zip(sizes, paths):
+        row = {"pages": pages}
+        for label, size in (("full", None), ("windowed", window)):
+            # A clean heap per conversion, or the RSS peaks would carry over
+            with ProcessPoolExecutor(max_workers=1, max_tasks_per_child=1) as pool:
+                row[label] = pool.submit(measure, path, size).result()
+        full, windowed = row["full"], row["windowed"]
+        print(f"{pages:>5} {full['seconds']:>9.1f} {full['rss_mb']:>7.0f} {full['output_mb']:>7.1f} "
+              f"{windowed['seconds']:>11.1f} {windowed['rss_mb']:>7.0f} {windowed['output_mb']:>7.1f}")
+        rows.append(row)
+    plot(rows, window)
+
+
+if __name__ == "__main__":
+    kind = sys.argv[1] if len(sys.argv) > 1 else "scanned"
+    sizes = tuple(int(n) for n in sys.argv[2].split(",")) if len(sys.argv) > 2 else (25, 50, 100, 200)
+    window = int(sys.argv[3]) if len(sys.argv) > 3 else 25
+    run(kind, sizes, window)
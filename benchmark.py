@@ -0,0 +1,170 @@
+import argparse
+import json
+import os
+import platform
+import resource
+import sys
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+import fitz  # PyMuPDF
+import corpus
+from converter import PDFDarkThemeConverter
+from metrics import MetricsHook, Registry
+
+# Throughput suite: converts every corpus document (see corpus.py) with
+# PDFDarkThemeConverter.convert and reports pages/s, seconds per stage,
+# output/input size and peak RSS. Results can be saved as a JSON baseline;
+# later runs compare against it and exit with status 1 on a regression.
+#
+#   python benchmark.py --save              # record benchmark_baseline.json
+#   python benchmark.py                     # compare against it
+#   python benchmark.py --sizes 1,10 --kinds text-dense,scanned
+
+DEFAULT_BASELINE = "benchmark_baseline.json"
+# Metric -> the direction that is worse
+CHECKS = {"pages_per_second": "lower", "peak_rss_mb": "higher", "size_ratio": "higher"}
+# Timing differences below this many seconds are noise, whatever the ratio
+MIN_SECONDS = 0.05
+
+
+def measure(path, repeat, mode, metrics=False):
+    """
+    Convert path repeat times and return the metrics of the fastest run.
+    Runs in a fresh process per document, so peak RSS is this document's.
+    metrics=True records into a Prometheus registry, as the web app does.
+    """
+    converter = PDFDarkThemeConverter()
+    if metrics:
+        converter.hooks.append(MetricsHook(Registry()))
+    # Font loading and other first-use costs are not what we measure
+    converter.convert_page(path, 0, mode=mode)
+    with tempfile.TemporaryDirectory() as tmp:
+        output = os.path.join(tmp, "output.pdf")
+        best = None
+        for _ in range(repeat):
+            start = time.perf_counter()
+            converter.convert(path, output, mode=mode)
+            elapsed = time.perf_counter() - start
+            if best is None or elapsed < best[0]:
+                best = (elapsed, dict(converter.last_stats["stages"]))
+        output_size = os.path.getsize(output)
+    seconds, stages = best
+    pages = converter.last_stats["pages"]
+    return {
+        "pages": pages,
+        "seconds": round(seconds, 4),
+        "pages_per_second": round(pages / seconds, 2),
+        "stages": {name: round(value, 4) for name, value in stages.items()},
+        "size_ratio": round(output_size / os.path.getsize(path), 3),
+        "peak_rss_mb": round(peak_rss_mb(), 1),
+    }
+
+
+def peak_rss_mb():
+    """Peak resident set size of this process in MB."""
+    try:
+        # VmHWM starts over at exec(); ru_maxrss keeps the peak of the
+        # forked parent, i.e. whatever the benchmark runner had built
+        with open("/proc/self/status") as f:
+            for line in f:
+                if line.startswith("VmHWM:"):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    # ru_maxrss is in KiB on Linux, bytes on macOS
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / (1024 * 1024 if sys.platform == "darwin" else 1024)
+
+
+def machine():
+    return {
+        "python": platform.python_version(),
+        "pymupdf": fitz.VersionBind,
+        "platform": platform.platform(),
+        "cpus": os.cpu_count(),
+    }
+
+
+def run(paths, repeat=3, mode=None, metrics=False):
+    """Metrics of every document in paths, by case name (<kind>-<pages>)."""
+    results = {}
+    for path in paths:
+        case = os.path.splitext(os.path.basename(path))[0]
+        # One process per document: a clean heap for the RSS figure
+        with ProcessPoolExecutor(max_workers=1, max_tasks_per_child=1) as pool:
+            results[case] = pool.submit(measure, path, repeat, mode, metrics).result()
+        print_result(case, results[case])
+    return results
+
+
+def print_result(case, result):
+    stages = sorted(result["stages"].items(), key=lambda item: -item[1])
+    top = ", ".join(f"{name} {seconds:.2f}" for name, seconds in stages[:3])
+    print(f"{case:<20} {result['pages']:>5} {result['seconds']:>9.3f} {result['pages_per_second']:>9.1f} "
+          f"{result['size_ratio']:>7.2f} {result['peak_rss_mb']:>8.1f}  {top}")
+
+
+def compare(results, baseline, threshold):
+    """Regressions of results against baseline beyond threshold (a fraction), as messages."""
+    regressions = []
+    for case, result in results.items():
+        old = baseline.get(case)
+        if old is None:
+            continue
+        for metric, worse in CHECKS.items():
+            before, after = old[metric], result[metric]
+            if not before:
+                continue
+            change = (after - before) / before
+            if worse == "lower":
+                change = -change
+            if metric == "pages_per_second" and abs(result["seconds"] - old["seconds"]) < MIN_SECONDS:
+                continue
+            if change > threshold:
+                regressions.append(f"{case}: {metric} {before} -> {after} ({change:+.0%} worse)")
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Converter throughput benchmark")
+    parser.add_argument("--corpus", default="corpus", help="corpus directory (built on demand)")
+    parser.add_argument("--kinds", default=",".join(corpus.KINDS), help="comma-separated corpus kinds")
+    parser.add_argument("--sizes", default=",".join(map(str, corpus.DEFAULT_SIZES)),
+                        help="comma-separated page counts, e.g. 1,10,100,1000")
+    parser.add_argument("--repeat", type=int, default=3, help="runs per document, the fastest counts")
+    parser.add_argument("--mode", default=None, help="conversion mode (default: the converter's)")
+    parser.add_argument("--metrics", action="store_true", help="convert with the /metrics hook attached")
+    parser.add_argument("--baseline", default=DEFAULT_BASELINE, help="baseline JSON file")
+    parser.add_argument("--save", action="store_true", help="write the results as the new baseline")
+    parser.add_argument("--threshold", type=float, default=0.2,
+                        help="allowed regression as a fraction (default 0.2 = 20%%)")
+    args = parser.parse_args(argv)
+
+    paths = corpus.build(args.corpus, args.kinds.split(","), [int(n) for n in args.sizes.split(",")])
+    print(f"{'case':<20} {'pages':>5} {'seconds':>9} {'pages/s':>9} {'out/in':>7} {'RSS MB':>8}  top stages (s)")
+    results = run(paths, args.repeat, args.mode, args.metrics)
+
+    if args.save:
+        with open(args.baseline, "w") as f:
+            json.dump({"machine": machine(), "results": results}, f, indent=2, sort_keys=True)
+        print(f"Baseline written to {args.baseline}")
+        return 0
+
+    if not os.path.exists(args.baseline):
+        print(f"No baseline at {args.baseline} - record one with --save")
+        return 0
+    with open(args.baseline) as f:
+        baseline = json.load(f)
+    if baseline["machine"] != machine():
+        print("Warning: the baseline was recorded on a different machine or library version")
+    regressions = compare(results, baseline["results"], args.threshold)
+    for message in regressions:
+        print("REGRESSION", message)
+    if regressions:
+        return 1
+    print(f"No regressions beyond {args.threshold:.0%} against {args.baseline}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,359 @@
+import argparse
+import hashlib
+import json
+import os
+import signal
+import sys
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from concurrent.futures.process import BrokenProcessPool
+from color_mapper import PALETTES
+from converter import MODES, SAVE_PROFILES
+from result_cache import CACHE_VERSION
+from worker_pool import make_converter
+
+# Command line for bulk conversion: night-owl convert SRC... -o DIR walks
+# files and directory trees and converts every PDF in a pool of --jobs
+# processes. Each finished file is appended to a manifest in DIR (input
+# hash, settings, output), so a rerun - with new files in the archive, or
+# after a crash half way through it - only converts what is new, changed
+# or failed.
+#
+#   python cli.py convert archive/ -o dark/ --jobs 4   (or ./night-owl ...)
+
+MANIFEST_NAME = "night-owl-manifest.jsonl"
+HASH_CHUNK = 1024 * 1024
+
+
+class Manifest:
+    """
+    Append-only JSON Lines record of finished files, the last line per
+    input wins. Every line is flushed and fsynced as it is written, so a
+    crash loses at most the line being written - and a torn last line is
+    skipped on the next load.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.records = {}
+        torn = False
+        if os.path.exists(path):
+            with open(path, encoding="utf-8") as f:
+                for line in f:
+                    torn = not line.endswith("\n")
+                    try:
+                        record = json.loads(line)
+                    except ValueError:
+                        continue
+                    self.records[record["input"]] = record
+        self._file = open(path, "a", encoding="utf-8")
+        if torn:
+            self._file.write("\n")
+
+    def add(self, record):
+        self.records[record["input"]] = record
+        self._file.write(json.dumps(record, sort_keys=True) + "\n")
+        self._file.flush()
+        os.fsync(self._file.fileno())
+
+    def close(self):
+        self._file.close()
+
+
+def find_pdfs(sources, out_dir):
+    """
+    (input path, output path) of every PDF in sources: files as given,
+    directories walked in sorted order. Outputs are dark_<name>, in the
+    same folders relative to their source as the inputs.
+    """
+    out_root = os.path.abspath(out_dir)
+    pairs = []
+    for source in sources:
+        if not os.path.isdir(source):
+            pairs.append((source, os.path.join(out_dir, "dark_" + os.path.basename(source))))
+            continue
+        for root, dirs, files in os.walk(source):
+            # The output directory may sit inside a source
+            dirs[:] = sorted(d for d in dirs if os.path.abspath(os.path.join(root, d)) != out_root)
+            folder = os.path.normpath(os.path.join(out_dir, os.path.relpath(root, source)))
+            for name in sorted(files):
+                if name.lower().endswith(".pdf"):
+                    pairs.append((os.path.join(root, name), os.path.join(folder, "dark_" + name)))
+    return pairs
+
+
+def claim_outputs(pairs):
+    """
+    Split pairs into (kept, collisions). An input given twice is kept
+    once. When different inputs map to the same output (archive/2023/a.pdf
+    and archive/2024/a.pdf given as two sources, say) the first one keeps
+    it; the others are collisions as (input path, error).
+    """
+    owners, kept, collisions = {}, [], []
+    for input_path, output_path in pairs:
+        source, output = os.path.abspath(input_path), os.path.abspath(output_path)
+        owner = owners.setdefault(output, source)
+        if owner == source:
+            if (input_path, output_path) not in kept:
+                kept.append((input_path, output_path))
+        else:
+            collisions.append((input_path, f"output {output_path} is already written for {owner}"))
+    return kept, collisions
+
+
+def file_sha256(path):
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(HASH_CHUNK), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def plan(pairs, manifest, settings, skip_failed=False):
+    """
+    Split pairs into (to convert, skipped). A file is skipped when the
+    manifest has it converted from the same bytes with the same settings
+    and its output is still there; with skip_failed, also when it failed
+    that way. An unchanged size and mtime stand for the same bytes, so a
+    rerun over a large archive only hashes files that were touched.
+    """
+    todo, skipped = [], []
+    for input_path, output_path in pairs:
+        record = manifest.records.get(os.path.abspath(input_path))
+        if record is None or record["settings"] != settings:
+            todo.append((input_path, output_path))
+            continue
+        stat = os.stat(input_path)
+        same_stat = (record["size"], record["mtime_ns"]) == (stat.st_size, stat.st_mtime_ns)
+        if not same_stat and record["sha256"] != file_sha256(input_path):
+            todo.append((input_path, output_path))
+            continue
+        if record["status"] == "converted":
+            done = (record["output"] == os.path.abspath(output_path) and os.path.exists(output_path)
+                    and os.path.getsize(output_path) == record["output_bytes"])
+        else:
+            done = skip_failed
+        if not done:
+            todo.append((input_path, output_path))
+            continue
+        if not same_stat:
+            # Touched but unchanged: remember the new mtime, no hashing next time
+            manifest.add(dict(record, size=stat.st_size, mtime_ns=stat.st_mtime_ns))
+        skipped.append((input_path, output_path))
+    return todo, skipped
+
+
+# --- Worker process side ---
+
+_converter = None
+
+
+def _init_worker(config):
+    global _converter
+    # Ctrl+C is handled by the parent
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    _converter = make_converter(config)
+
+
+def _convert_file(input_path, output_path):
+    """
+    Convert one file. The output is written next to its final name and
+    renamed into place, so it is either complete or not there at all.
+    Returns (sha256, size, mtime_ns) of the input as read, then
+    (pages, seconds, output bytes).
+    """
+    start = time.monotonic()
+    with open(input_path, "rb") as f:
+        stat = os.fstat(f.fileno())
+        data = f.read()
+    output = _converter.convert_bytes(data)
+    os.makedirs(os.path.dirname(output_path) or ".", exist_ok=True)
+    partial = output_path + ".part"
+    with open(partial, "wb") as f:
+        f.write(output)
+    os.replace(partial, output_path)
+    return (hashlib.sha256(data).hexdigest(), stat.st_size, stat.st_mtime_ns,
+            _converter.last_stats.get("pages", 0), time.monotonic() - start, len(output))
+
+
+# --- Parent side ---
+
+class Summary:
+    """Counts of a run and its failures, for progress lines and the final report."""
+
+    def __init__(self, total, skipped):
+        self.start = time.monotonic()
+        self.total = total
+        self.skipped = skipped
+        self.converted = 0
+        self.pages = 0
+        self.failures = []
+
+    @property
+    def finished(self):
+        return self.converted + len(self.failures)
+
+    def rates(self):
+        """(seconds, files/s, pages/s) so far."""
+        seconds = max(time.monotonic() - self.start, 1e-9)
+        return seconds, self.converted / seconds, self.pages / seconds
+
+    def report(self):
+        seconds, files_rate, pages_rate = self.rates()
+        lines = [f"Converted {self.converted} files ({self.pages} pages) in {seconds:.1f} s: "
+                 f"{files_rate:.2f} files/s, {pages_rate:.1f} pages/s"]
+        if self.skipped:
+            lines.append(f"Skipped {self.skipped} files converted before")
+        if self.failures:
+            lines.append(f"Failed {len(self.failures)}:")
+            lines += [f"  {path}: {error}" for path, error in self.failures]
+        return "\n".join(lines)
+
+
+def convert_files(todo, manifest, settings, config, jobs, summary, log=print):
+    """
+    Convert todo in a pool of jobs processes, recording each file in the
+    manifest as it finishes. When a file takes its worker process down
+    (MuPDF crashes, the OOM killer), every file that was in flight is
+    retried at the end, alone, so only the one to blame is failed.
+    """
+    pending = deque(todo)
+    suspects = deque()
+    running = {}
+    executor = None
+    try:
+        while pending or suspects or running:
+            if executor is None:
+                executor = ProcessPoolExecutor(max_workers=jobs, initializer=_init_worker, initargs=(config,))
+            # Keep every worker busy with one more file queued behind it
+            while pending and len(running) < jobs * 2:
+                pair = pending.popleft()
+                running[executor.submit(_convert_file, *pair)] = (pair, False)
+            if not pending and not running and suspects:
+                pair = suspects.popleft()
+                running[executor.submit(_convert_file, *pair)] = (pair, True)
+            done, _ = wait(running, return_when=FIRST_COMPLETED)
+            broken = any(isinstance(future.exception(), BrokenProcessPool) for future in done)
+            if broken:
+                # A broken pool fails everything in flight: collect all of it, then start a new pool
+                done = wait(running)[0]
+            for future in done:
+                (input_path, output_path), alone = running.pop(future)
+                try:
+                    digest, size, mtime_ns, pages, seconds, output_bytes = future.result()
+                except BrokenProcessPool:
+                    if not alone:
+                        suspects.append((input_path, output_path))
+                        continue
+                    error = "Worker process died while converting this file"
+                except Exception as e:
+                    error = str(e) or type(e).__name__
+                else:
+                    manifest.add(_record(input_path, output_path, settings, "converted", sha256=digest,
+                                         size=size, mtime_ns=mtime_ns, pages=pages, seconds=round(seconds, 3),
+                                         output_bytes=output_bytes))
+                    summary.converted += 1
+                    summary.pages += pages
+                    _progress(log, summary, f"converted {input_path} ({pages} pages, {seconds:.1f} s)")
+                    continue
+                stat = os.stat(input_path) if os.path.exists(input_path) else None
+                manifest.add(_record(input_path, output_path, settings, "failed", error=error,
+                                     sha256=file_sha256(input_path) if stat else None,
+                                     size=stat.st_size if stat else None,
+                                     mtime_ns=stat.st_mtime_ns if stat else None))
+                summary.failures.append((input_path, error))
+                _progress(log, summary, f"failed {input_path}: {error}")
+            if broken:
+                executor.shutdown(wait=False)
+                executor = None
+    finally:
+        if executor is not None:
+            # Interrupted: files in flight finish in the background, unrecorded
+            executor.shutdown(wait=False, cancel_futures=True)
+
+
+def _record(input_path, output_path, settings, status, **fields):
+    record = {
+        "input": os.path.abspath(input_path),
+        "output": os.path.abspath(output_path),
+        "settings": settings,
+        "status": status,
+        "finished": round(time.time(), 3),
+    }
+    record.update(fields)
+    return record
+
+
+def _progress(log, summary, message):
+    _seconds, files_rate, _pages_rate = summary.rates()
+    log(f"[{summary.finished}/{summary.total}] {message} - {files_rate:.2f} files/s")
+
+
+def run_convert(args):
+    os.makedirs(args.output, exist_ok=True)
+    config = {
+        "palette": args.palette,
+        "mode": args.mode,
+        "save_profile": args.save_profile,
+        "max_pages": args.max_pages,
+        "time_limit": args.time_limit,
+    }
+    converter = make_converter(config)
+    settings = dict(converter.settings(), version=CACHE_VERSION)
+    manifest = Manifest(os.path.join(args.output, MANIFEST_NAME))
+    log = (lambda message: None) if args.quiet else (lambda message: print(message, flush=True))
+    try:
+        pairs, collisions = claim_outputs(find_pdfs(args.sources, args.output))
+        todo, skipped = plan(pairs, manifest, settings, args.skip_failed)
+        log(f"{len(pairs) + len(collisions)} PDFs: {len(skipped)} converted before, {len(todo)} to convert "
+            f"with {args.jobs} jobs")
+        summary = Summary(len(todo) + len(collisions), len(skipped))
+        for input_path, error in collisions:
+            # Not in the manifest: nothing was converted, and a rerun must report it again
+            summary.failures.append((input_path, error))
+            _progress(log, summary, f"failed {input_path}: {error}")
+        try:
+            convert_files(todo, manifest, settings, config, args.jobs, summary, log)
+        except KeyboardInterrupt:
+            print("Interrupted - run the same command again to resume", file=sys.stderr)
+            print(summary.report())
+            return 130
+    finally:
+        manifest.close()
+    print(summary.report())
+    print(f"Manifest: {manifest.path}")
+    return 1 if summary.failures else 0
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="night-owl", description="Night Owl PDF dark mode converter")
+    commands = parser.add_subparsers(dest="command", required=True)
+    convert = commands.add_parser("convert", help="convert PDFs and directories of PDFs",
+                                  description="Convert PDFs and directory trees of PDFs into DIR. "
+                                              "Reruns skip files converted before and unchanged since.")
+    convert.add_argument("sources", nargs="+", metavar="SRC", help="PDF file or directory (walked recursively)")
+    convert.add_argument("-o", "--output", required=True, metavar="DIR", help="output directory (holds the manifest)")
+    convert.add_argument("-j", "--jobs", type=int, default=os.cpu_count() or 1,
+                         help="conversions at once (default: one per core)")
+    convert.add_argument("--palette", default="dark", choices=sorted(PALETTES))
+    convert.add_argument("--mode", default="overlay", choices=MODES)
+    convert.add_argument("--save-profile", default="auto", choices=tuple(SAVE_PROFILES) + ("auto",))
+    convert.add_argument("--max-pages", type=int, default=None, help="refuse documents with more pages")
+    convert.add_argument("--time-limit", type=float, default=None, help="give up on a file after this many seconds (checked between pages, "
+                              "a single page that hangs is not interrupted)")
+    convert.add_argument("--skip-failed", action="store_true",
+                         help="do not retry files that failed before and are unchanged")
+    convert.add_argument("-q", "--quiet", action="store_true", help="no progress lines, only the summary")
+    args = parser.parse_args(argv)
+
+    missing = [source for source in args.sources if not os.path.exists(source)]
+    if missing:
+        parser.error(f"no such file or directory: {', '.join(missing)}")
+    if args.jobs < 1:
+        parser.error("--jobs must be at least 1")
+    return run_convert(args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
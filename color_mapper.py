@@ -0,0 +1,149 @@
+class Palette:
+    """
+    A color scheme for the converter.
+
+    background / text: RGB tuples (0-1) that white paper and black ink map to.
+    colored: what happens to colors that are neither white nor black -
+        "keep" leaves them as they are, "invert" flips their luminance
+        while keeping hue (dark blue becomes light blue).
+    uniform_text: if True all text gets the text color, otherwise text
+        colors go through the same rules as drawings.
+    """
+
+    def __init__(self, name, background, text, colored="keep", uniform_text=True):
+        self.name = name
+        self.background = tuple(background)
+        self.text = tuple(text)
+        self.colored = colored
+        self.uniform_text = uniform_text
+
+    def __repr__(self):
+        return f"Palette({self.name!r})"
+
+
+PALETTES = {
+    # Soft dark theme - easier on the eyes than pure black
+    "dark": Palette("dark", (0.1, 0.1, 0.1), (0.96, 0.96, 0.96)),
+    # Warm, low-glare paper look
+    "sepia": Palette("sepia", (0.96, 0.91, 0.8), (0.36, 0.26, 0.15)),
+    # Pure black/white with inverted colors for charts and highlights
+    "high-contrast": Palette("high-contrast", (0.0, 0.0, 0.0), (1.0, 1.0, 1.0), colored="invert"),
+    # Dark theme that also flips colored lines and text (keeps their hue)
+    "invert": Palette("invert", (0.1, 0.1, 0.1), (0.96, 0.96, 0.96), colored="invert", uniform_text=False),
+}
+
+
+def normalize_color(color):
+    """
+    Canonical RGB key (floats 0-1, 4 decimals) for any PyMuPDF color:
+    sRGB int (0xRRGGBB), gray/RGB/CMYK sequences in 0-1 floats or
+    0-255 ints. Returns None for no color.
+    """
+    if color is None:
+        return None
+    if isinstance(color, int):
+        rgb = ((color >> 16) & 0xFF, (color >> 8) & 0xFF, color & 0xFF)
+        return tuple(round(c / 255, 4) for c in rgb)
+    if not isinstance(color, (tuple, list)) or not color:
+        return None
+    if all(isinstance(c, float) for c in color):
+        values = [float(c) for c in color]
+    else:
+        # 0-255 int range
+        values = [c / 255 for c in color]
+    if len(values) == 1:
+        values = values * 3
+    elif len(values) == 4:
+        c, m, y, k = values
+        values = [(1 - c) * (1 - k), (1 - m) * (1 - k), (1 - y) * (1 - k)]
+    elif len(values) != 3:
+        return None
+    return tuple(round(v, 4) for v in values)
+
+
+def invert_luminance(rgb):
+    """Flip luminance L -> 1 - L, keeping hue (every channel shifts by 1 - 2L)."""
+    r, g, b = rgb
+    shift = 1.0 - 2.0 * (0.299 * r + 0.587 * g + 0.114 * b)
+    return tuple(round(min(1.0, max(0.0, c + shift)), 4) for c in rgb)
+
+
+class ColorMapper:
+    """
+    Maps source colors to output colors for a Palette.
+
+    Every color is normalized to a canonical RGB key first, and the result
+    for each (key, role) is cached, so each distinct color in a document is
+    classified and mapped only once.
+
+    Roles:
+        "stroke"  - lines: black becomes the text color. None (the PDF
+                    default, black) counts as black.
+        "fill"    - areas: white becomes the background.
+        "text"    - text: the text color, unless the palette maps text
+                    like drawings.
+        "content" - raw content-stream colors, where text and areas cannot
+                    be told apart: black -> text color, white -> background.
+    """
+
+    max_entries = 4096
+
+    def __init__(self, palette="dark"):
+        if isinstance(palette, str):
+            palette = PALETTES[palette]
+        self.palette = palette
+        self.table = {}   # (canonical key, role) -> output color
+        self.cache = {}   # (color as given, its element types, role) -> output color
+
+    def is_white(self, color):
+        key = normalize_color(color)
+        return key is not None and all(c > 0.9 for c in key)
+
+    def is_black(self, color):
+        key = normalize_color(color)
+        return key is not None and all(c < 0.1 for c in key)
+
+    def map(self, color, role):
+        """Output color for color in the given role (see class docstring)."""
+        # (1, 1, 1) == (1.0, 1.0, 1.0), but one is near-black 0-255 ints and
+        # the other white 0-1 floats: the element types are part of the key
+        cache_key = (color, tuple(map(type, color)) if isinstance(color, tuple) else type(color), role)
+        try:
+            return self.cache[cache_key]
+        except (KeyError, TypeError):
+            # Not seen yet, or an unhashable list
+            pass
+
+        if color is None:
+            result = self.palette.text if role == "stroke" else None
+        else:
+            key = normalize_color(color)
+            if key is None:
+                return color
+            result = self.table.get((key, role))
+            if result is None:
+                result = self.table[(key, role)] = self._compute(key, role)
+
+        if len(self.cache) >= self.max_entries:
+            self.cache.clear()
+        try:
+            self.cache[cache_key] = result
+        except TypeError:
+            pass
+        return result
+
+    def _compute(self, key, role):
+        palette = self.palette
+        if role == "text" and palette.uniform_text:
+            return palette.text
+        black = all(c < 0.1 for c in key)
+        white = all(c > 0.9 for c in key)
+        if black and role in ("stroke", "text", "content"):
+            return palette.text
+        if white and role in ("fill", "text", "content"):
+            return palette.background
+        if black or white:
+            return key
+        if palette.colored == "invert":
+            return invert_luminance(key)
+        return key
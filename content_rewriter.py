@@ -0,0 +1,229 @@
+import re
+
+# Content-stream color rewriting.
+#
+# Instead of capturing and redrawing everything, this engine walks the raw
+# content stream of a page (and of the Form XObjects it uses), and replaces
+# the operands of the color operators only. Fonts, geometry, clipping and
+# images stay exactly as they were.
+
+
+class ContentStreamError(ValueError):
+    """Raised when a content stream cannot be tokenized safely."""
+
+
+_TOKEN = re.compile(rb"""
+    (?P<ws>[\x00\t\n\x0c\r ]+)
+  | (?P<comment>%[^\r\n]*)
+  | (?P<name>/[^\x00\t\n\x0c\r ()<>\[\]{}/%]*)
+  | (?P<dict><<|>>)
+  | (?P<hex><[0-9A-Fa-f\x00\t\n\x0c\r ]*>)
+  | (?P<string>\()
+  | (?P<delim>[\[\]{}])
+  | (?P<word>[^\x00\t\n\x0c\r ()<>\[\]{}/%]+)
+""", re.X)
+
+_NUMBER = re.compile(rb"[+-]?(?:\d+\.?\d*|\.\d+)\Z")
+
+# End of inline image data: whitespace, EI, then whitespace or end of data
+_INLINE_IMAGE_END = re.compile(rb"[\x00\t\n\x0c\r ]EI(?=[\x00\t\n\x0c\r ]|\Z)")
+
+OPERATORS = frozenset(b"""
+    b B b* B* BDC BI BMC BT BX c cm CS cs d d0 d1 Do DP EI EMC ET EX f F f*
+    G g gs h i ID j J K k l m M MP n q Q re RG rg ri s S SC sc SCN scn sh
+    T* Tc Td TD Tf Tj TJ TL Tm Tr Ts Tw Tz v w W W* y ' " true false null
+""".split())
+
+# Operators that set a color, and whether they apply to stroking
+FILL_OPS = {b"g": "gray", b"rg": "rgb", b"k": "cmyk", b"sc": None, b"scn": None}
+STROKE_OPS = {b"G": "gray", b"RG": "rgb", b"K": "cmyk", b"SC": None, b"SCN": None}
+COMPONENTS = {"gray": 1, "rgb": 3, "cmyk": 4}
+
+DEVICE_SPACES = {
+    b"/DeviceGray": "gray", b"/CalGray": "gray", b"/G": "gray",
+    b"/DeviceRGB": "rgb", b"/CalRGB": "rgb", b"/RGB": "rgb",
+    b"/DeviceCMYK": "cmyk", b"/CMYK": "cmyk",
+}
+
+_NOT_A_NUMBER = object()
+
+
+def _string_end(data, pos):
+    """Return the index after the literal string starting at data[pos] == '('."""
+    depth = 0
+    i = pos
+    n = len(data)
+    while i < n:
+        ch = data[i]
+        if ch == 0x5C:  # backslash - skip the escaped byte
+            i += 2
+            continue
+        if ch == 0x28:
+            depth += 1
+        elif ch == 0x29:
+            depth -= 1
+            if depth == 0:
+                return i + 1
+        i += 1
+    raise ContentStreamError("unterminated string")
+
+
+def to_rgb(family, values):
+    """Convert gray/rgb/cmyk components (0-1) to an RGB float tuple."""
+    if family == "gray":
+        v = float(values[0])
+        return (v, v, v)
+    if family == "rgb":
+        return tuple(float(v) for v in values)
+    c, m, y, k = values
+    return (float((1 - c) * (1 - k)), float((1 - m) * (1 - k)), float((1 - y) * (1 - k)))
+
+
+def format_number(value):
+    """Format a number for a content stream (no exponent notation)."""
+    text = ("%.4f" % value).rstrip("0").rstrip(".")
+    return text if text not in ("", "-0") else "0"
+
+
+def color_operator(rgb, stroke):
+    """Device color operator that sets rgb, gray if possible."""
+    r, g, b = rgb
+    if r == g == b:
+        return f"{format_number(r)} {'G' if stroke else 'g'}".encode()
+    return f"{format_number(r)} {format_number(g)} {format_number(b)} {'RG' if stroke else 'rg'}".encode()
+
+
+def device_operator(family, values, stroke):
+    """The g/rg/k (or G/RG/K) operator for values in a device family."""
+    op = {"gray": "g", "rgb": "rg", "cmyk": "k"}[family]
+    if stroke:
+        op = op.upper()
+    return (" ".join(format_number(v) for v in values) + " " + op).encode()
+
+
+def rewrite_stream(data, map_color, resolve_colorspace=None, initial=None):
+    """
+    Rewrite the color operators of a content stream.
+
+    map_color(rgb, stroke) returns the new RGB tuple for an RGB input.
+    resolve_colorspace(name) returns "gray", "rgb", "cmyk" or None for a
+    color space resource name (e.g. b"/CS0"); None leaves colors in that
+    space untouched. initial, if given, is prepended to set the default
+    (black) fill and stroke colors.
+
+    Returns the new stream as bytes. Raises ContentStreamError if the
+    stream cannot be tokenized.
+    """
+    out = []
+    if initial:
+        out.append(initial)
+    last = 0            # end of the part of data already copied to out
+    operands = []       # (start, value) since the last operator
+    fill_space = stroke_space = "gray"
+    saved = []          # color space stack for q/Q
+    compat = 0          # BX/EX nesting - unknown operators are allowed inside
+    spaces = {}
+
+    def family(name):
+        if name in DEVICE_SPACES:
+            return DEVICE_SPACES[name]
+        if name not in spaces:
+            spaces[name] = resolve_colorspace(name) if resolve_colorspace else None
+        return spaces[name]
+
+    pos = 0
+    n = len(data)
+    match = _TOKEN.match
+    while pos < n:
+        m = match(data, pos)
+        if m is None:
+            raise ContentStreamError(f"unexpected byte at offset {pos}")
+        kind = m.lastgroup
+        start = pos
+        pos = m.end()
+
+        if kind == "ws" or kind == "comment":
+            continue
+        if kind == "string":
+            pos = _string_end(data, start)
+            operands.append((start, _NOT_A_NUMBER))
+            continue
+        if kind == "name":
+            operands.append((start, m.group()))
+            continue
+        if kind != "word":
+            operands.append((start, _NOT_A_NUMBER))
+            continue
+
+        word = m.group()
+        if _NUMBER.match(word):
+            operands.append((start, float(word)))
+            continue
+
+        # --- An operator ---
+        if word not in OPERATORS and not compat:
+            raise ContentStreamError(f"unknown operator {word!r}")
+
+        if word == b"ID":
+            # Inline image data is binary - jump to the matching EI
+            end = _INLINE_IMAGE_END.search(data, pos + 1)
+            if end is None:
+                raise ContentStreamError("unterminated inline image")
+            pos = end.end()
+        elif word == b"BX":
+            compat += 1
+        elif word == b"EX":
+            compat = max(0, compat - 1)
+        elif word == b"q":
+            saved.append((fill_space, stroke_space))
+        elif word == b"Q":
+            if saved:
+                fill_space, stroke_space = saved.pop()
+        elif word == b"cs" or word == b"CS":
+            if operands and isinstance(operands[-1][1], bytes):
+                space = family(operands[-1][1])
+                stroke = word == b"CS"
+                if stroke:
+                    stroke_space = space
+                else:
+                    fill_space = space
+                if space is not None:
+                    # cs/CS also resets the color to the space's initial
+                    # value, black - which needs mapping like any other black
+                    black = (0.0, 0.0, 0.0)
+                    new_rgb = map_color(black, stroke)
+                    if new_rgb != black:
+                        out.append(data[last:pos])
+                        out.append(b" " + color_operator(new_rgb, stroke))
+                        last = pos
+        elif word in FILL_OPS or word in STROKE_OPS:
+            stroke = word in STROKE_OPS
+            fam = (STROKE_OPS if stroke else FILL_OPS)[word]
+            generic = fam is None
+            if generic:
+                fam = stroke_space if stroke else fill_space
+            elif stroke:
+                stroke_space = fam
+            else:
+                fill_space = fam
+
+            count = COMPONENTS.get(fam)
+            values = [v for _, v in operands[-count:]] if count else []
+            if count and len(values) == count and all(isinstance(v, float) for v in values):
+                rgb = to_rgb(fam, values)
+                new_rgb = map_color(rgb, stroke)
+                if new_rgb != rgb or generic:
+                    # Replacements are device operators, which change the
+                    # current color space. sc/scn are therefore always turned
+                    # into their device equivalent too (sc in /DeviceGray == g),
+                    # so they never depend on a space we may have switched.
+                    out.append(data[last:operands[-count][0]])
+                    if new_rgb != rgb:
+                        out.append(color_operator(new_rgb, stroke))
+                    else:
+                        out.append(device_operator(fam, values, stroke))
+                    last = pos
+        operands = []
+
+    out.append(data[last:])
+    return b"".join(out)
@@ -0,0 +1,193 @@
+import os
+import sys
+import fitz  # PyMuPDF
+import numpy as np
+
+# Synthetic, reproducible benchmark documents. Every generator is
+# deterministic for a given page count (fixed seeds, no dates in the
+# metadata), so the same corpus gives the same bytes on every machine.
+
+SIZES = (1, 10, 100, 1000)
+# 1000-page documents take minutes to build and convert - opt in to them
+DEFAULT_SIZES = (1, 10, 100)
+
+
+def text_dense(pages):
+    """Two columns of small print, 120 lines per page - a paper or a manual."""
+    rng = np.random.default_rng(1)
+    words = ["dark", "mode", "page", "render", "vector", "glyph", "stream", "night",
+             "owl", "reader", "contrast", "layout", "column", "figure", "table"]
+    doc = fitz.open()
+    for i in range(pages):
+        page = doc.new_page()
+        page.insert_text((72, 50), f"Text-dense page {i + 1}", fontsize=14)
+        for column, x in enumerate((50, 310)):
+            for line in range(60):
+                text = " ".join(words[w] for w in rng.integers(0, len(words), 7))
+                page.insert_text((x, 75 + line * 12), text, fontsize=8,
+                                 fontname="helv" if column == 0 else "tiro")
+    return _finish(doc)
+
+
+def vector_dense(pages, paths=2000):
+    """paths short strokes and filled rectangles per page - a CAD plan or a chart."""
+    rng = np.random.default_rng(2)
+    doc = fitz.open()
+    for i in range(pages):
+        page = doc.new_page()
+        shape = page.new_shape()
+        for p in range(paths):
+            x, y = rng.uniform(20, 560), rng.uniform(20, 810)
+            if p % 4 == 0:
+                shape.draw_rect(fitz.Rect(x, y, x + rng.uniform(2, 20), y + rng.uniform(2, 20)))
+                shape.finish(fill=tuple(rng.uniform(0, 1, 3)), color=None)
+            else:
+                shape.draw_line((x, y), (x + rng.uniform(-15, 15), y + rng.uniform(-15, 15)))
+                shape.finish(color=(0, 0, 0), width=0.5)
+        shape.commit()
+        page.insert_text((72, 15), f"Vector-dense page {i + 1}", fontsize=9)
+    return _finish(doc)
+
+
+def image_heavy(pages, images=6):
+    """A caption per figure plus images distinct photo-like JPEGs per page."""
+    rng = np.random.default_rng(3)
+    doc = fitz.open()
+    for i in range(pages):
+        page = doc.new_page()
+        page.insert_text((72, 50), f"Image-heavy page {i + 1}", fontsize=14)
+        for n in range(images):
+            # Smooth gradient plus noise - compresses like a photo, not like flat color
+            gradient = np.linspace(0, 200, 160, dtype=np.float32)
+            pixels = gradient[None, :, None] + rng.normal(0, 20, (120, 160, 3))
+            pixels = np.clip(pixels, 0, 255).astype(np.uint8)
+            pix = fitz.Pixmap(fitz.csRGB, 160, 120, pixels.tobytes(), False)
+            x, y = 60 + (n % 2) * 250, 80 + (n // 2) * 240
+            page.insert_image(fitz.Rect(x, y, x + 220, y + 165), stream=pix.tobytes("jpeg", jpg_quality=75))
+            page.insert_text((x, y + 185), f"Figure {i + 1}.{n + 1}", fontsize=9)
+    return _finish(doc)
+
+
+def scanned(pages, dpi=150):
+    """Image-only pages: a text block rendered at dpi, with paper noise."""
+    rng = np.random.default_rng(4)
+    text_page = fitz.open()
+    page = text_page.new_page()
+    for i in range(45):
+        page.insert_text((72, 80 + i * 15), f"Scanned line {i}: lorem ipsum dolor sit amet", fontsize=10)
+    ink = text_page[0].get_pixmap(dpi=dpi, colorspace=fitz.csGRAY)
+    ink_samples = np.frombuffer(ink.samples, dtype=np.uint8).reshape(ink.height, ink.width)
+    text_page.close()
+
+    doc = fitz.open()
+    for _ in range(pages):
+        noise = rng.integers(0, 18, size=ink_samples.shape, dtype=np.uint8)
+        scan = np.clip(ink_samples.astype(np.int16) - noise, 0, 255).astype(np.uint8)
+        pix = fitz.Pixmap(fitz.csGRAY, ink.width, ink.height, scan.tobytes(), False)
+        page = doc.new_page()
+        page.insert_image(page.rect, stream=pix.tobytes("jpeg", jpg_quality=80))
+    return _finish(doc)
+
+
+def out_of_bounds(pages):
+    """Text and paths past the right and bottom edges - exercises page expansion."""
+    doc = fitz.open()
+    for i in range(pages):
+        page = doc.new_page()
+        page.insert_text((72, 72), f"Out-of-bounds page {i + 1}", fontsize=14)
+        for line in range(30):
+            # Lines run past the right edge
+            page.insert_text((400, 100 + line * 20), f"Overflowing line {line} " + "-" * 60, fontsize=11)
+        page.insert_text((72, page.rect.height + 30), "Below the bottom edge", fontsize=11)
+        page.draw_rect(fitz.Rect(500, 700, 700, 900), color=(0, 0, 0), width=1)
+    return _finish(doc)
+
+
+def mixed(pages):
+    """
+    A report: chapters of text, blank separator pages, full-page charts,
+    photo plates and a scanned appendix, in a repeating eight-page cycle.
+    """
+    rng = np.random.default_rng(5)
+    plate = fitz.Pixmap(fitz.csRGB, 160, 120, np.clip(
+        np.linspace(0, 200, 160)[None, :, None] + rng.normal(0, 20, (120, 160, 3)), 0, 255
+    ).astype(np.uint8).tobytes(), False).tobytes("jpeg", jpg_quality=75)
+    scan = fitz.open(stream=scanned(1), filetype="pdf")
+    doc = fitz.open()
+    for i in range(pages):
+        step = i % 8
+        page = doc.new_page()
+        if step in (0, 2, 6):
+            # Text, the first page of a cycle with a heading
+            if step == 0:
+                page.insert_text((72, 60), f"Chapter {i // 8 + 1}", fontsize=18)
+            for line in range(50):
+                page.insert_text((72, 90 + line * 14), f"Paragraph line {line}: " + "lorem ipsum " * 5,
+                                 fontsize=9)
+        elif step == 3:
+            # Chart: axes, grid and bars, no labels
+            shape = page.new_shape()
+            shape.draw_polyline([(72, 100), (72, 700), (540, 700)])
+            shape.finish(color=(0, 0, 0), width=1, closePath=False)
+            for n in range(40):
+                shape.draw_line((72, 700 - n * 15), (540, 700 - n * 15))
+                shape.finish(color=(0.8, 0.8, 0.8), width=0.25)
+            for n in range(24):
+                height = rng.uniform(50, 580)
+                shape.draw_rect(fitz.Rect(80 + n * 19, 700 - height, 94 + n * 19, 700))
+                shape.finish(color=None, fill=(0.2, 0.4, 0.8))
+            shape.commit()
+        elif step == 4:
+            # Photo plate
+            for n in range(4):
+                x, y = 60 + (n % 2) * 250, 100 + (n // 2) * 300
+                page.insert_image(fitz.Rect(x, y, x + 220, y + 165), stream=plate)
+        elif step == 7:
+            page.show_pdf_page(page.rect, scan, 0)
+        # steps 1 and 5: blank separator pages
+    return _finish(doc)
+
+
+KINDS = {
+    "text-dense": text_dense,
+    "vector-dense": vector_dense,
+    "image-heavy": image_heavy,
+    "scanned": scanned,
+    "out-of-bounds": out_of_bounds,
+    "mixed": mixed,
+}
+
+
+def _finish(doc):
+    # No creation/modification dates - identical bytes on every run
+    doc.set_metadata({})
+    data = doc.tobytes(garbage=1, deflate=True, no_new_id=True)
+    doc.close()
+    return data
+
+
+def generate(kind, pages):
+    """PDF bytes of corpus document kind with pages pages."""
+    return KINDS[kind](pages)
+
+
+def build(directory, kinds=None, sizes=DEFAULT_SIZES):
+    """Write <kind>-<pages>.pdf for every kind and size. Returns the paths."""
+    os.makedirs(directory, exist_ok=True)
+    paths = []
+    for kind in kinds or KINDS:
+        for pages in sizes:
+            path = os.path.join(directory, f"{kind}-{pages}.pdf")
+            if not os.path.exists(path):
+                with open(path, "wb") as f:
+                    f.write(generate(kind, pages))
+            paths.append(path)
+    return paths
+
+
+if __name__ == "__main__":
+    # python corpus.py [directory] [sizes, e.g. 1,10,100,1000]
+    directory = sys.argv[1] if len(sys.argv) > 1 else "corpus"
+    sizes = tuple(int(n) for n in sys.argv[2].split(",")) if len(sys.argv) > 2 else DEFAULT_SIZES
+    for path in build(directory, sizes=sizes):
+        print(f"{path}: {os.path.getsize(path) / 1e6:.2f} MB")
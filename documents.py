@@ -0,0 +1,82 @@
+import json
+import os
+import shutil
+import time
+from storage import checked_id, is_id, new_id, write_atomic
+
+
+class DocumentStore:
+    """
+    Uploaded documents kept server-side for page-by-page conversion.
+
+    <directory>/<id>/source.pdf is the upload, meta.json its file name and
+    page count, and pages/ the pages converted so far: <n>.pdf, and
+    <n>-<dpi>.png for rendered ones. Documents not accessed for ttl
+    seconds are removed by cleanup().
+    """
+
+    def __init__(self, directory, ttl=3600):
+        self.directory = directory
+        self.ttl = ttl
+        os.makedirs(directory, exist_ok=True)
+
+    def _doc_dir(self, doc_id):
+        return os.path.join(self.directory, checked_id(doc_id))
+
+    def add(self, data, filename, page_count):
+        """Store an uploaded PDF and return its id."""
+        doc_id = new_id()
+        os.makedirs(os.path.join(self._doc_dir(doc_id), "pages"))
+        write_atomic(self.source_path(doc_id), data)
+        meta = {"id": doc_id, "filename": filename, "pages": page_count, "created": time.time()}
+        write_atomic(os.path.join(self._doc_dir(doc_id), "meta.json"), json.dumps(meta).encode())
+        return doc_id
+
+    def meta(self, doc_id):
+        """meta.json of a document (and mark it used), or None if unknown/expired."""
+        try:
+            path = os.path.join(self._doc_dir(doc_id), "meta.json")
+            with open(path) as f:
+                meta = json.load(f)
+        except (KeyError, FileNotFoundError):
+            return None
+        os.utime(self._doc_dir(doc_id))
+        return meta
+
+    def source_path(self, doc_id):
+        return os.path.join(self._doc_dir(doc_id), "source.pdf")
+
+    def page_path(self, doc_id, number, dpi=None):
+        """Where converted page number (1-based) is kept, as PDF or as PNG at dpi."""
+        name = f"{number}.pdf" if dpi is None else f"{number}-{dpi}.png"
+        return os.path.join(self._doc_dir(doc_id), "pages", name)
+
+    def read_page(self, doc_id, number, dpi=None):
+        """The converted page if it was produced before, else None."""
+        try:
+            with open(self.page_path(doc_id, number, dpi), "rb") as f:
+                return f.read()
+        except FileNotFoundError:
+            return None
+
+    def write_page(self, doc_id, number, data, dpi=None):
+        write_atomic(self.page_path(doc_id, number, dpi), data)
+
+    def delete(self, doc_id):
+        shutil.rmtree(self._doc_dir(doc_id), ignore_errors=True)
+
+    def cleanup(self, now=None):
+        """Remove documents not used for ttl seconds. Returns how many were removed."""
+        now = now or time.time()
+        removed = 0
+        for doc_id in os.listdir(self.directory):
+            if not is_id(doc_id):
+                continue
+            try:
+                used = os.path.getmtime(self._doc_dir(doc_id))
+            except FileNotFoundError:
+                continue
+            if now - used > self.ttl:
+                self.delete(doc_id)
+                removed += 1
+        return removed
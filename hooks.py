@@ -0,0 +1,34 @@
+class ConversionHook:
+    """
+    Receives the measurements of PDFDarkThemeConverter - add instances to
+    converter.hooks and override what you need.
+
+    page_done() is called for every converted page (not for pages copied
+    from the page cache) with the page's total seconds, its seconds per
+    stage and its counts: spans, paths, images, font_fallbacks (spans
+    redrawn in a substitute font), errors (swallowed exceptions - runs,
+    paths or images dropped to keep the page) and, for pages the overlay
+    or auto engine classified, <class>_pages (1 for the page's
+    page_classifier class, e.g. text_only_pages). document_done() gets
+    converter.last_stats once a document is converted and saved.
+
+    Hooks run in the converting process. For parallel conversions the
+    page_done() calls of the shards are replayed in the parent once the
+    shards are back.
+    """
+
+    def page_done(self, pno, seconds, stages, counts):
+        pass
+
+    def document_done(self, stats):
+        pass
+
+
+class PageLog(ConversionHook):
+    """Keeps every page_done() call as a (pno, seconds, stages, counts) tuple."""
+
+    def __init__(self):
+        self.pages = []
+
+    def page_done(self, pno, seconds, stages, counts):
+        self.pages.append((pno, seconds, stages, counts))
@@ -0,0 +1,90 @@
+import fitz  # PyMuPDF
+from content_rewriter import format_number
+
+# MuPDF reports image transforms for a y-down image space, PDF draws the
+# unit square y-up. This flip converts between the two (it is its own inverse).
+_IMAGE_FLIP = fitz.Matrix(1, 0, 0, -1, 0, 1)
+
+
+class ImagePlacementIndex:
+    """
+    Document-wide index of where images are drawn.
+
+    Maps image xref -> list of (page number, rect, PDF matrix). It is built
+    with one get_image_info() call per page, which interprets the page's
+    content stream once, instead of one get_image_rects() call per image.
+    Rect and matrix are in the page's default user space (PDF coordinates),
+    so they stay valid when the MediaBox is changed later.
+    """
+
+    def __init__(self):
+        self.placements = {}   # xref -> [(pno, rect, matrix)]
+        self.pages = {}        # pno -> [(xref, rect, matrix)]
+
+    def add_page(self, page):
+        """Index the images drawn on page and return its placements."""
+        to_pdf = ~page.transformation_matrix
+        seen = set()
+        page_placements = []
+        for info in page.get_image_info(xrefs=True):
+            xref = info["xref"]
+            if not xref:
+                # Inline image - lives in the content stream, nothing to reference
+                continue
+            matrix = _IMAGE_FLIP * fitz.Matrix(info["transform"]) * to_pdf
+            key = (xref, tuple(round(v, 3) for v in matrix))
+            if key in seen:
+                # Same image drawn twice at the same spot
+                continue
+            seen.add(key)
+            placement = (xref, fitz.Rect(info["bbox"]) * to_pdf, matrix)
+            page_placements.append(placement)
+            self.placements.setdefault(xref, []).append((page.number, placement[1], matrix))
+        self.pages[page.number] = page_placements
+        return page_placements
+
+    def placement_count(self):
+        return sum(len(p) for p in self.placements.values())
+
+
+def redraw_images(page, placements):
+    """
+    Draw the indexed images again on top of the page.
+
+    Images referenced from the page's own resources are emitted as
+    "q <matrix> cm /Name Do Q" in a single appended content stream, i.e.
+    as references to the existing image XObject. Images that only live
+    inside a Form XObject fall back to insert_image (which also re-uses
+    the xref rather than embedding a copy). Returns the number of
+    placements that could not be redrawn.
+    """
+    if not placements:
+        return 0
+    doc = page.parent
+    names = {}
+    for item in page.get_images(full=True):
+        xref, name, referencer = item[0], item[7], item[9]
+        if referencer == 0:
+            names.setdefault(xref, name)
+
+    ops = []
+    failed = 0
+    for xref, rect, matrix in placements:
+        name = names.get(xref)
+        if name is None:
+            try:
+                page.insert_image(rect * page.transformation_matrix, xref=xref, overlay=True)
+            except Exception:
+                failed += 1
+            continue
+        ops.append("q %s cm /%s Do Q" % (" ".join(format_number(v) for v in matrix), name))
+
+    if ops:
+        if not page.is_wrapped:
+            page.wrap_contents()
+        xref = doc.get_new_xref()
+        doc.update_object(xref, "<<>>")
+        doc.update_stream(xref, ("\n".join(ops) + "\n").encode())
+        contents = page.get_contents() + [xref]
+        doc.xref_set_key(page.xref, "Contents", "[%s]" % " ".join(f"{x} 0 R" for x in contents))
+    return failed
@@ -0,0 +1,155 @@
+import json
+import os
+import shutil
+import time
+from storage import checked_id, is_id, new_id, write_atomic
+
+FINISHED = ("done", "failed")
+
+
+class JobStore:
+    """
+    Conversion jobs kept on disk, so every gunicorn worker can answer for
+    any job: <directory>/<job id>/state.json holds status and progress,
+    result.pdf the converted file.
+
+    Status goes queued -> running -> done | failed. Finished jobs are
+    removed ttl seconds after they finished (see cleanup()); jobs whose
+    state has not changed for ttl seconds are treated as abandoned.
+    """
+
+    def __init__(self, directory, ttl=3600):
+        self.directory = directory
+        self.ttl = ttl
+        os.makedirs(directory, exist_ok=True)
+
+    def _job_dir(self, job_id):
+        return os.path.join(self.directory, checked_id(job_id))
+
+    def create(self, filename):
+        """Register a new queued job and return its id."""
+        job_id = new_id()
+        os.makedirs(self._job_dir(job_id))
+        self._write(job_id, {
+            "id": job_id,
+            "filename": filename,
+            "status": "queued",
+            "pages_done": 0,
+            "pages_total": None,
+            "created": time.time(),
+            "started": None,
+            "finished": None,
+            "error": None,
+            "error_type": None,
+        })
+        return job_id
+
+    def _write(self, job_id, state):
+        write_atomic(os.path.join(self._job_dir(job_id), "state.json"), json.dumps(state).encode())
+
+    def _read(self, job_id):
+        try:
+            with open(os.path.join(self._job_dir(job_id), "state.json")) as f:
+                return json.load(f)
+        except (KeyError, FileNotFoundError):
+            return None
+
+    def state(self, job_id):
+        """
+        Current state of a job, or None if it does not exist (any more).
+        Running jobs get an eta_seconds estimate from their page rate.
+        """
+        state = self._read(job_id)
+        if state is None:
+            return None
+        state["eta_seconds"] = None
+        done, total = state["pages_done"], state["pages_total"]
+        if state["status"] == "running" and done and total:
+            elapsed = time.time() - state["started"]
+            state["eta_seconds"] = round(elapsed / done * (total - done), 1)
+        elif state["status"] == "done":
+            state["eta_seconds"] = 0
+        return state
+
+    def update(self, job_id, **fields):
+        state = self._read(job_id)
+        if state is None:
+            return
+        state.update(fields)
+        self._write(job_id, state)
+
+    def result_path(self, job_id):
+        return os.path.join(self._job_dir(job_id), "result.pdf")
+
+    def write_result(self, job_id, data):
+        write_atomic(self.result_path(job_id), data)
+
+    def copy_result(self, job_id, path):
+        """
+        Use an existing file (e.g. a result cache entry) as the job's
+        result. Raises OSError if path is gone (evicted since the lookup);
+        the job then has no result, never half of one.
+        """
+        tmp = os.path.join(self._job_dir(job_id), "result.pdf.tmp")
+        try:
+            os.link(path, tmp)
+        except FileNotFoundError:
+            raise
+        except OSError:
+            # Different file system, or links not supported
+            shutil.copyfile(path, tmp)
+        os.replace(tmp, self.result_path(job_id))
+
+    def delete(self, job_id):
+        shutil.rmtree(self._job_dir(job_id), ignore_errors=True)
+
+    def cleanup(self, now=None):
+        """Remove expired jobs. Returns how many were removed."""
+        now = now or time.time()
+        removed = 0
+        for job_id in os.listdir(self.directory):
+            if not is_id(job_id):
+                continue
+            path = os.path.join(self._job_dir(job_id), "state.json")
+            try:
+                changed = os.path.getmtime(path)
+            except FileNotFoundError:
+                # Half-created or half-deleted
+                changed = os.path.getmtime(self._job_dir(job_id))
+            if now - changed > self.ttl:
+                self.delete(job_id)
+                removed += 1
+        return removed
+
+
+def run_job(store, job_id, converter, data, options, interval=0.25):
+    """
+    Convert data for job job_id with converter, recording progress in the
+    store at most every interval seconds. Returns the conversion stats;
+    errors are recorded in the job and re-raised.
+    """
+    store.update(job_id, status="running", started=time.time())
+    last = 0.0
+
+    def progress(done, total):
+        nonlocal last
+        now = time.monotonic()
+        if done == total or now - last >= interval:
+            last = now
+            store.update(job_id, pages_done=done, pages_total=total)
+
+    converter.progress = progress
+    try:
+        output = converter.convert_bytes(data, **options)
+    except Exception as e:
+        store.update(job_id, status="failed", finished=time.time(),
+                     error=str(e), error_type=type(e).__name__)
+        raise
+    finally:
+        converter.progress = None
+
+    store.write_result(job_id, output)
+    stats = converter.last_stats
+    store.update(job_id, status="done", finished=time.time(),
+                 pages_done=stats.get("pages", 0), pages_total=stats.get("pages", 0))
+    return stats
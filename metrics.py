@@ -0,0 +1,233 @@
+import bisect
+import math
+import threading
+from hooks import ConversionHook
+from page_classifier import PAGE_CLASSES
+
+# Just enough of the Prometheus data model for /metrics: counters, gauges
+# and histograms with labels, rendered in the text exposition format.
+# Registries can be snapshotted and merged, which is how the conversion
+# pool's worker processes ship their numbers to the web worker.
+
+# Seconds, from a trivial page to a pathological one
+STAGE_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+REQUEST_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300)
+
+
+class _Metric:
+    kind = None
+
+    def __init__(self, name, help, labelnames=(), lock=None):
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        self.samples = {}   # label values -> value
+        # Shared with the registry: pool callbacks update metrics from
+        # another thread while /metrics renders them
+        self.lock = lock or threading.RLock()
+
+    def _key(self, labels):
+        if set(labels) != set(self.labelnames):
+            raise ValueError(f"{self.name} takes labels {self.labelnames}, got {tuple(labels)}")
+        return tuple(str(labels[name]) for name in self.labelnames)
+
+    def _label_text(self, key, extra=()):
+        pairs = list(zip(self.labelnames, key)) + list(extra)
+        if not pairs:
+            return ""
+        return "{" + ",".join(f'{name}="{_escape(value)}"' for name, value in pairs) + "}"
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def inc(self, amount=1, **labels):
+        key = self._key(labels)
+        with self.lock:
+            self.samples[key] = self.samples.get(key, 0) + amount
+
+    def set(self, value, **labels):
+        """For totals kept elsewhere (e.g. the cache counters in SQLite)."""
+        key = self._key(labels)
+        with self.lock:
+            self.samples[key] = value
+
+    def merge(self, samples):
+        for key, value in samples.items():
+            self.samples[key] = self.samples.get(key, 0) + value
+
+    def lines(self):
+        for key, value in self.samples.items():
+            yield f"{self.name}{self._label_text(key)} {_number(value)}"
+
+
+class Gauge(Counter):
+    kind = "gauge"
+
+    def merge(self, samples):
+        self.samples.update(samples)
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name, help, labelnames=(), lock=None, buckets=STAGE_BUCKETS):
+        super().__init__(name, help, labelnames, lock)
+        self.buckets = tuple(buckets)
+
+    def observe(self, value, **labels):
+        key = self._key(labels)
+        index = bisect.bisect_left(self.buckets, value)
+        with self.lock:
+            sample = self.samples.get(key)
+            if sample is None:
+                # Per-bucket (not cumulative) counts, sum, count
+                sample = self.samples[key] = [[0] * len(self.buckets), 0.0, 0]
+            if index < len(self.buckets):
+                sample[0][index] += 1
+            sample[1] += value
+            sample[2] += 1
+
+    def merge(self, samples):
+        for key, (counts, total, count) in samples.items():
+            sample = self.samples.setdefault(key, [[0] * len(self.buckets), 0.0, 0])
+            sample[0] = [a + b for a, b in zip(sample[0], counts)]
+            sample[1] += total
+            sample[2] += count
+
+    def lines(self):
+        for key, (counts, total, count) in self.samples.items():
+            cumulative = 0
+            for bound, n in zip(self.buckets, counts):
+                cumulative += n
+                yield f"{self.name}_bucket{self._label_text(key, [('le', _number(bound))])} {cumulative}"
+            yield f"{self.name}_bucket{self._label_text(key, [('le', '+Inf')])} {count}"
+            yield f"{self.name}_sum{self._label_text(key)} {_number(total)}"
+            yield f"{self.name}_count{self._label_text(key)} {count}"
+
+
+class Registry:
+    """A set of metrics. counter()/gauge()/histogram() return the existing metric of that name."""
+
+    def __init__(self):
+        self.metrics = {}
+        self.lock = threading.RLock()
+
+    def _get(self, cls, name, help, labelnames, **kwargs):
+        with self.lock:
+            metric = self.metrics.get(name)
+            if metric is None:
+                metric = self.metrics[name] = cls(name, help, labelnames, self.lock, **kwargs)
+            return metric
+
+    def counter(self, name, help, labelnames=()):
+        return self._get(Counter, name, help, labelnames)
+
+    def gauge(self, name, help, labelnames=()):
+        return self._get(Gauge, name, help, labelnames)
+
+    def histogram(self, name, help, labelnames=(), buckets=STAGE_BUCKETS):
+        return self._get(Histogram, name, help, labelnames, buckets=buckets)
+
+    def snapshot(self, reset=False):
+        """Picklable copy of every metric (and empty them with reset=True), for merge()."""
+        with self.lock:
+            result = {
+                name: {
+                    "kind": metric.kind,
+                    "help": metric.help,
+                    "labelnames": metric.labelnames,
+                    "buckets": getattr(metric, "buckets", None),
+                    "samples": {key: _copy(value) for key, value in metric.samples.items()},
+                }
+                for name, metric in self.metrics.items() if metric.samples
+            }
+            if reset:
+                for metric in self.metrics.values():
+                    metric.samples = {}
+        return result
+
+    def merge(self, snapshot):
+        """Add a snapshot() (of a registry in another process) to this registry."""
+        for name, data in snapshot.items():
+            if data["kind"] == "histogram":
+                metric = self.histogram(name, data["help"], data["labelnames"], data["buckets"])
+            else:
+                metric = self._get({"counter": Counter, "gauge": Gauge}[data["kind"]],
+                                   name, data["help"], data["labelnames"])
+            with self.lock:
+                metric.merge(data["samples"])
+
+    def render(self):
+        """Everything in the Prometheus text exposition format."""
+        out = []
+        with self.lock:
+            for name in sorted(self.metrics):
+                metric = self.metrics[name]
+                out.append(f"# HELP {name} {metric.help}")
+                out.append(f"# TYPE {name} {metric.kind}")
+                out.extend(metric.lines())
+        return "\n".join(out) + "\n"
+
+
+class MetricsHook(ConversionHook):
+    """Records the converter's per-page and per-document measurements in registry."""
+
+    def __init__(self, registry):
+        self.stage_seconds = registry.histogram(
+            "nightowl_stage_seconds", "Seconds per conversion stage, per page (save: per document)", ("stage",))
+        self.page_seconds = registry.histogram(
+            "nightowl_page_seconds", "Seconds to convert one page")
+        self.objects = registry.counter(
+            "nightowl_page_objects_total", "Spans, paths and images redrawn", ("kind",))
+        self.font_fallbacks = registry.counter(
+            "nightowl_font_fallbacks_total", "Spans redrawn in a substitute font")
+        self.errors = registry.counter(
+            "nightowl_swallowed_errors_total", "Text runs, paths and images dropped after an error")
+        self.page_classes = registry.counter(
+            "nightowl_page_classes_total", "Converted pages by content class (see page_classifier)", ("kind",))
+        self.documents = registry.counter(
+            "nightowl_documents_total", "Documents converted and saved")
+        self.pages = registry.counter(
+            "nightowl_pages_total", "Pages of converted documents, by source", ("source",))
+
+    def page_done(self, pno, seconds, stages, counts):
+        self.page_seconds.observe(seconds)
+        for stage, value in stages.items():
+            self.stage_seconds.observe(value, stage=stage)
+        for kind in ("spans", "paths", "images"):
+            if counts.get(kind):
+                self.objects.inc(counts[kind], kind=kind)
+        if counts.get("font_fallbacks"):
+            self.font_fallbacks.inc(counts["font_fallbacks"])
+        if counts.get("errors"):
+            self.errors.inc(counts["errors"])
+        for name in PAGE_CLASSES:
+            if counts.get(name + "_pages"):
+                self.page_classes.inc(counts[name + "_pages"], kind=name)
+
+    def document_done(self, stats):
+        self.documents.inc()
+        hits = stats.get("page_cache_hits", 0)
+        self.pages.inc(stats.get("pages", 0) - hits, source="converted")
+        self.pages.inc(hits, source="page_cache")
+        if "save" in stats.get("stages", {}):
+            self.stage_seconds.observe(stats["stages"]["save"], stage="save")
+
+
+def _copy(value):
+    if isinstance(value, list):
+        return [list(value[0]), value[1], value[2]]
+    return value
+
+
+def _number(value):
+    if isinstance(value, float):
+        if math.isinf(value):
+            return "+Inf" if value > 0 else "-Inf"
+        return repr(value)
+    return str(value)
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
@@ -0,0 +1,104 @@
+import hashlib
+import re
+import fitz  # PyMuPDF
+from result_cache import ResultCache, _count
+
+# Indirect reference "12 0 R"
+_REF = re.compile(r"\b(\d+) (\d+) R\b")
+# References back up the tree (to the page or its parents) - following them
+# would make every page's fingerprint depend on the whole document
+_BACK_REF = re.compile(r"/(P|Parent)\s+\d+ \d+ R\b")
+
+
+class PageCache(ResultCache):
+    """
+    Disk cache of converted pages, one single-page PDF per entry.
+
+    Keys combine a page fingerprint (see page_fingerprint) with the
+    converter settings, so an unchanged page - in a new version of a
+    document, or a template page repeated within one - is copied in with
+    insert_pdf instead of being converted again.
+    """
+
+    def __init__(self, directory, max_bytes=256 * 1024 * 1024, max_entries=20000):
+        super().__init__(directory, max_bytes, max_entries)
+
+    def page_key(self, fingerprint, settings):
+        return self.key(fingerprint.encode(), settings)
+
+    def record_conversion(self, pages, seconds):
+        """
+        Add pages converted in seconds to the shared totals and return the
+        average seconds per converted page (None before the first one).
+        Used to estimate the time cache hits save.
+        """
+        with self._connect() as db:
+            if pages:
+                _count(db, "converted_pages", pages)
+                _count(db, "convert_microseconds", int(seconds * 1e6))
+            totals = dict(db.execute("SELECT name, value FROM counters WHERE name IN "
+                                     "('converted_pages', 'convert_microseconds')").fetchall())
+        if not totals.get("converted_pages"):
+            return None
+        return totals["convert_microseconds"] / 1e6 / totals["converted_pages"]
+
+
+def page_fingerprint(doc, page, memo=None):
+    """
+    SHA-256 hex digest of everything that determines how page converts:
+    its content stream(s), its resources (deep - fonts, images, forms and
+    their streams), MediaBox, CropBox, rotation and non-link annotations.
+
+    Objects are hashed by content, not by xref number, so equal pages of
+    different files get the same fingerprint. memo (a dict) caches object
+    digests and should be shared by all pages of one document.
+    """
+    if memo is None:
+        memo = {}
+    active = set()
+    digest = hashlib.sha256()
+    digest.update(page.read_contents())
+    digest.update(_resources_digest(doc, page.xref, memo, active).encode())
+    digest.update(repr((tuple(page.mediabox), tuple(page.cropbox), page.rotation)).encode())
+    for xref, kind, _ in page.annot_xrefs():
+        # Links are re-created from the source document after conversion
+        if kind != fitz.PDF_ANNOT_LINK:
+            digest.update(_object_digest(doc, xref, memo, active).encode())
+    return digest.hexdigest()
+
+
+def _resources_digest(doc, xref, memo, active):
+    """Digest of the (possibly inherited) Resources of page object xref."""
+    for _ in range(32):  # the page tree is never this deep
+        kind, value = doc.xref_get_key(xref, "Resources")
+        if kind == "xref":
+            return _object_digest(doc, int(value.split()[0]), memo, active)
+        if kind == "dict":
+            return _source_digest(doc, value, memo, active)
+        kind, value = doc.xref_get_key(xref, "Parent")
+        if kind != "xref":
+            break
+        xref = int(value.split()[0])
+    return ""
+
+
+def _object_digest(doc, xref, memo, active):
+    """Digest of object xref including its stream and everything it references."""
+    if xref in memo:
+        return memo[xref]
+    if xref in active or not 0 < xref < doc.xref_length():
+        # Reference cycle (or a dangling reference)
+        return "R"
+    active.add(xref)
+    digest = hashlib.sha256(_source_digest(doc, doc.xref_object(xref, compressed=True), memo, active).encode())
+    if doc.xref_is_stream(xref):
+        digest.update(doc.xref_stream_raw(xref) or b"")
+    active.discard(xref)
+    memo[xref] = digest.hexdigest()
+    return memo[xref]
+
+
+def _source_digest(doc, source, memo, active):
+    """Object source with every reference replaced by the referenced object's digest."""
+    source = _BACK_REF.sub(r"/\1 null", source)
+    return _REF.sub(lambda m: "<" + _object_digest(doc, int(m.group(1)), memo, active) + ">", source)
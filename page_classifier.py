@@ -0,0 +1,87 @@
+import re
+
+# Cheap pre-classification of pages, so the overlay engine only runs the
+# steps a page needs. A page is classified by a scan of its content
+# streams (and those of the Form XObjects it uses) for the operators that
+# put something on the page - no text extraction, no path capture. The
+# scan errs on the side of "has it": a false hit (an operator spelled out
+# inside a string, say) only sends a page down the full pipeline.
+
+BLANK = "blank"
+IMAGE_ONLY = "image_only"
+TEXT_ONLY = "text_only"
+VECTOR_ONLY = "vector_only"
+MIXED = "mixed"
+PAGE_CLASSES = (BLANK, IMAGE_ONLY, TEXT_ONLY, VECTOR_ONLY, MIXED)
+
+# Operators that put something on the page: BT starts text, BI (inline
+# image) and Do (XObject) may draw images, sh and the path painting
+# operators draw vector graphics (n only clips)
+_TEXT_OPS = (b"BT",)
+_IMAGE_OPS = (b"BI",)
+_VECTOR_OPS = (b"f", b"S", b"B", b"b", b"s", b"F", b"sh")
+# What may come right before and after an operator token
+_BEFORE = frozenset(b" \t\r\n\f\0)]>}")
+_AFTER = frozenset(b" \t\r\n\f\0[(</%{*")
+_XOBJECT_NAME = re.compile(rb"/([^\s/\[\]()<>{}%]+)\s*Do(?![^\s\[(</%{])")
+
+
+class PageContent:
+    """What a page draws: text, vector graphics and/or images."""
+
+    __slots__ = ("text", "vector", "images")
+
+    def __init__(self, text=False, vector=False, images=False):
+        self.text = text
+        self.vector = vector
+        self.images = images
+
+    @property
+    def page_class(self):
+        """One of PAGE_CLASSES."""
+        kinds = self.text + self.vector + self.images
+        if kinds == 0:
+            return BLANK
+        if kinds > 1:
+            return MIXED
+        return TEXT_ONLY if self.text else VECTOR_ONLY if self.vector else IMAGE_ONLY
+
+    def __repr__(self):
+        return f"PageContent({self.page_class})"
+
+
+def classify_page(page):
+    """Scan page's content and return its PageContent."""
+    doc = page.parent
+    # Nested forms are listed too (names may repeat across levels)
+    xobjects = page.get_xobjects()
+    forms = {name for _xref, name, _invoker, _bbox in xobjects}
+    streams = [page.read_contents()]
+    streams += [doc.xref_stream(xref) or b"" for xref in sorted({item[0] for item in xobjects})]
+    data = b"\n".join(streams)
+    content = PageContent(
+        text=_has_operator(data, _TEXT_OPS),
+        vector=_has_operator(data, _VECTOR_OPS),
+        images=_has_operator(data, _IMAGE_OPS),
+    )
+    if not content.images and _has_operator(data, (b"Do",)):
+        images = {item[7] for item in page.get_images(full=True)}
+        names = {name.decode("latin-1") for name in _XOBJECT_NAME.findall(data)}
+        # Forms are scanned themselves; anything unknown (or a Do whose
+        # name did not parse) counts as an image
+        content.images = not names or any(name in images or name not in forms for name in names)
+    return content
+
+
+def _has_operator(data, operators):
+    """Whether one of operators occurs in data as a token of its own (f*, B*... included)."""
+    size = len(data)
+    for op in operators:
+        # bytes.find is far quicker than a regex with lookbehind here
+        start = data.find(op)
+        while start >= 0:
+            end = start + len(op)
+            if (start == 0 or data[start - 1] in _BEFORE) and (end == size or data[end] in _AFTER):
+                return True
+            start = data.find(op, end)
+    return False
@@ -0,0 +1,354 @@
+import re
+import numpy as np
+from text_extract import extract_spans
+
+# Columnar model of what the overlay engine captures from a page: the
+# text spans and the vector paths as NumPy structured arrays instead of
+# one dict (plus Rect/Point objects) per span, path and path item.
+# Bounds, the background test and color classification are array
+# operations over it; colors, fonts and line styles are stored once per
+# page and referenced by integer codes.
+
+# get_drawings() item kinds
+LINE, RECT, QUAD, CURVE = 0, 1, 2, 3
+ITEM_KINDS = {"l": LINE, "re": RECT, "qu": QUAD, "c": CURVE}
+
+PATH_DTYPE = np.dtype([
+    ("rect", "f8", (4,)),   # x0, y0, x1, y1
+    ("stroke", "i4"),       # index into PathTable.colors, -1 = no color
+    ("fill", "i4"),
+    ("style", "i4"),        # index into PathTable.styles
+    ("first", "i4"),        # the path's items are items[first:first + count]
+    ("count", "i4"),
+])
+# Points in drawing order: line p1 p2, rect (x0, y0) (x1, y1),
+# quad ul ll lr ur, curve p1 p2 p3 p4 - unused points are 0
+ITEM_DTYPE = np.dtype([
+    ("path", "i4"),
+    ("kind", "u1"),
+    ("points", "f8", (4, 2)),
+])
+SPAN_DTYPE = np.dtype([
+    ("bbox", "f8", (4,)),
+    ("origin", "f8", (2,)),
+    ("size", "f8"),
+    ("color", "i4"),        # index into SpanTable.colors
+    ("font", "i4"),         # index into SpanTable.fonts
+])
+
+# Numbers in content streams: fixed point, trailing zeros dropped
+# (Python's %g would write exponents, which PDF does not have)
+_TRAILING_ZEROS = re.compile(r"\.?0+(?=[ \n])")
+
+# Operator templates per item kind, indexed by 2 * kind + (1 if the item
+# continues from the previous one, i.e. has no move of its own)
+_MOVE = "%.4f %.4f m\n"
+_LINE = "%.4f %.4f l\n"
+_RECT = "%.4f %.4f %.4f %.4f re\n"
+_CURVE = "%.4f %.4f %.4f %.4f %.4f %.4f c\n"
+_TEMPLATES = [_MOVE + _LINE, _LINE, _RECT, _RECT, _MOVE + _LINE * 4, _LINE * 4, _MOVE + _CURVE, _CURVE]
+
+
+class PathTable:
+    """
+    The paths of get_drawings()/get_cdrawings() as arrays. styles holds
+    (width, line cap, line join, dashes, close path, even-odd) tuples,
+    colors the stroke and fill colors as given by PyMuPDF.
+    """
+
+    __slots__ = ("paths", "items", "colors", "styles")
+
+    def __init__(self, paths, items, colors, styles):
+        self.paths = paths
+        self.items = items
+        self.colors = colors
+        self.styles = styles
+
+    def __len__(self):
+        return len(self.paths)
+
+    @classmethod
+    def empty(cls):
+        return cls(np.empty(0, dtype=PATH_DTYPE), np.empty(0, dtype=ITEM_DTYPE), [], [])
+
+    @classmethod
+    def from_drawings(cls, drawings):
+        color_ids, style_ids = {}, {}
+        rows, kinds, owners, coords = [], [], [], []
+        for number, path in enumerate(drawings):
+            stroke = path.get("color")
+            fill = path.get("fill")
+            dashes = path.get("dashes")
+            if dashes in ("[] 0", ""):
+                dashes = None
+            # PyMuPDF reports caps as (start, dash, end)
+            cap = path.get("lineCap") or 0
+            if isinstance(cap, (tuple, list)):
+                cap = cap[0]
+            style = (path.get("width") or 0, int(cap), int(path.get("lineJoin") or 0), dashes,
+                     bool(path.get("closePath")), bool(path.get("even_odd")))
+            first = len(kinds)
+            for item in path["items"]:
+                kind = item[0]
+                if kind == "l":
+                    (x0, y0), (x1, y1) = item[1], item[2]
+                    coords += (x0, y0, x1, y1, 0, 0, 0, 0)
+                elif kind == "re":
+                    x0, y0, x1, y1 = item[1]
+                    coords += (x0, y0, x1, y1, 0, 0, 0, 0)
+                elif kind == "c":
+                    (x0, y0), (x1, y1), (x2, y2), (x3, y3) = item[1:5]
+                    coords += (x0, y0, x1, y1, x2, y2, x3, y3)
+                elif kind == "qu":
+                    (x0, y0), (x1, y1), (x2, y2), (x3, y3) = item[1]
+                    coords += (x0, y0, x2, y2, x3, y3, x1, y1)
+                else:
+                    continue
+                kinds.append(ITEM_KINDS[kind])
+            owners += [number] * (len(kinds) - first)
+            rows.append((
+                tuple(path["rect"]),
+                -1 if stroke is None else color_ids.setdefault(stroke, len(color_ids)),
+                -1 if fill is None else color_ids.setdefault(fill, len(color_ids)),
+                style_ids.setdefault(style, len(style_ids)),
+                first,
+                len(kinds) - first,
+            ))
+        paths = np.array(rows, dtype=PATH_DTYPE)
+        items = np.empty(len(kinds), dtype=ITEM_DTYPE)
+        items["path"] = owners
+        items["kind"] = kinds
+        items["points"] = np.array(coords, dtype="f8").reshape(-1, 4, 2)
+        return cls(paths, items, list(color_ids), list(style_ids))
+
+    def bounds(self):
+        """Right and bottom edge of all paths (0, 0 without paths)."""
+        if not len(self.paths):
+            return 0.0, 0.0
+        rect = self.paths["rect"]
+        return float(rect[:, 2].max()), float(rect[:, 3].max())
+
+    def color_flags(self, column, predicate):
+        """predicate(color) for the stroke or fill column of every path - evaluated once per distinct color."""
+        # The extra False at the end is what the -1 (no color) codes pick
+        flags = np.array([bool(predicate(color)) for color in self.colors] + [False])
+        return flags[self.paths[column]]
+
+    def background(self, width, height, is_white):
+        """Mask of paths that look like a white page background: large and filled white."""
+        rect = self.paths["rect"]
+        large = (np.maximum(rect[:, 2] - rect[:, 0], 0) > width * 0.9) & \
+                (np.maximum(rect[:, 3] - rect[:, 1], 0) > height * 0.9)
+        return large & self.color_flags("fill", is_white)
+
+    def mapped_styles(self, map_stroke, map_fill):
+        """
+        Style codes after color mapping. Returns (codes, styles): codes
+        holds one int per path, styles the (stroke, fill, width, line cap,
+        line join, dashes, close path, even-odd) tuple per code. The
+        mapping functions see each distinct color (None for no color) once
+        per role it is used in; paths whose colors map alike share a code.
+        """
+        if not len(self.paths):
+            return [], []
+        stroke_ids, fill_ids, style_ids = self.paths["stroke"], self.paths["fill"], self.paths["style"]
+        # Only the colors used in a role are mapped for it
+        strokes, fills = {}, {}
+        for ids, mapped, map_color in ((stroke_ids, strokes, map_stroke), (fill_ids, fills, map_fill)):
+            for color_id in np.unique(ids).tolist():
+                mapped[color_id] = map_color(None if color_id < 0 else self.colors[color_id])
+        # One int per (stroke, fill, style) combination
+        colors = len(self.colors) + 1
+        keys = ((stroke_ids + 1).astype("i8") * colors + fill_ids + 1) * len(self.styles) + style_ids
+        combos, combo_of_path = np.unique(keys, return_inverse=True)
+        style_codes, styles, combo_codes = {}, [], []
+        for key in combos.tolist():
+            key, style = divmod(key, len(self.styles))
+            stroke, fill = divmod(key, colors)
+            mapped = (strokes[stroke - 1], fills[fill - 1]) + self.styles[style]
+            if mapped not in style_codes:
+                style_codes[mapped] = len(styles)
+                styles.append(mapped)
+            combo_codes.append(style_codes[mapped])
+        return np.array(combo_codes)[combo_of_path.ravel()].tolist(), styles
+
+    def plain(self):
+        """Mask of paths that consist of 're' items only."""
+        items = self.items
+        other = np.bincount(items["path"][items["kind"] != RECT], minlength=len(self.paths))
+        return other == 0
+
+    def operators(self, matrix):
+        """
+        The path construction operators (m, l, re, c) of every path, one
+        string per path, in the coordinates matrix maps to (the inverse
+        page transformation, as fitz.Shape uses). Like fitz.Shape, a
+        subpath only starts anew (m) where an item does not continue from
+        the previous item's end point.
+        """
+        items = self.items
+        if not len(items):
+            return [""] * len(self.paths)
+        kind = items["kind"]
+        points = items["points"]
+        a, b, c, d, e, f = matrix
+        x, y = points[..., 0], points[..., 1]
+        page = np.empty_like(points)
+        page[..., 0] = a * x + c * y + e
+        page[..., 1] = b * x + d * y + f
+
+        # Where the previous item of the same path left the current point
+        end = points[np.arange(len(items)), np.select([kind == LINE, kind == CURVE], [1, 3], 0)]
+        start = points[:, 0]
+        same_path = np.zeros(len(items), dtype=bool)
+        same_path[1:] = items["path"][1:] == items["path"][:-1]
+        continues = np.zeros(len(items), dtype=bool)
+        continues[1:] = same_path[1:] & np.all(start[1:] == end[:-1], axis=1)
+        # The numbers each item writes: the start point (only where it
+        # moves), then line end / rect bottom-left corner, width and height /
+        # the other three quad corners and the start again / curve points
+        values = np.zeros((len(items), 10))
+        values[:, 0:2] = page[:, 0]
+        values[:, 2:10] = page[:, [1, 2, 3, 0]].reshape(-1, 8)
+        rect = kind == RECT
+        values[rect, 2] = a * points[rect, 0, 0] + c * points[rect, 1, 1] + e
+        values[rect, 3] = b * points[rect, 0, 0] + d * points[rect, 1, 1] + f
+        values[rect, 4] = np.maximum(points[rect, 1, 0] - points[rect, 0, 0], 0)
+        values[rect, 5] = np.maximum(points[rect, 1, 1] - points[rect, 0, 1], 0)
+        used = np.arange(10) < (2 + np.array([2, 4, 8, 6])[kind])[:, None]
+        used[:, 0:2] &= ~(continues | rect)[:, None]
+
+        # One template per item and a separator after every path, formatted
+        # in a single % and split up again
+        templates = np.array(_TEMPLATES, dtype=object)[kind * 2 + continues]
+        ends = (self.paths["first"] + self.paths["count"]).astype(np.intp)
+        templates = np.insert(templates, ends, "\0")
+        text = "".join(templates.tolist()) % tuple(values[used].tolist())
+        return _TRAILING_ZEROS.sub("", text).split("\0")[:len(self.paths)]
+
+
+class OverlapGrid:
+    """
+    The rectangles of a growing batch of paths in a uniform grid over
+    the page, so whether a new path intersects one of them only looks at
+    the paths in the cells it covers instead of the whole batch. Paths
+    that cover many cells are kept in a list checked every time instead.
+    Intersection has fitz.Rect.intersects() semantics (empty rectangles
+    intersect nothing).
+    """
+
+    cells_per_side = 32
+    max_cells = 64
+
+    def __init__(self, paths, width, height):
+        rect = paths.paths["rect"]
+        self.rects = rect.tolist()
+        # Cell columns and rows of every path's corners; rectangles beyond
+        # the page fall into the cells just outside it
+        cell = max(width, height, 1.0) / self.cells_per_side
+        self.corners = np.clip(np.floor(rect / cell), -1, self.cells_per_side).astype(int).tolist()
+        self.grid = {}      # (column, row) -> indexes of the paths in that cell
+        self.large = []     # indexes of the paths that cover more than max_cells
+
+    def _cells(self, index):
+        """Column and row ranges of the cells path index covers."""
+        x0, y0, x1, y1 = self.corners[index]
+        return range(x0, x1 + 1), range(y0, y1 + 1)
+
+    def clear(self):
+        self.grid.clear()
+        self.large.clear()
+
+    def add(self, index):
+        x0, y0, x1, y1 = self.rects[index]
+        if x0 >= x1 or y0 >= y1:
+            return
+        columns, rows = self._cells(index)
+        if len(columns) * len(rows) > self.max_cells:
+            self.large.append(index)
+            return
+        for column in columns:
+            for row in rows:
+                self.grid.setdefault((column, row), []).append(index)
+
+    def overlaps(self, index):
+        """Whether path index intersects one of the paths added since the last clear()."""
+        x0, y0, x1, y1 = self.rects[index]
+        if x0 >= x1 or y0 >= y1:
+            return False
+        rects = self.rects
+        columns, rows = self._cells(index)
+        candidates = [self.large]
+        if len(columns) * len(rows) > self.max_cells:
+            # Cheaper to look at every path of the grid once
+            candidates += self.grid.values()
+        else:
+            candidates += [self.grid.get((column, row), ()) for column in columns for row in rows]
+        for cell in candidates:
+            for other in cell:
+                a0, b0, a1, b1 = rects[other]
+                if max(a0, x0) < min(a1, x1) and max(b0, y0) < min(b1, y1):
+                    return True
+        return False
+
+
+class SpanTable:
+    """
+    Text spans as arrays: bbox, origin, size, color code, font code.
+    texts holds the strings, fonts the font names and colors the sRGB
+    colors the codes point to. x1/y1 are the right and bottom edges of
+    all text, blank spans included (see text_extract.extract_spans).
+    """
+
+    __slots__ = ("spans", "texts", "fonts", "colors", "x1", "y1")
+
+    def __init__(self, spans, texts, fonts, colors, x1=0.0, y1=0.0):
+        self.spans = spans
+        self.texts = texts
+        self.fonts = fonts
+        self.colors = colors
+        self.x1 = x1
+        self.y1 = y1
+
+    def __len__(self):
+        return len(self.spans)
+
+    @classmethod
+    def empty(cls):
+        return cls(np.empty(0, dtype=SPAN_DTYPE), [], [], [])
+
+    @classmethod
+    def from_page(cls, page):
+        spans, x1, y1 = extract_spans(page)
+        font_ids, color_ids = {}, {}
+        rows = [
+            (bbox, origin, size, color_ids.setdefault(color, len(color_ids)), font_ids.setdefault(font, len(font_ids)))
+            for _, origin, size, font, color, bbox in spans
+        ]
+        return cls(np.array(rows, dtype=SPAN_DTYPE), [span[0] for span in spans],
+                   list(font_ids), list(color_ids), x1, y1)
+
+    def bounds(self):
+        return self.x1, self.y1
+
+    def count_codes(self, column, flags):
+        """Number of spans whose font or color code (column) has a true entry in flags."""
+        if not len(self.spans):
+            return 0
+        return int(np.count_nonzero(np.asarray(flags, dtype=bool)[self.spans[column]]))
+
+
+class PageModel:
+    """The spans and paths of one page (see SpanTable and PathTable)."""
+
+    __slots__ = ("spans", "paths")
+
+    def __init__(self, spans, paths):
+        self.spans = spans
+        self.paths = paths
+
+    def bounds(self):
+        """Right and bottom edge of all content (0, 0 for an empty page)."""
+        text_x1, text_y1 = self.spans.bounds()
+        path_x1, path_y1 = self.paths.bounds()
+        return max(text_x1, path_x1), max(text_y1, path_y1)
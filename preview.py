@@ -0,0 +1,62 @@
+import io
+import fitz  # PyMuPDF
+
+try:
+    from PIL import Image
+except ImportError:
+    # WebP previews need Pillow; PNG and JPEG come from PyMuPDF itself
+    Image = None
+
+PREVIEW_FORMATS = ("png", "jpeg", "webp") if Image is not None else ("png", "jpeg")
+MEDIA_TYPES = {"png": "image/png", "jpeg": "image/jpeg", "webp": "image/webp"}
+
+
+def preview_pages(page_count, count, sample=False):
+    """
+    0-based numbers of the pages to preview: the first count pages, or
+    with sample=True count pages spread evenly over the document (always
+    including the first and the last).
+    """
+    count = min(count, page_count)
+    if not sample or count < 2:
+        return list(range(count))
+    step = (page_count - 1) / (count - 1)
+    return sorted({round(i * step) for i in range(count)})
+
+
+def render_preview(converter, source, count=3, sample=False, width=240, image_format="png", quality=80):
+    """
+    Convert only the preview pages of source (see preview_pages) and
+    render each as a thumbnail width pixels wide. Returns the page count
+    of the document and a list of (page number (1-based), width, height,
+    image bytes).
+    """
+    if image_format not in PREVIEW_FORMATS:
+        raise ValueError(f"Unknown preview format {image_format!r}, expected one of {PREVIEW_FORMATS}")
+    src = fitz.open(source) if isinstance(source, str) else fitz.open(stream=source, filetype="pdf")
+    try:
+        page_count = len(src)
+        pnos = preview_pages(page_count, count, sample)
+        doc = converter.convert_pages(src, pnos)
+    finally:
+        src.close()
+
+    thumbnails = []
+    try:
+        for pno, page in zip(pnos, doc):
+            zoom = width / page.rect.width
+            pix = page.get_pixmap(matrix=fitz.Matrix(zoom, zoom), alpha=False)
+            thumbnails.append((pno + 1, pix.width, pix.height, _encode(pix, image_format, quality)))
+    finally:
+        doc.close()
+    return page_count, thumbnails
+
+
+def _encode(pix, image_format, quality):
+    if image_format == "png":
+        return pix.tobytes("png")
+    if image_format == "jpeg":
+        return pix.tobytes("jpeg", jpg_quality=quality)
+    buffer = io.BytesIO()
+    Image.frombytes("RGB", (pix.width, pix.height), pix.samples).save(buffer, "WEBP", quality=quality)
+    return buffer.getvalue()
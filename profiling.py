@@ -0,0 +1,199 @@
+import cProfile
+import hashlib
+import json
+import marshal
+import os
+import pstats
+import time
+import tracemalloc
+import fitz  # PyMuPDF
+from hooks import PageLog
+from storage import checked_id, is_id, new_id, write_atomic
+
+# Allocation sites are reported by line, so one frame per trace is enough
+# (every extra frame makes traced conversions noticeably slower)
+TRACE_FRAMES = 1
+
+
+class ProfileStore:
+    """
+    Profile bundles of individual conversions, kept on the server.
+
+    <directory>/<id>.json is the bundle (see profile_conversion),
+    <id>.pstats the raw cProfile data (load it with pstats.Stats or open
+    it in snakeviz). Only the newest max_profiles bundles are kept.
+    Bundles hold measurements and document structure, never the document.
+    """
+
+    def __init__(self, directory, max_profiles=50):
+        self.directory = directory
+        self.max_profiles = max_profiles
+        os.makedirs(directory, exist_ok=True)
+
+    def _path(self, profile_id, suffix):
+        return os.path.join(self.directory, checked_id(profile_id) + suffix)
+
+    def save(self, bundle, pstats_data):
+        """Store a bundle and its raw profile, drop the oldest beyond max_profiles. Returns the id."""
+        profile_id = new_id()
+        bundle = dict(bundle, id=profile_id)
+        write_atomic(self._path(profile_id, ".pstats"), pstats_data)
+        write_atomic(self._path(profile_id, ".json"), json.dumps(bundle, indent=1).encode())
+        for old in self.list()[self.max_profiles:]:
+            self.delete(old["id"])
+        return profile_id
+
+    def list(self):
+        """Summaries of the stored bundles, newest first."""
+        summaries = []
+        for name in os.listdir(self.directory):
+            profile_id, ext = os.path.splitext(name)
+            if ext != ".json" or not is_id(profile_id):
+                continue
+            bundle = self.get(profile_id)
+            if bundle is not None:
+                summaries.append({key: bundle.get(key) for key in ("id", "created", "seconds", "trigger")}
+                                 | {"pages": bundle["document"]["pages"]})
+        return sorted(summaries, key=lambda s: -s["created"])
+
+    def get(self, profile_id):
+        try:
+            with open(self._path(profile_id, ".json")) as f:
+                return json.load(f)
+        except (KeyError, FileNotFoundError, ValueError):
+            return None
+
+    def pstats_path(self, profile_id):
+        """Path of the raw cProfile data, or None."""
+        try:
+            path = self._path(profile_id, ".pstats")
+        except KeyError:
+            return None
+        return path if os.path.exists(path) else None
+
+    def delete(self, profile_id):
+        for suffix in (".json", ".pstats"):
+            try:
+                os.remove(self._path(profile_id, suffix))
+            except FileNotFoundError:
+                pass
+
+
+def profile_conversion(converter, data, options=None, top=30, trigger=None):
+    """
+    Convert data with cProfile and tracemalloc on (single process, so the
+    profile sees every page). Returns (PDF bytes, bundle, raw pstats data).
+
+    The bundle (JSON-able) has the run's duration and stats, the top
+    functions by cumulative and by own time, the top allocation sites
+    and peak traced memory, the slowest pages with their stage times and
+    counts, and the document's structure (see document_structure).
+    """
+    options = dict(options or {}, workers=1)
+    log = PageLog()
+    converter.hooks.append(log)
+    tracing = tracemalloc.is_tracing()
+    if not tracing:
+        tracemalloc.start(TRACE_FRAMES)
+    tracemalloc.reset_peak()
+    profiler = cProfile.Profile()
+    start = time.perf_counter()
+    try:
+        profiler.enable()
+        try:
+            output = converter.convert_bytes(data, **options)
+        finally:
+            profiler.disable()
+        seconds = time.perf_counter() - start
+        _, peak = tracemalloc.get_traced_memory()
+        snapshot = tracemalloc.take_snapshot()
+    finally:
+        if not tracing:
+            tracemalloc.stop()
+        converter.hooks.remove(log)
+
+    stats = pstats.Stats(profiler)
+    slowest = sorted(log.pages, key=lambda page: -page[1])[:10]
+    bundle = {
+        "created": time.time(),
+        "trigger": trigger,
+        "seconds": seconds,
+        "settings": converter.settings(),
+        "options": options,
+        "stats": converter.last_stats,
+        "document": document_structure(data),
+        "functions_cumulative": _top_functions(stats, "cumulative", top),
+        "functions_own_time": _top_functions(stats, "tottime", top),
+        "memory": {
+            "peak_traced_bytes": peak,
+            "top_allocations": _top_allocations(snapshot, top),
+        },
+        "slowest_pages": [
+            {"page": pno + 1, "seconds": page_seconds, "stages": stages, "counts": counts}
+            for pno, page_seconds, stages, counts in slowest
+        ],
+    }
+    return output, bundle, marshal.dumps(stats.stats)
+
+
+def document_structure(data):
+    """
+    Structural facts about a PDF that explain conversion cost - sizes and
+    counts only, no content: pages, objects, images, fonts, annotations,
+    page sizes, and the spans/paths/images of the conversion (in stats).
+    """
+    doc = fitz.open(stream=data, filetype="pdf")
+    try:
+        images, fonts, annotations = set(), set(), 0
+        sizes = {}
+        for page in doc:
+            images.update(item[0] for item in page.get_images(full=True))
+            fonts.update(item[0] for item in page.get_fonts(full=True))
+            annotations += len(list(page.annot_xrefs()))
+            size = f"{page.rect.width:.0f}x{page.rect.height:.0f}"
+            sizes[size] = sizes.get(size, 0) + 1
+        return {
+            "sha256": hashlib.sha256(data).hexdigest(),
+            "bytes": len(data),
+            "format": doc.metadata.get("format"),
+            "pages": len(doc),
+            "xrefs": doc.xref_length(),
+            "images": len(images),
+            "fonts": len(fonts),
+            "annotations": annotations,
+            "page_sizes": sizes,
+        }
+    finally:
+        doc.close()
+
+
+def _top_functions(stats, key, top):
+    stats.sort_stats(key)
+    rows = []
+    for func in stats.fcn_list[:top]:
+        calls, primitive, own, cumulative, _ = stats.stats[func]
+        filename, line, name = func
+        rows.append({
+            "function": f"{os.path.basename(filename)}:{line}({name})" if line else name,
+            "calls": calls,
+            "own_seconds": round(own, 6),
+            "cumulative_seconds": round(cumulative, 6),
+        })
+    return rows
+
+
+def _top_allocations(snapshot, top):
+    # What tracemalloc and the profiler allocate themselves is not the document's fault
+    snapshot = snapshot.filter_traces([
+        tracemalloc.Filter(False, tracemalloc.__file__),
+        tracemalloc.Filter(False, cProfile.__file__),
+    ])
+    rows = []
+    for stat in snapshot.statistics("lineno")[:top]:
+        frame = stat.traceback[0]
+        rows.append({
+            "site": f"{os.path.basename(frame.filename)}:{frame.lineno}",
+            "bytes": stat.size,
+            "blocks": stat.count,
+        })
+    return rows
@@ -0,0 +1,53 @@
+import numpy as np
+
+# Rec. 601 luma weights
+_LUMA = np.array([0.299, 0.587, 0.114], dtype=np.float32)
+
+
+def pixmap_array(pix):
+    """
+    Return a writable (height, width, n) uint8 view of pix.samples.
+    No copy is made - writing to the array changes the pixmap.
+    """
+    buf = np.frombuffer(pix.samples_mv, dtype=np.uint8)
+    rows = buf.reshape(pix.height, pix.stride)
+    return rows[:, :pix.width * pix.n].reshape(pix.height, pix.width, pix.n)
+
+
+def darken_pixmap(pix, background_color, text_color, band_rows=256):
+    """
+    Dark-mode an RGB or gray pixmap in place.
+
+    Each pixel's luminance L is inverted to 1 - L while its hue and
+    saturation are kept (every channel is shifted by 1 - 2L), and the
+    result is mapped linearly onto [background_color, text_color], so
+    white paper becomes the background and black ink becomes the text color.
+
+    The page is processed in bands of band_rows rows to bound the size of
+    the float temporaries.
+    """
+    pixels = pixmap_array(pix)
+    channels = pix.n - (1 if pix.alpha else 0)
+    bg = np.asarray(background_color, dtype=np.float32)
+    span = np.asarray(text_color, dtype=np.float32) - bg
+    if channels == 1:
+        # Gray pixmaps can only take the gray part of the palette
+        bg = bg[:1].copy()
+        span = span[:1].copy()
+
+    for top in range(0, pix.height, band_rows):
+        band = pixels[top:top + band_rows, :, :channels]
+        values = band.astype(np.float32)
+        values *= 1.0 / 255.0
+        if channels == 3:
+            luma = values @ _LUMA
+        else:
+            luma = values[..., 0]
+        values += (1.0 - 2.0 * luma)[..., None]
+        np.clip(values, 0.0, 1.0, out=values)
+        values *= span
+        values += bg
+        values *= 255.0
+        values += 0.5
+        band[...] = values.astype(np.uint8)
+    return pix
@@ -0,0 +1,201 @@
+import hashlib
+import json
+import os
+import sqlite3
+import tempfile
+import threading
+import time
+
+# Bump when a converter change makes previously cached results stale
+CACHE_VERSION = 1
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS entries (
+    key TEXT PRIMARY KEY,
+    size INTEGER NOT NULL,
+    last_used REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS entries_last_used ON entries (last_used);
+CREATE TABLE IF NOT EXISTS counters (
+    name TEXT PRIMARY KEY,
+    value INTEGER NOT NULL
+);
+"""
+
+COUNTERS = ("hits", "misses", "stores", "evictions")
+
+
+class ResultCache:
+    """
+    Content-addressed disk cache for converted PDFs.
+
+    Results are stored as <directory>/<key><suffix> (.pdf by default). An
+    SQLite index next to them keeps size and last use of every entry plus
+    the hit/miss/store/eviction counters. SQLite's file locking makes the cache safe to share
+    between processes, e.g. the gunicorn workers of the Procfile.
+
+    The least recently used entries are evicted once the files add up to
+    more than max_bytes or there are more than max_entries of them.
+    """
+
+    def __init__(self, directory, max_bytes=256 * 1024 * 1024, max_entries=1000, suffix=".pdf"):
+        self.directory = directory
+        self.suffix = suffix
+        self.max_bytes = max_bytes
+        self.max_entries = max_entries
+        self.index_path = os.path.join(directory, "index.sqlite3")
+        self._db = None
+        self._db_pid = None
+        os.makedirs(directory, exist_ok=True)
+        db = sqlite3.connect(self.index_path, timeout=30, isolation_level=None)
+        try:
+            # WAL lets readers go on while another process writes
+            db.execute("PRAGMA journal_mode=WAL")
+            db.executescript(_SCHEMA)
+            db.executemany("INSERT OR IGNORE INTO counters VALUES (?, 0)", [(c,) for c in COUNTERS])
+        finally:
+            db.close()
+
+    def _connect(self):
+        # One connection per process, opened again after fork(). Closing
+        # the last connection checkpoints the WAL, which would cost an
+        # fsync per operation if we opened one per call.
+        if self._db is None or self._db_pid != os.getpid():
+            db = sqlite3.connect(self.index_path, timeout=30, isolation_level=None,
+                                 check_same_thread=False)
+            # Losing the last few index updates on power loss is fine for a
+            # cache, an fsync per commit is not
+            db.execute("PRAGMA synchronous=NORMAL")
+            self._db, self._db_pid, self._db_lock = db, os.getpid(), threading.Lock()
+        return _Transaction(self._db, self._db_lock)
+
+    def __getstate__(self):
+        # Connections do not travel to other processes
+        state = self.__dict__.copy()
+        state.update(_db=None, _db_pid=None, _db_lock=None)
+        return state
+
+    @staticmethod
+    def key(data, settings):
+        """
+        Cache key for input bytes converted with settings (a JSON-able
+        dict, see PDFDarkThemeConverter.settings()).
+        """
+        digest = hashlib.sha256(data)
+        digest.update(json.dumps([CACHE_VERSION, settings], sort_keys=True).encode())
+        return digest.hexdigest()
+
+    def path(self, key):
+        return os.path.join(self.directory, key + self.suffix)
+
+    def get(self, key):
+        """Return the path of the cached result for key, or None on a miss."""
+        return self.get_many([key]).get(key)
+
+    def get_many(self, keys):
+        """Look up several keys in one transaction. Returns {key: path} for the hits."""
+        found = {}
+        now = time.time()
+        with self._connect() as db:
+            for key in keys:
+                path = self.path(key)
+                if not db.execute("UPDATE entries SET last_used = ? WHERE key = ?", (now, key)).rowcount:
+                    continue
+                if not os.path.exists(path):
+                    # File removed behind our back (or by a racing eviction)
+                    db.execute("DELETE FROM entries WHERE key = ?", (key,))
+                    continue
+                found[key] = path
+            _count(db, "hits", len(found))
+            _count(db, "misses", len(keys) - len(found))
+        return found
+
+    def put(self, key, data):
+        """Store data under key, evict what no longer fits, return the path."""
+        self.put_many([(key, data)])
+        return self.path(key)
+
+    def put_many(self, items):
+        """Store several (key, data) pairs, then evict, in one transaction."""
+        if not items:
+            return
+        for key, data in items:
+            # Write under a temporary name first so readers never see half a file
+            fd, tmp = tempfile.mkstemp(dir=self.directory, suffix=".tmp")
+            with os.fdopen(fd, "wb") as f:
+                f.write(data)
+            os.replace(tmp, self.path(key))
+
+        now = time.time()
+        with self._connect() as db:
+            db.executemany("INSERT OR REPLACE INTO entries VALUES (?, ?, ?)",
+                           [(key, len(data), now) for key, data in items])
+            _count(db, "stores", len(items))
+            victims = self._select_victims(db, keep={key for key, _ in items})
+            if victims:
+                db.executemany("DELETE FROM entries WHERE key = ?", [(v,) for v in victims])
+                _count(db, "evictions", len(victims))
+                for victim in victims:
+                    try:
+                        os.remove(self.path(victim))
+                    except FileNotFoundError:
+                        pass
+
+    def _select_victims(self, db, keep):
+        """Least recently used keys (other than keep) to drop to get back under both caps."""
+        count, total = db.execute("SELECT COUNT(*), COALESCE(SUM(size), 0) FROM entries").fetchone()
+        victims = []
+        if count <= self.max_entries and total <= self.max_bytes:
+            return victims
+        rows = db.execute("SELECT key, size FROM entries ORDER BY last_used")
+        for key, size in rows:
+            if count <= self.max_entries and total <= self.max_bytes:
+                break
+            if key in keep:
+                continue
+            victims.append(key)
+            count -= 1
+            total -= size
+        return victims
+
+    def stats(self):
+        """Counters plus current entry count and total size."""
+        with self._connect() as db:
+            result = dict(db.execute("SELECT name, value FROM counters").fetchall())
+            result["entries"], result["bytes"] = db.execute(
+                "SELECT COUNT(*), COALESCE(SUM(size), 0) FROM entries").fetchone()
+        return result
+
+
+class _Transaction:
+    """
+    Context manager: holds the thread lock of the connection and runs
+    BEGIN IMMEDIATE on enter, COMMIT (or ROLLBACK on error) on exit.
+    """
+
+    def __init__(self, db, lock):
+        self.db = db
+        self.lock = lock
+
+    def __enter__(self):
+        self.lock.acquire()
+        try:
+            # IMMEDIATE takes the write lock up front, so two writers cannot
+            # both read the totals and then both decide not to evict
+            self.db.execute("BEGIN IMMEDIATE")
+        except Exception:
+            self.lock.release()
+            raise
+        return self.db
+
+    def __exit__(self, exc_type, exc, tb):
+        try:
+            self.db.execute("ROLLBACK" if exc_type else "COMMIT")
+        finally:
+            self.lock.release()
+        return False
+
+
+def _count(db, name, amount=1):
+    db.execute("INSERT OR IGNORE INTO counters VALUES (?, 0)", (name,))
+    db.execute("UPDATE counters SET value = value + ? WHERE name = ?", (amount, name))
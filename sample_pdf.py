@@ -0,0 +1,21 @@
+import fitz  # PyMuPDF
+
+# Small generated documents for the tests, so they do not each carry their
+# own copy of the same PDF-building code.
+
+
+def create_pdf_bytes(pages=1, label="Test", draw=None, **text_options):
+    """
+    A PDF of pages pages, as bytes. Every page says "<label> page <n>" at
+    (72, 72), written with text_options (fontname, color, ...); draw(page),
+    if given, adds more content to every page.
+    """
+    doc = fitz.open()
+    for number in range(1, pages + 1):
+        page = doc.new_page()
+        page.insert_text((72, 72), f"{label} page {number}", **text_options)
+        if draw:
+            draw(page)
+    data = doc.tobytes()
+    doc.close()
+    return data
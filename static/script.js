@@ -98,22 +98,26 @@ document.addEventListener('DOMContentLoaded', () => {
         formData.append('file', currentFile);
 
         try {
-            const response = await fetch('/convert', {
+            // Start a conversion job, then follow its progress
+            const response = await fetch('/jobs', {
                 method: 'POST',
                 body: formData
             });
 
             if (response.ok) {
-                const blob = await response.blob();
-                const downloadUrl = window.URL.createObjectURL(blob);
-                const a = document.createElement('a');
-                a.href = downloadUrl;
-                a.download = 'dark_' + currentFile.name;
-                document.body.appendChild(a);
-                a.click();
-                a.remove();
-                window.URL.revokeObjectURL(downloadUrl);
-                showStatus('Conversion successful! Download started.', 'success');
+                const job = await response.json();
+                const state = await followJob(job);
+                if (state.status === 'done') {
+                    const a = document.createElement('a');
+                    a.href = '/jobs/' + job.id + '/result';
+                    a.download = 'dark_' + currentFile.name;
+                    document.body.appendChild(a);
+                    a.click();
+                    a.remove();
+                    showStatus('Conversion successful! Download started.', 'success');
+                } else {
+                    showStatus('Error: ' + (state.error || 'Conversion failed'), 'error');
+                }
             } else {
                 const errorData = await response.json();
                 showStatus('Error: ' + (errorData.detail || 'Conversion failed'), 'error');
@@ -126,6 +130,34 @@ document.addEventListener('DOMContentLoaded', () => {
         }
     });
 
+    function followJob(job) {
+        if (job.status === 'done' || job.status === 'failed') return Promise.resolve(job);
+        return new Promise((resolve) => {
+            const events = new EventSource('/jobs/' + job.id + '/events');
+            events.addEventListener('progress', (e) => {
+                const state = JSON.parse(e.data);
+                if (state.pages_total) {
+                    let msg = 'Converting page ' + state.pages_done + ' of ' + state.pages_total;
+                    if (state.eta_seconds) msg += ' (about ' + Math.ceil(state.eta_seconds) + ' s left)';
+                    showStatus(msg, '');
+                }
+            });
+            events.addEventListener('done', (e) => {
+                events.close();
+                resolve(JSON.parse(e.data));
+            });
+            events.addEventListener('error', (e) => {
+                events.close();
+                if (e.data) {
+                    resolve(JSON.parse(e.data));
+                } else {
+                    fetch('/jobs/' + job.id).then(r => r.json()).then(resolve,
+                        () => resolve({ status: 'failed', error: 'Connection lost' }));
+                }
+            });
+        });
+    }
+
     function setLoading(isLoading) {
         convertBtn.disabled = isLoading;
         if (isLoading) {
@@ -0,0 +1,36 @@
+import os
+import re
+import tempfile
+import uuid
+
+# Helpers shared by the on-disk stores (jobs.JobStore,
+# documents.DocumentStore, profiling.ProfileStore): the ids they hand out,
+# and files written so that readers never see half of one.
+
+_ID = re.compile(r"[0-9a-f]{32}\Z")
+
+
+def new_id():
+    """A new random id."""
+    return uuid.uuid4().hex
+
+
+def is_id(value):
+    """Whether value looks like an id new_id() hands out."""
+    return bool(_ID.match(value))
+
+
+def checked_id(value):
+    """value if it looks like an id new_id() hands out, else KeyError."""
+    if not is_id(value):
+        # Ids end up in paths - only accept what the store hands out
+        raise KeyError(value)
+    return value
+
+
+def write_atomic(path, data):
+    """Write data to path under a temporary name first, so readers in other processes never see half a file."""
+    fd, tmp = tempfile.mkstemp(dir=os.path.dirname(path), suffix=".tmp")
+    with os.fdopen(fd, "wb") as f:
+        f.write(data)
+    os.replace(tmp, path)
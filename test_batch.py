@@ -0,0 +1,110 @@
+import io
+import json
+import zipfile
+import fitz
+from fastapi.testclient import TestClient
+import app
+from batch import ZipStream, output_names, unpack_zip
+from sample_pdf import create_pdf_bytes
+
+
+def create_zip(entries):
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, "w", compression=zipfile.ZIP_DEFLATED) as archive:
+        for name, data in entries:
+            archive.writestr(name, data)
+    return buffer.getvalue()
+
+
+def read_batch(response):
+    archive = zipfile.ZipFile(io.BytesIO(response.content))
+    assert archive.testzip() is None
+    manifest = json.loads(archive.read("manifest.json"))
+    # The manifest comes last, after every converted entry
+    assert archive.namelist()[-1] == "manifest.json"
+    return archive, manifest
+
+
+def test_zip_helpers():
+    assert output_names(["a.pdf", "a.pdf", "../notes/b.pdf"]) == ["dark_a.pdf", "dark_a (2).pdf", "notes/dark_b.pdf"]
+    entries = unpack_zip(create_zip([("week1/a.pdf", b"%PDF"), ("readme.txt", b"hi"), ("__MACOSX/._a.pdf", b"")]),
+                         10, 1000, 10000)
+    # PDFs are only inflated when read
+    assert [(name, read and read(), error) for name, read, error in entries] == [
+        ("week1/a.pdf", b"%PDF", None), ("readme.txt", None, "File must be a PDF")]
+    # Sizes are checked before anything is inflated
+    entries = unpack_zip(create_zip([("big.pdf", b"0" * 5000)]), 10, 1000, 10000)
+    assert entries[0][1] is None and "larger" in entries[0][2]
+
+    stream = ZipStream()
+    pieces = [stream.add("dark_a.pdf", b"%PDF-1.7"), stream.add_manifest({"entries": 1}), stream.close()]
+    assert all(pieces)
+    assert zipfile.ZipFile(io.BytesIO(b"".join(pieces))).read("dark_a.pdf") == b"%PDF-1.7"
+
+
+def test_batch_of_files():
+    files = [
+        ("files", ("one.pdf", create_pdf_bytes(label="First handout"), "application/pdf")),
+        ("files", ("broken.pdf", b"%PDF-1.4 not really", "application/pdf")),
+        ("files", ("notes.txt", b"plain text", "text/plain")),
+        ("files", ("one.pdf", create_pdf_bytes(label="Second handout"), "application/pdf")),
+    ]
+    with TestClient(app.app) as client:
+        response = client.post("/convert/batch", files=files)
+    assert response.status_code == 200
+    assert response.headers["content-type"] == "application/zip"
+    assert 'filename="dark_batch.zip"' in response.headers["content-disposition"]
+
+    archive, manifest = read_batch(response)
+    assert (manifest["entries"], manifest["converted"], manifest["failed"]) == (4, 2, 2)
+    # Failed entries do not fail the batch; each says why
+    statuses = [(entry["name"], entry["status"], entry["output"]) for entry in manifest["files"]]
+    assert statuses == [("one.pdf", "converted", "dark_one.pdf"), ("broken.pdf", "failed", None),
+                        ("notes.txt", "failed", None), ("one.pdf", "converted", "dark_one (2).pdf")]
+    assert manifest["files"][2]["error"] == "File must be a PDF"
+    assert manifest["files"][1]["error"]
+    for output, text in (("dark_one.pdf", "First handout"), ("dark_one (2).pdf", "Second handout")):
+        doc = fitz.open(stream=archive.read(output), filetype="pdf")
+        assert text in doc[0].get_text()
+        doc.close()
+
+
+def test_batch_of_a_zip():
+    upload = create_zip([("week1/intro.pdf", create_pdf_bytes(label="Course intro")),
+                         ("week2/lab.pdf", create_pdf_bytes(label="Lab sheet"))])
+    # An entry whose bytes do not match its CRC fails when it is unpacked
+    buffer = io.BytesIO(upload)
+    with zipfile.ZipFile(buffer, "a", compression=zipfile.ZIP_STORED) as archive:
+        archive.writestr("week3/bad.pdf", b"%PDF-1.4 stored as is")
+    upload = buffer.getvalue().replace(b"stored as is", b"changed here")
+    with TestClient(app.app) as client:
+        response = client.post("/convert/batch", files={"files": ("pack.zip", upload, "application/zip")})
+        bad = client.post("/convert/batch", files={"files": ("pack.zip", b"not a zip", "application/zip")})
+    assert response.status_code == 200
+    assert 'filename="dark_pack.zip"' in response.headers["content-disposition"]
+    archive, manifest = read_batch(response)
+    assert manifest["converted"] == 2
+    assert manifest["files"][2]["error"].startswith("Cannot unpack")
+    assert sorted(archive.namelist()) == ["manifest.json", "week1/dark_intro.pdf", "week2/dark_lab.pdf"]
+    assert bad.status_code == 400
+
+
+def test_batch_limits():
+    saved = app.BATCH_MAX_FILES
+    app.BATCH_MAX_FILES = 1
+    try:
+        with TestClient(app.app) as client:
+            response = client.post("/convert/batch", files=[
+                ("files", ("a.pdf", create_pdf_bytes(label="a"), "application/pdf")),
+                ("files", ("b.pdf", create_pdf_bytes(label="b"), "application/pdf"))])
+    finally:
+        app.BATCH_MAX_FILES = saved
+    assert response.status_code == 413
+
+
+if __name__ == "__main__":
+    test_zip_helpers()
+    test_batch_of_files()
+    test_batch_of_a_zip()
+    test_batch_limits()
+    print("Batch conversion OK")
@@ -0,0 +1,146 @@
+import json
+import os
+import shutil
+import tempfile
+import fitz
+import cli
+
+
+def create_pdf(path, text):
+    doc = fitz.open()
+    doc.new_page().insert_text((72, 72), text)
+    doc.save(path)
+    doc.close()
+
+
+def create_archive():
+    directory = tempfile.mkdtemp(prefix="test_cli_")
+    source = os.path.join(directory, "archive")
+    os.makedirs(os.path.join(source, "2019"))
+    create_pdf(os.path.join(source, "index.pdf"), "Archive index")
+    create_pdf(os.path.join(source, "2019", "report.pdf"), "Annual report")
+    with open(os.path.join(source, "2019", "broken.pdf"), "wb") as f:
+        f.write(b"%PDF-1.4 not really a PDF")
+    with open(os.path.join(source, "notes.txt"), "w") as f:
+        f.write("not converted")
+    return directory, source, os.path.join(directory, "dark")
+
+
+def read_manifest(out):
+    with open(os.path.join(out, cli.MANIFEST_NAME)) as f:
+        return [json.loads(line) for line in f]
+
+
+def _crash_on_request(input_path, output_path):
+    """Stands in for cli._convert_file: takes the worker process down on crash.pdf."""
+    if input_path.endswith("crash.pdf"):
+        os._exit(1)
+    return _convert_file(input_path, output_path)
+
+
+_convert_file = cli._convert_file
+
+
+def test_convert_and_resume():
+    directory, source, out = create_archive()
+    try:
+        assert cli.main(["convert", source, "-o", out, "--jobs", "2", "-q"]) == 1
+        assert os.path.exists(os.path.join(out, "dark_index.pdf"))
+        doc = fitz.open(os.path.join(out, "2019", "dark_report.pdf"))
+        assert "Annual report" in doc[0].get_text()
+        doc.close()
+        records = {os.path.basename(r["input"]): r for r in read_manifest(out)}
+        assert sorted(records) == ["broken.pdf", "index.pdf", "report.pdf"]
+        assert records["report.pdf"]["status"] == "converted" and records["report.pdf"]["pages"] == 1
+        assert records["broken.pdf"]["status"] == "failed" and records["broken.pdf"]["error"]
+        assert len(records["index.pdf"]["sha256"]) == 64
+
+        # Rerun: converted files are skipped, the failed one is retried unless told otherwise
+        manifest = cli.Manifest(os.path.join(out, cli.MANIFEST_NAME))
+        settings = records["index.pdf"]["settings"]
+        pairs = cli.find_pdfs([source], out)
+        todo, skipped = cli.plan(pairs, manifest, settings)
+        assert [os.path.basename(i) for i, _o in todo] == ["broken.pdf"] and len(skipped) == 2
+        todo, skipped = cli.plan(pairs, manifest, settings, skip_failed=True)
+        assert todo == []
+        # Touched but unchanged: still skipped; changed or with its output gone: converted again
+        os.utime(os.path.join(source, "index.pdf"))
+        create_pdf(os.path.join(source, "2019", "report.pdf"), "Annual report, revised")
+        todo, skipped = cli.plan(pairs, manifest, settings, skip_failed=True)
+        assert [os.path.basename(i) for i, _o in todo] == ["report.pdf"]
+        os.remove(os.path.join(out, "dark_index.pdf"))
+        todo, _ = cli.plan(pairs, manifest, settings, skip_failed=True)
+        assert sorted(os.path.basename(i) for i, _o in todo) == ["index.pdf", "report.pdf"]
+        # Other settings: everything again
+        todo, _ = cli.plan(pairs, manifest, dict(settings, mode="rewrite"), skip_failed=True)
+        assert len(todo) == 3
+        manifest.close()
+
+        assert cli.main(["convert", source, "-o", out, "--skip-failed", "-q"]) == 0
+        doc = fitz.open(os.path.join(out, "2019", "dark_report.pdf"))
+        assert "revised" in doc[0].get_text()
+        doc.close()
+    finally:
+        shutil.rmtree(directory)
+
+
+def test_torn_manifest_line():
+    directory = tempfile.mkdtemp(prefix="test_cli_")
+    try:
+        path = os.path.join(directory, cli.MANIFEST_NAME)
+        with open(path, "w") as f:
+            f.write(json.dumps({"input": "/a.pdf", "status": "converted"}) + "\n" + '{"input": "/b.p')
+        manifest = cli.Manifest(path)
+        assert list(manifest.records) == ["/a.pdf"]
+        manifest.add({"input": "/c.pdf", "status": "failed"})
+        manifest.close()
+        assert list(cli.Manifest(path).records) == ["/a.pdf", "/c.pdf"]
+    finally:
+        shutil.rmtree(directory)
+
+
+def test_worker_crash_fails_only_its_file():
+    directory, source, out = create_archive()
+    create_pdf(os.path.join(source, "crash.pdf"), "Takes the worker down")
+    cli._convert_file = _crash_on_request
+    try:
+        assert cli.main(["convert", source, "-o", out, "--jobs", "2", "-q"]) == 1
+    finally:
+        cli._convert_file = _convert_file
+    try:
+        records = {os.path.basename(r["input"]): r for r in read_manifest(out)}
+        assert records["crash.pdf"]["status"] == "failed"
+        assert "Worker process died" in records["crash.pdf"]["error"]
+        assert records["index.pdf"]["status"] == "converted"
+        assert records["report.pdf"]["status"] == "converted"
+    finally:
+        shutil.rmtree(directory)
+
+
+def test_output_collisions_fail():
+    directory = tempfile.mkdtemp(prefix="test_cli_")
+    out = os.path.join(directory, "dark")
+    for year in ("a2023", "a2024"):
+        os.makedirs(os.path.join(directory, year))
+        create_pdf(os.path.join(directory, year, "report.pdf"), f"Report {year}")
+    first, second = (os.path.join(directory, year) for year in ("a2023", "a2024"))
+    try:
+        assert cli.main(["convert", first, second, first, "-o", out, "-q"]) == 1
+        # The first source keeps the output, the same source again is no collision
+        records = read_manifest(out)
+        assert len(records) == 1 and records[0]["input"] == os.path.abspath(os.path.join(first, "report.pdf"))
+        doc = fitz.open(os.path.join(out, "dark_report.pdf"))
+        assert "Report a2023" in doc[0].get_text()
+        doc.close()
+        # Still reported on a rerun
+        assert cli.main(["convert", first, second, "-o", out, "-q"]) == 1
+    finally:
+        shutil.rmtree(directory)
+
+
+if __name__ == "__main__":
+    test_convert_and_resume()
+    test_torn_manifest_line()
+    test_worker_crash_fails_only_its_file()
+    test_output_collisions_fail()
+    print("CLI OK")
@@ -0,0 +1,72 @@
+import fitz
+from color_mapper import ColorMapper, normalize_color
+from converter import PDFDarkThemeConverter
+
+
+def test_normalize_every_color_format():
+    assert normalize_color(0xFFFFFF) == (1.0, 1.0, 1.0)
+    assert normalize_color((0.5,)) == (0.5, 0.5, 0.5)
+    assert normalize_color((255, 0, 0)) == (1.0, 0.0, 0.0)
+    assert normalize_color([0.0, 0.0, 0.0, 1.0]) == (0.0, 0.0, 0.0)  # CMYK black
+    assert normalize_color(None) is None
+
+
+def test_roles_of_the_dark_palette():
+    colors = ColorMapper("dark")
+    text, background = colors.palette.text, colors.palette.background
+    assert colors.map((0.0, 0.0, 0.0), "stroke") == text
+    assert colors.map(None, "stroke") == text        # default stroke is black
+    assert colors.map((1.0, 1.0, 1.0), "fill") == background
+    assert colors.map((0.0, 0.0, 0.0), "fill") == (0.0, 0.0, 0.0)
+    assert colors.map(None, "fill") is None
+    assert colors.map(0xFF0000, "text") == text       # text is uniform
+    assert colors.map((1.0, 0.0, 0.0), "stroke") == (1.0, 0.0, 0.0)
+
+
+def test_invert_palette_keeps_hue():
+    colors = ColorMapper("invert")
+    r, g, b = colors.map((0.0, 0.0, 0.5), "stroke")  # dark blue
+    assert b > r and b > g and b > 0.5
+
+
+def test_each_color_is_computed_once():
+    colors = ColorMapper("dark")
+    calls = []
+    compute = colors._compute
+    colors._compute = lambda key, role: calls.append(key) or compute(key, role)
+    for _ in range(1000):
+        colors.map((0.0, 0.0, 0.0), "stroke")
+        colors.map([0, 0, 0], "stroke")  # same color, other format
+    assert len(calls) == 1
+
+
+def test_int_and_float_colors_are_cached_apart():
+    colors = ColorMapper("dark")
+    assert colors.map((1.0, 1.0, 1.0), "fill") == colors.palette.background
+    # Equal as tuples, but 0-255 ints: near-black, not white
+    assert colors.map((1, 1, 1), "fill") == (0.0039, 0.0039, 0.0039)
+
+
+def test_sepia_palette_is_used_by_every_stage():
+    src = fitz.open()
+    page = src.new_page()
+    page.draw_rect(fitz.Rect(50, 50, 200, 100), color=(0, 0, 0), width=2)
+    page.insert_text((72, 300), "Sepia", color=(0, 0, 0))
+    converter = PDFDarkThemeConverter(palette="sepia")
+
+    for mode in ("overlay", "rewrite"):
+        out = fitz.open(stream=converter.convert_bytes(src.tobytes(), mode=mode), filetype="pdf")
+        pix = out[0].get_pixmap(dpi=20)
+        assert pix.pixel(1, 1) in ((244, 232, 204), (245, 232, 204))
+        spans = [s for b in out[0].get_text("dict")["blocks"] for l in b["lines"] for s in l["spans"]]
+        assert spans[-1]["color"] == 0x5C4226
+
+
+if __name__ == "__main__":
+    test_normalize_every_color_format()
+    test_roles_of_the_dark_palette()
+    test_invert_palette_keeps_hue()
+    test_each_color_is_computed_once()
+    test_int_and_float_colors_are_cached_apart()
+    test_sepia_palette_is_used_by_every_stage()
+    print("ColorMapper OK")
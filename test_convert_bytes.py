@@ -0,0 +1,39 @@
+import fitz
+import io
+from converter import PDFDarkThemeConverter
+
+
+def create_pdf_bytes():
+    doc = fitz.open()
+    page = doc.new_page()
+    page.draw_rect(page.rect, fill=(1, 1, 1))  # White BG
+    page.insert_text((100, 100), "In-memory conversion", color=(0, 0, 0))
+    data = doc.tobytes()
+    doc.close()
+    return data
+
+
+def test_convert_bytes():
+    converter = PDFDarkThemeConverter()
+    output = converter.convert_bytes(create_pdf_bytes())
+
+    doc = fitz.open(stream=output, filetype="pdf")
+    assert len(doc) == 1
+    assert "In-memory conversion" in doc[0].get_text()
+    doc.close()
+
+
+def test_convert_stream():
+    converter = PDFDarkThemeConverter()
+    out = io.BytesIO()
+    converter.convert_stream(io.BytesIO(create_pdf_bytes()), out)
+
+    doc = fitz.open(stream=out.getvalue(), filetype="pdf")
+    assert "In-memory conversion" in doc[0].get_text()
+    doc.close()
+
+
+if __name__ == "__main__":
+    test_convert_bytes()
+    test_convert_stream()
+    print("In-memory conversion OK")
@@ -0,0 +1,68 @@
+import fitz
+import corpus
+from benchmark import compare
+from converter import PDFDarkThemeConverter
+
+
+def test_corpus_is_reproducible():
+    for kind in corpus.KINDS:
+        assert corpus.generate(kind, 2) == corpus.generate(kind, 2), kind
+
+
+def test_corpus_kinds():
+    doc = fitz.open(stream=corpus.generate("vector-dense", 1), filetype="pdf")
+    assert len(doc[0].get_drawings()) >= 2000
+
+    doc = fitz.open(stream=corpus.generate("scanned", 2), filetype="pdf")
+    assert len(doc) == 2
+    assert doc[0].get_images() and not doc[0].get_text().strip()
+
+    doc = fitz.open(stream=corpus.generate("image-heavy", 1), filetype="pdf")
+    assert len(doc[0].get_images()) == 6
+
+    doc = fitz.open(stream=corpus.generate("out-of-bounds", 1), filetype="pdf")
+    page = doc[0]
+    spans = [s for b in page.get_text("dict", clip=fitz.Rect(-1000, -1000, 5000, 5000))["blocks"]
+             for l in b.get("lines", []) for s in l["spans"]]
+    assert max(s["bbox"][2] for s in spans) > page.rect.width
+    assert max(s["bbox"][3] for s in spans) > page.rect.height
+
+
+def test_stage_timings():
+    converter = PDFDarkThemeConverter()
+    converter.convert_bytes(corpus.generate("image-heavy", 2))
+    stages = converter.last_stats["stages"]
+    assert set(stages) >= {"classify", "index_images", "get_text", "curtain", "images", "text", "save"}
+    # Captions and photos, no vector graphics - the path steps are skipped
+    assert not set(stages) & {"get_drawings", "paths"}
+    assert sum(stages.values()) > 0
+
+    converter.convert_bytes(corpus.generate("scanned", 1), mode="raster")
+    assert set(converter.last_stats["stages"]) == {"raster", "save"}
+
+
+def test_compare():
+    baseline = {"text-dense-10": {"seconds": 1.0, "pages_per_second": 10.0, "peak_rss_mb": 100.0, "size_ratio": 1.0}}
+    same = {"text-dense-10": {"seconds": 1.1, "pages_per_second": 9.1, "peak_rss_mb": 110.0, "size_ratio": 1.0}}
+    assert compare(same, baseline, 0.2) == []
+
+    slow = dict(same["text-dense-10"], seconds=2.0, pages_per_second=5.0)
+    regressions = compare({"text-dense-10": slow}, baseline, 0.2)
+    assert len(regressions) == 1 and "pages_per_second" in regressions[0]
+
+    fat = dict(same["text-dense-10"], peak_rss_mb=150.0, size_ratio=1.5)
+    assert len(compare({"text-dense-10": fat}, baseline, 0.2)) == 2
+
+    # A tiny document twice as slow by 10 ms is noise
+    tiny = {"text-dense-1": {"seconds": 0.01, "pages_per_second": 100.0, "peak_rss_mb": 100.0, "size_ratio": 1.0}}
+    assert compare({"text-dense-1": dict(tiny["text-dense-1"], seconds=0.02, pages_per_second=50.0)}, tiny, 0.2) == []
+    # Cases missing from the baseline are not compared
+    assert compare(same, {}, 0.2) == []
+
+
+if __name__ == "__main__":
+    test_corpus_is_reproducible()
+    test_corpus_kinds()
+    test_stage_timings()
+    test_compare()
+    print("Corpus OK")
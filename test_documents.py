@@ -0,0 +1,85 @@
+import os
+import fitz
+from converter import PDFDarkThemeConverter
+from sample_pdf import create_pdf_bytes
+
+
+def test_convert_page_converts_only_that_page():
+    converter = PDFDarkThemeConverter()
+    output = converter.convert_page(create_pdf_bytes(20), 12)
+    doc = fitz.open(stream=output, filetype="pdf")
+    assert len(doc) == 1
+    assert "Test page 13" in doc[0].get_text()
+    # Dark background
+    assert doc[0].get_pixmap(dpi=20).pixel(2, 2)[0] < 64
+    doc.close()
+    assert converter.last_stats["pages"] == 1
+
+    try:
+        converter.convert_page(create_pdf_bytes(2), 2)
+    except IndexError:
+        pass
+    else:
+        raise AssertionError("missing page accepted")
+
+
+def test_document_page_endpoint():
+    from fastapi.testclient import TestClient
+    import app
+
+    with TestClient(app.app) as client:
+        response = client.post("/documents", files={"file": ("book.pdf", create_pdf_bytes(12), "application/pdf")})
+        assert response.status_code == 201
+        meta = response.json()
+        assert meta["pages"] == 12
+        doc_id = meta["id"]
+
+        page = client.get(f"/documents/{doc_id}/pages/5")
+        assert page.status_code == 200
+        assert page.headers["content-type"] == "application/pdf"
+        assert "Test page 5" in fitz.open(stream=page.content, filetype="pdf")[0].get_text()
+        assert os.path.exists(app.documents.page_path(doc_id, 5))
+        assert not os.path.exists(app.documents.page_path(doc_id, 6))   # lazily, one page at a time
+
+        image = client.get(f"/documents/{doc_id}/pages/5?format=png&dpi=72")
+        assert image.status_code == 200
+        assert image.content.startswith(b"\x89PNG")
+        pix = fitz.Pixmap(image.content)
+        rect = fitz.open(stream=page.content, filetype="pdf")[0].rect
+        assert (pix.width, pix.height) == (round(rect.width), round(rect.height))
+        assert os.path.exists(app.documents.page_path(doc_id, 5, dpi=72))
+
+        # Served from the page store the second time
+        assert client.get(f"/documents/{doc_id}/pages/5").content == page.content
+
+        assert client.get(f"/documents/{doc_id}/pages/13").status_code == 404
+        assert client.get(f"/documents/{doc_id}/pages/1?format=png&dpi=5000").status_code == 400
+        assert client.get("/documents/0123456789abcdef0123456789abcdef/pages/1").status_code == 404
+        app.documents.delete(doc_id)
+
+
+def test_document_store_cleanup():
+    import tempfile
+    import time
+    from documents import DocumentStore
+
+    store = DocumentStore(tempfile.mkdtemp(), ttl=60)
+    old = store.add(b"%PDF-old", "old.pdf", 1)
+    new = store.add(b"%PDF-new", "new.pdf", 1)
+    store.write_page(new, 1, b"page")
+    assert store.read_page(new, 1) == b"page"
+    assert store.read_page(new, 2) is None
+
+    past = time.time() - 120
+    os.utime(os.path.join(store.directory, old), (past, past))
+    assert store.cleanup() == 1
+    assert store.meta(old) is None
+    assert store.meta(new)["filename"] == "new.pdf"
+    assert store.meta("../etc") is None
+
+
+if __name__ == "__main__":
+    test_convert_page_converts_only_that_page()
+    test_document_page_endpoint()
+    test_document_store_cleanup()
+    print("Documents OK")
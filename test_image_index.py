@@ -0,0 +1,61 @@
+import fitz
+from converter import PDFDarkThemeConverter
+from image_index import ImagePlacementIndex
+
+
+def _logo():
+    pix = fitz.Pixmap(fitz.csRGB, fitz.IRect(0, 0, 8, 4), False)
+    pix.clear_with(120)
+    return pix.tobytes("png")
+
+
+def create_logo_pdf(pages=4):
+    doc = fitz.open()
+    logo = _logo()
+    for i in range(pages):
+        page = doc.new_page()
+        page.insert_text((72, 400), f"Page {i + 1}", color=(0, 0, 0))
+        page.insert_image(fitz.Rect(50, 50, 150, 100), stream=logo)
+        page.insert_image(fitz.Rect(400, 700, 500, 800), stream=logo)
+    doc[1].set_rotation(90)
+    doc[2].set_cropbox(fitz.Rect(20, 30, 580, 820))
+    data = doc.tobytes(garbage=3)  # one shared image object for all pages
+    doc.close()
+    return data
+
+
+def _pdf_transforms(page):
+    """Image transforms in PDF coordinates - independent of MediaBox changes."""
+    to_pdf = ~page.transformation_matrix
+    return sorted(tuple(round(v, 1) for v in fitz.Matrix(info["transform"]) * to_pdf)
+                  for info in page.get_image_info())
+
+
+def test_index_covers_every_placement():
+    doc = fitz.open(stream=create_logo_pdf(), filetype="pdf")
+    index = ImagePlacementIndex()
+    for page in doc:
+        index.add_page(page)
+    assert len(index.placements) == 1  # one shared xref
+    assert index.placement_count() == 8
+
+
+def test_images_keep_their_place():
+    data = create_logo_pdf()
+    src = fitz.open(stream=data, filetype="pdf")
+    out = fitz.open(stream=PDFDarkThemeConverter().convert_bytes(data), filetype="pdf")
+
+    for src_page, out_page in zip(src, out):
+        # The originals stay under the curtain, the copies on top must match them
+        transforms = _pdf_transforms(out_page)
+        assert len(transforms) == 2 * len(_pdf_transforms(src_page))
+        assert set(transforms) == set(_pdf_transforms(src_page))
+        # Re-emitted as references: still a single image object
+        assert {img[0] for img in out_page.get_images()} == {img[0] for img in out[0].get_images()}
+    assert len({img[0] for page in out for img in page.get_images()}) == 1
+
+
+if __name__ == "__main__":
+    test_index_covers_every_placement()
+    test_images_keep_their_place()
+    print("Image placement index OK")
@@ -0,0 +1,91 @@
+import json
+import shutil
+import tempfile
+import time
+import fitz
+from converter import PDFDarkThemeConverter
+from jobs import JobStore, run_job
+from sample_pdf import create_pdf_bytes
+
+
+def test_run_job_records_progress_and_result():
+    store = JobStore(tempfile.mkdtemp(prefix="jobs_"))
+    job_id = store.create("report.pdf")
+    assert store.state(job_id)["status"] == "queued"
+
+    seen = []
+    converter = PDFDarkThemeConverter()
+    original_update = store.update
+
+    def update(job, **fields):
+        if "pages_done" in fields:
+            seen.append(fields["pages_done"])
+        original_update(job, **fields)
+
+    store.update = update
+    run_job(store, job_id, converter, create_pdf_bytes(6), {}, interval=0)
+
+    state = store.state(job_id)
+    assert state["status"] == "done"
+    assert (state["pages_done"], state["pages_total"]) == (6, 6)
+    assert seen[:6] == [1, 2, 3, 4, 5, 6]
+    with open(store.result_path(job_id), "rb") as f:
+        assert "Test page 6" in fitz.open(stream=f.read(), filetype="pdf")[5].get_text()
+    assert converter.progress is None
+    shutil.rmtree(store.directory)
+
+
+def test_failed_job_and_ttl_cleanup():
+    store = JobStore(tempfile.mkdtemp(prefix="jobs_"), ttl=60)
+    job_id = store.create("broken.pdf")
+    converter = PDFDarkThemeConverter()
+    converter.max_pages = 1
+    try:
+        run_job(store, job_id, converter, create_pdf_bytes(2), {})
+    except Exception:
+        pass
+    state = store.state(job_id)
+    assert state["status"] == "failed"
+    assert state["error_type"] == "PageLimitExceeded"
+
+    assert store.cleanup() == 0
+    assert store.cleanup(now=time.time() + 120) == 1
+    assert store.state(job_id) is None
+    assert store.state("../../etc") is None
+    shutil.rmtree(store.directory)
+
+
+def test_job_api_flow():
+    from fastapi.testclient import TestClient
+    import app
+
+    with TestClient(app.app) as client:
+        response = client.post("/jobs", files={"file": ("manual.pdf", create_pdf_bytes(30, str(time.time())),
+                                                        "application/pdf")})
+        assert response.status_code == 202
+        job_id = response.json()["id"]
+
+        events = []
+        with client.stream("GET", f"/jobs/{job_id}/events") as stream:
+            for line in stream.iter_lines():
+                if line.startswith("event: "):
+                    events.append(line[7:])
+                elif line.startswith("data: "):
+                    last = json.loads(line[6:])
+        assert events[-1] == "done"
+        assert last["pages_done"] == last["pages_total"] == 30
+
+        assert client.get(f"/jobs/{job_id}").json()["status"] == "done"
+        result = client.get(f"/jobs/{job_id}/result")
+        assert result.status_code == 200
+        assert 'filename="dark_manual.pdf"' in result.headers["content-disposition"]
+        assert len(fitz.open(stream=result.content, filetype="pdf")) == 30
+
+        assert client.get("/jobs/0123456789abcdef0123456789abcdef").status_code == 404
+
+
+if __name__ == "__main__":
+    test_run_job_records_progress_and_result()
+    test_failed_job_and_ttl_cleanup()
+    test_job_api_flow()
+    print("Jobs OK")
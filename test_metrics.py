@@ -0,0 +1,117 @@
+import fitz
+from converter import PDFDarkThemeConverter
+from hooks import ConversionHook, PageLog
+from metrics import MetricsHook, Registry
+from sample_pdf import create_pdf_bytes
+from worker_pool import ConversionPool
+
+
+def _draw_shapes(page):
+    page.draw_line((72, 100), (300, 100))
+    page.draw_rect(fitz.Rect(72, 120, 200, 160), color=(0, 0, 1))
+
+
+def metrics_pdf(pages):
+    return create_pdf_bytes(pages, "Metrics", draw=_draw_shapes, fontname="tiro")
+
+
+def test_hooks_get_pages_and_documents():
+    class Documents(ConversionHook):
+        def __init__(self):
+            self.stats = []
+
+        def document_done(self, stats):
+            self.stats.append(stats)
+
+    converter = PDFDarkThemeConverter()
+    log, documents = PageLog(), Documents()
+    converter.hooks = [log, documents]
+    converter.convert_bytes(metrics_pdf(3))
+
+    assert [pno for pno, _, _, _ in log.pages] == [0, 1, 2]
+    pno, seconds, stages, counts = log.pages[0]
+    assert seconds > 0 and seconds >= sum(stages.values()) * 0.9
+    assert set(stages) >= {"get_drawings", "get_text", "paths", "text"}
+    assert counts["spans"] == 1 and counts["paths"] == 2
+
+    assert len(documents.stats) == 1
+    stats = documents.stats[0]
+    assert stats["counts"]["spans"] == 3 and stats["counts"]["paths"] == 6
+    assert "save" in stats["stages"]
+
+
+def test_font_fallbacks_are_counted():
+    doc = fitz.open()
+    page = doc.new_page()
+    # A font that is not one of the builtin ones is redrawn in Helvetica
+    page.insert_font(fontname="F0", fontbuffer=fitz.Font("cjk").buffer)
+    page.insert_text((72, 72), "Fallback", fontname="F0")
+    converter = PDFDarkThemeConverter()
+    converter.convert_bytes(doc.tobytes())
+    assert converter.last_stats["counts"]["font_fallbacks"] == 1
+
+
+def test_parallel_pages_are_replayed():
+    converter = PDFDarkThemeConverter()
+    converter.workers, converter.parallel_min_pages, converter.min_pages_per_shard = 2, 2, 1
+    log = PageLog()
+    converter.hooks = [log]
+    converter.convert_bytes(metrics_pdf(4))
+    assert sorted(pno for pno, _, _, _ in log.pages) == [0, 1, 2, 3]
+    assert converter.last_stats["counts"]["spans"] == 4
+
+
+def test_registry_render_and_merge():
+    worker = Registry()
+    hook = MetricsHook(worker)
+    hook.page_done(0, 0.003, {"text": 0.002, "paths": 0.0004}, {"spans": 5, "errors": 1})
+    hook.document_done({"pages": 1, "page_cache_hits": 0, "stages": {"save": 0.2}})
+
+    web = Registry()
+    web.merge(worker.snapshot(reset=True))
+    web.merge(worker.snapshot(reset=True))   # nothing new
+    text = web.render()
+    assert '# TYPE nightowl_stage_seconds histogram' in text
+    assert 'nightowl_stage_seconds_bucket{stage="text",le="0.0025"} 1' in text
+    assert 'nightowl_stage_seconds_bucket{stage="paths",le="0.0005"} 1' in text
+    assert 'nightowl_stage_seconds_count{stage="save"} 1' in text
+    assert 'nightowl_page_objects_total{kind="spans"} 5' in text
+    assert 'nightowl_swallowed_errors_total 1' in text
+    assert 'nightowl_pages_total{source="converted"} 1' in text
+
+
+def test_pool_ships_worker_metrics():
+    registry = Registry()
+    pool = ConversionPool(workers=1, metrics=registry)
+    pool.submit(metrics_pdf(2)).result()
+    pool.submit(metrics_pdf(3)).result()
+    pool.shutdown()
+    text = registry.render()
+    assert "nightowl_page_seconds_count 5" in text
+    assert 'nightowl_pool_jobs_total{kind="convert",outcome="ok"} 2' in text
+    assert "nightowl_documents_total 2" in text
+
+
+def test_metrics_endpoint():
+    from fastapi.testclient import TestClient
+    import app
+
+    with TestClient(app.app) as client:
+        assert client.post("/convert", files={"file": ("m.pdf", metrics_pdf(1), "application/pdf")}).status_code == 200
+        response = client.get("/metrics")
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/plain")
+    text = response.text
+    assert 'nightowl_http_request_seconds_count{method="POST",route="/convert",status="200"}' in text
+    assert "nightowl_pool_in_flight 0" in text
+    assert 'nightowl_cache_events_total{cache="result",event="misses"}' in text
+
+
+if __name__ == "__main__":
+    test_hooks_get_pages_and_documents()
+    test_font_fallbacks_are_counted()
+    test_parallel_pages_are_replayed()
+    test_registry_render_and_merge()
+    test_pool_ships_worker_metrics()
+    test_metrics_endpoint()
+    print("Metrics OK")
@@ -0,0 +1,84 @@
+import fitz
+import shutil
+import tempfile
+from converter import PDFDarkThemeConverter
+from page_cache import PageCache, page_fingerprint
+
+
+def create_contract(version, pages=12, changed=()):
+    """Contract-like document: numbered pages, a repeated template page, links and an outline."""
+    doc = fitz.open()
+    for i in range(pages):
+        page = doc.new_page()
+        if i % 4 == 3:
+            page.insert_text((72, 72), "Signature page - intentionally identical", fontsize=14)
+            page.draw_rect(fitz.Rect(72, 600, 300, 650), color=(0, 0, 0))
+            continue
+        page.insert_text((72, 72), f"Clause {i + 1}", fontsize=14)
+        text = f"Amended in version {version}" if i in changed else "Original wording"
+        page.insert_text((72, 100), text, fontsize=11)
+    for i in range(pages - 1):
+        doc[i].insert_link({"kind": fitz.LINK_GOTO, "from": fitz.Rect(72, 60, 200, 76), "page": i + 1})
+    doc.set_toc([[1, "Start", 1], [1, "End", pages]])
+    data = doc.tobytes()
+    doc.close()
+    return data
+
+
+def test_fingerprints_ignore_xref_numbers():
+    doc = fitz.open(stream=create_contract(1), filetype="pdf")
+    memo = {}
+    prints = [page_fingerprint(doc, page, memo) for page in doc]
+    assert prints[3] == prints[7] == prints[11]     # template pages
+    assert len(set(prints)) == 12 - 2
+    doc.close()
+
+
+def test_unchanged_pages_are_copied_from_the_cache():
+    directory = tempfile.mkdtemp(prefix="page_cache_")
+    converter = PDFDarkThemeConverter()
+    converter.page_cache = PageCache(directory)
+
+    converter.convert_bytes(create_contract(6))
+    # Only the repeated template pages hit on the first run
+    assert converter.last_stats["page_cache_hits"] == 2
+
+    output = converter.convert_bytes(create_contract(7, changed=(1, 5)))
+    stats = converter.last_stats
+    assert stats["pages"] == 12
+    assert stats["page_cache_hits"] == 10
+    assert stats["page_cache_hit_rate"] == 10 / 12
+
+    reference = PDFDarkThemeConverter().convert_bytes(create_contract(7, changed=(1, 5)))
+    cached_doc = fitz.open(stream=output, filetype="pdf")
+    reference_doc = fitz.open(stream=reference, filetype="pdf")
+    for cached_page, reference_page in zip(cached_doc, reference_doc):
+        assert cached_page.get_text() == reference_page.get_text()
+        assert cached_page.rect == reference_page.rect
+        assert len(cached_page.get_links()) == len(reference_page.get_links())
+    assert "Amended in version 7" in cached_doc[1].get_text()
+    assert cached_doc[0].get_links()[0]["page"] == 1
+    assert cached_doc.get_toc() == reference_doc.get_toc()
+    cached_doc.close()
+    reference_doc.close()
+    shutil.rmtree(directory)
+
+
+def test_palette_change_misses():
+    directory = tempfile.mkdtemp(prefix="page_cache_")
+    data = create_contract(1)
+    dark = PDFDarkThemeConverter()
+    dark.page_cache = PageCache(directory)
+    dark.convert_bytes(data)
+    sepia = PDFDarkThemeConverter(palette="sepia")
+    sepia.page_cache = dark.page_cache
+    sepia.convert_bytes(data)
+    assert sepia.last_stats["page_cache_hits"] == 2   # template pages only
+    shutil.rmtree(directory)
+
+
+if __name__ == "__main__":
+    test_fingerprints_ignore_xref_numbers()
+    test_unchanged_pages_are_copied_from_the_cache()
+    test_palette_change_misses()
+    print("Page cache OK")
@@ -0,0 +1,70 @@
+import fitz
+import corpus
+from converter import PDFDarkThemeConverter
+from hooks import PageLog
+from metrics import MetricsHook, Registry
+from page_classifier import BLANK, IMAGE_ONLY, MIXED, TEXT_ONLY, VECTOR_ONLY, classify_page
+
+
+def test_classes():
+    doc = fitz.open(stream=corpus.generate("mixed", 8), filetype="pdf")
+    assert [classify_page(page).page_class for page in doc] == [
+        TEXT_ONLY, BLANK, TEXT_ONLY, VECTOR_ONLY, IMAGE_ONLY, BLANK, TEXT_ONLY, IMAGE_ONLY]
+    doc = fitz.open(stream=corpus.generate("vector-dense", 1), filetype="pdf")
+    assert classify_page(doc[0]).page_class == MIXED
+
+
+def test_operator_scan():
+    doc = fitz.open()
+    page = doc.new_page()
+    # Operators inside names do not count, compact streams do
+    stream = doc.get_new_xref()
+    doc.update_object(stream, "<<>>")
+    doc.update_stream(stream, b"q /Fs gs 0 0 10 10 re W n Q")
+    doc.xref_set_key(page.xref, "Contents", f"{stream} 0 R")
+    assert classify_page(page).page_class == BLANK
+    doc.update_stream(stream, b"q 0 0 10 10 re f* Q")
+    assert classify_page(page).page_class == VECTOR_ONLY
+    doc.update_stream(stream, b"BT/F1 9 Tf(x)Tj ET")
+    assert classify_page(page).page_class == TEXT_ONLY
+    # Text drawn through a Form XObject, nested in another one
+    inner = fitz.open(stream=corpus.generate("text-dense", 1), filetype="pdf")
+    middle = fitz.open()
+    middle.new_page().show_pdf_page(middle[0].rect, inner, 0)
+    outer = fitz.open()
+    outer.new_page().show_pdf_page(outer[0].rect, middle, 0)
+    assert classify_page(outer[0]).page_class == TEXT_ONLY
+
+
+def test_fast_paths_and_stats():
+    converter = PDFDarkThemeConverter()
+    log = PageLog()
+    registry = Registry()
+    converter.hooks = [log, MetricsHook(registry)]
+    data = corpus.generate("mixed", 8)
+    out = fitz.open(stream=converter.convert_bytes(data), filetype="pdf")
+    assert len(out) == 8
+
+    stages = [set(stages) for _, _, stages, _ in log.pages]
+    assert not stages[1] & {"get_drawings", "index_images", "get_text", "paths", "images", "text"}
+    assert "curtain" in stages[1]
+    assert "get_text" in stages[0] and not stages[0] & {"get_drawings", "index_images"}
+    assert "get_drawings" in stages[3] and "get_text" not in stages[3]
+    assert "images" in stages[4] and not stages[4] & {"get_drawings", "get_text"}
+
+    counts = converter.last_stats["counts"]
+    assert counts["blank_pages"] == 2 and counts["text_only_pages"] == 3
+    assert counts["vector_only_pages"] == 1 and counts["image_only_pages"] == 2
+    assert 'nightowl_page_classes_total{kind="blank"} 2' in registry.render()
+
+    # Auto mode renders the image-only pages without looking for text
+    converter.convert_bytes(data, mode="auto")
+    assert converter.last_stats["stages"]["raster"] > 0
+    assert converter.last_stats["counts"]["image_only_pages"] == 2
+
+
+if __name__ == "__main__":
+    test_classes()
+    test_operator_scan()
+    test_fast_paths_and_stats()
+    print("Page classifier OK")
@@ -0,0 +1,102 @@
+import fitz
+import numpy as np
+from content_rewriter import format_number
+from converter import PDFDarkThemeConverter
+from page_model import OverlapGrid, PageModel, PathTable, SpanTable
+
+
+def create_page():
+    doc = fitz.open()
+    page = doc.new_page()
+    shape = page.new_shape()
+    # White background layer
+    shape.draw_rect(page.rect)
+    shape.finish(color=None, fill=(1, 1, 1))
+    shape.draw_rect(fitz.Rect(50, 50, 150, 100))
+    shape.finish(color=(0, 0, 0), fill=(0.5, 0.5, 0.5), width=0.5)
+    shape.draw_polyline([(200, 200), (250, 250), (200, 300)])
+    shape.finish(color=(0, 0, 0), width=2, lineCap=1, closePath=False)
+    shape.draw_quad(fitz.Rect(300, 300, 340, 320).quad)
+    shape.finish(color=(0, 0, 1))
+    shape.draw_bezier((100, 700), (150, 650), (200, 750), (700, 720))
+    shape.finish(color=(0, 0, 0), closePath=False)
+    shape.commit()
+    page.insert_text((72, 400), "Column one", fontsize=11)
+    page.insert_text((72, 420), "Column two", fontsize=11, color=(1, 0, 0))
+    return doc, page
+
+
+def test_path_table():
+    doc, page = create_page()
+    # Both capture APIs give the same table
+    for drawings in (page.get_drawings(), page.get_cdrawings()):
+        paths = PathTable.from_drawings(drawings)
+        assert len(paths) == 5
+        assert list(paths.paths["count"]) == [1, 1, 2, 1, 1]
+        assert list(paths.items["kind"]) == [1, 1, 0, 0, 2, 3]
+        # Caps are a number, not PyMuPDF's (start, dash, end) tuple
+        assert paths.styles[paths.paths["style"][2]][1] == 1
+        assert paths.bounds() == (700.0, 842.0)
+        assert list(paths.background(page.rect.width, page.rect.height, lambda c: c == (1, 1, 1))) == \
+            [True, False, False, False, False]
+        assert list(paths.plain()) == [True, True, False, False, False]
+        grid = OverlapGrid(paths, page.rect.width, page.rect.height)
+        assert not grid.overlaps(1)
+        grid.add(0)   # the background covers everything
+        assert grid.overlaps(1) and grid.overlaps(4)
+        grid.clear()
+        grid.add(1)
+        assert not grid.overlaps(2) and not grid.overlaps(3)
+
+    # Colors are mapped once per role (None, black, blue as strokes);
+    # the blue quad and the black curve end up with the same style
+    seen = []
+    codes, styles = paths.mapped_styles(lambda c: seen.append(c) or ((1, 1, 1) if c else None), lambda c: c)
+    assert len(seen) == 3
+    assert codes[3] == codes[4] and styles[codes[4]][0] == (1, 1, 1)
+    assert codes[2] != codes[4]
+    assert PathTable.from_drawings([]).bounds() == (0.0, 0.0)
+
+
+def test_operators_match_shape():
+    doc, page = create_page()
+    paths = PathTable.from_drawings(page.get_drawings())
+    shape = page.new_shape()
+    operators = paths.operators(shape.ipctm)
+    # The polyline: one move, then lines continuing from it
+    assert operators[2].count(" m\n") == 1 and operators[2].count(" l\n") == 2
+    # The same numbers fitz.Shape writes, at four decimals
+    shape.draw_bezier((100, 700), (150, 650), (200, 750), (700, 720))
+    expected = [float(v) for v in shape.draw_cont.split() if v not in ("m", "c")]
+    assert np.allclose([float(v) for v in operators[4].split() if v not in ("m", "c")], expected, atol=1e-4)
+    assert format_number(2.5) == "2.5" and format_number(1e-05) == "0" and format_number(3.0) == "3"
+
+
+def test_span_table_and_model():
+    doc, page = create_page()
+    spans = SpanTable.from_page(page)
+    assert spans.texts == ["Column one", "Column two"]
+    assert len(spans.fonts) == 1 and len(spans.colors) == 2
+    assert spans.count_codes("color", [False, True]) == 1
+    model = PageModel(spans, PathTable.from_drawings(page.get_cdrawings()))
+    assert model.bounds() == (700.0, 842.0)
+
+
+def test_converter_redraw_counts():
+    doc, page = create_page()
+    converter = PDFDarkThemeConverter()
+    shape = page.new_shape()
+    # Background skipped, every remaining path has its own style
+    assert converter._redraw_paths(shape, page.get_drawings(), page.rect) == 4
+    assert shape.totalcont.count("\nq\n") == 4
+    assert "1 J\n" in shape.totalcont
+    converter.convert_bytes(doc.tobytes())
+    assert converter.last_stats["counts"]["paths"] == 5
+
+
+if __name__ == "__main__":
+    test_path_table()
+    test_operators_match_shape()
+    test_span_table_and_model()
+    test_converter_redraw_counts()
+    print("Page model OK")
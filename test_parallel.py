@@ -0,0 +1,61 @@
+import fitz
+import os
+import tempfile
+from converter import PDFDarkThemeConverter
+
+
+def create_linked_pdf(filename, pages=24):
+    doc = fitz.open()
+    for i in range(pages):
+        # Mixed page sizes, so stitching has to keep each page's own box
+        page = doc.new_page(width=595 if i % 2 else 842, height=842 if i % 2 else 595)
+        page.insert_text((72, 72), f"Page {i + 1}", color=(0, 0, 0))
+        page.insert_text((700 if i % 3 == 0 else 72, 120), "Out of bounds" if i % 3 == 0 else "Inside")
+    for i in range(pages - 1):
+        doc[i].insert_link({"kind": fitz.LINK_GOTO, "from": fitz.Rect(72, 60, 200, 80),
+                            "page": pages - 1 - i, "to": fitz.Point(72, 100)})
+    doc[0].insert_link({"kind": fitz.LINK_URI, "from": fitz.Rect(72, 100, 200, 120), "uri": "https://example.com"})
+    doc.set_toc([[1, "Start", 1], [2, "Middle", pages // 2], [1, "End", pages]])
+    doc.save(filename)
+    doc.close()
+
+
+def _summary(path):
+    doc = fitz.open(path)
+    pages = [(tuple(page.rect), [(l["kind"], tuple(round(v, 2) for v in l["from"]), l.get("page"), l.get("uri"))
+                                for l in page.get_links()])
+             for page in doc]
+    toc = [(lvl, title, pno) for lvl, title, pno in doc.get_toc()]
+    text = [page.get_text() for page in doc]
+    doc.close()
+    return pages, toc, text
+
+
+def test_parallel_matches_serial():
+    converter = PDFDarkThemeConverter()
+    converter.parallel_min_pages = 8
+    converter.min_pages_per_shard = 4
+
+    with tempfile.TemporaryDirectory() as tmp:
+        src = os.path.join(tmp, "input.pdf")
+        serial = os.path.join(tmp, "serial.pdf")
+        parallel = os.path.join(tmp, "parallel.pdf")
+        create_linked_pdf(src)
+
+        converter.convert(src, serial, workers=1)
+        converter.convert(src, parallel, workers=3)
+
+        assert _summary(serial) == _summary(parallel)
+
+
+def test_small_documents_stay_serial():
+    converter = PDFDarkThemeConverter()
+    assert converter._resolve_workers(8, converter.parallel_min_pages - 1) == 1
+    assert converter._resolve_workers(4, 400) == 4
+    assert converter._resolve_workers(None, 400) == 1
+
+
+if __name__ == "__main__":
+    test_parallel_matches_serial()
+    test_small_documents_stay_serial()
+    print("Parallel conversion matches serial output.")
@@ -0,0 +1,95 @@
+import fitz
+from converter import PDFDarkThemeConverter
+
+
+def make_page(doc):
+    page = doc.new_page()
+    shape = page.new_shape()
+    for i in range(50):
+        shape.draw_line((50 + i * 5, 100), (50 + i * 5, 200))
+        shape.finish(color=(0, 0, 0), width=2)
+    # Overlapping filled circles must not be merged into one path
+    shape.draw_circle((300, 400), 40)
+    shape.finish(color=None, fill=(0.2, 0.4, 0.8))
+    shape.draw_circle((320, 400), 40)
+    shape.finish(color=None, fill=(0.2, 0.4, 0.8))
+    # Fill-only rectangle
+    shape.draw_rect(fitz.Rect(100, 600, 200, 650))
+    shape.finish(color=None, fill=(0.9, 0.2, 0.2))
+    shape.commit()
+    return page
+
+
+def test_identical_styles_share_one_finish():
+    doc = fitz.open()
+    page = make_page(doc)
+    converter = PDFDarkThemeConverter()
+    shape = page.new_shape()
+    finishes = converter._redraw_paths(shape, page.get_drawings(), page.rect)
+    # 50 lines -> 1, two overlapping circles -> 2, the rectangle -> 1
+    assert finishes == 4
+    doc.close()
+
+
+def test_disjoint_filled_paths_share_one_finish():
+    doc = fitz.open()
+    page = doc.new_page()
+    shape = page.new_shape()
+    # A grid of small filled triangles (outlined text, CAD hatching) ...
+    for i in range(40):
+        for j in range(40):
+            x, y = 50 + i * 12, 50 + j * 12
+            shape.draw_polyline([(x, y), (x + 10, y), (x, y + 10)])
+            shape.finish(color=None, fill=(0.2, 0.4, 0.8), closePath=True)
+    # ... and one on top of the first, which starts a new block
+    shape.draw_polyline([(52, 52), (58, 52), (52, 58)])
+    shape.finish(color=None, fill=(0.2, 0.4, 0.8), closePath=True)
+    shape.commit()
+    converter = PDFDarkThemeConverter()
+    assert converter._redraw_paths(page.new_shape(), page.get_drawings(), page.rect) == 2
+    doc.close()
+
+
+def test_overlapping_stroked_fills_keep_paint_order():
+    doc = fitz.open()
+    page = doc.new_page()
+    shape = page.new_shape()
+    # B is drawn over A: A's red border must not show through B's blue fill
+    shape.draw_rect(fitz.Rect(50, 50, 150, 150))
+    shape.finish(color=(1, 0, 0), fill=(0, 0, 1), width=4)
+    shape.draw_rect(fitz.Rect(100, 50, 200, 150))
+    shape.finish(color=(1, 0, 0), fill=(0, 0, 1), width=4)
+    shape.commit()
+    converter = PDFDarkThemeConverter()
+    assert converter._redraw_paths(page.new_shape(), page.get_drawings(), page.rect) == 2
+
+    out = fitz.open(stream=converter.convert_bytes(doc.tobytes()), filetype="pdf")
+    assert out[0].get_pixmap().pixel(150, 100)[:3] == (0, 0, 255)
+    doc.close()
+
+
+def test_batched_paths_render():
+    doc = fitz.open()
+    make_page(doc)
+    data = PDFDarkThemeConverter().convert_bytes(doc.tobytes())
+    doc.close()
+
+    out = fitz.open(stream=data, filetype="pdf")
+    page = out[0]
+    pix = page.get_pixmap()
+    # Grid lines are drawn in the text color, the fill-only rectangle in red
+    assert max(pix.pixel(x, 150)[0] for x in range(48, 53)) > 128
+    r, g, b = pix.pixel(150, 625)[:3]
+    assert r > 200 and g < 100
+    # The overlap of the two circles is filled, not cancelled out
+    r, g, b = pix.pixel(310, 400)[:3]
+    assert b > 150
+    out.close()
+
+
+if __name__ == "__main__":
+    test_identical_styles_share_one_finish()
+    test_disjoint_filled_paths_share_one_finish()
+    test_overlapping_stroked_fills_keep_paint_order()
+    test_batched_paths_render()
+    print("Path batching OK")
@@ -0,0 +1,62 @@
+import fitz
+from converter import PDFDarkThemeConverter
+from preview import preview_pages, render_preview
+from sample_pdf import create_pdf_bytes
+
+
+def test_preview_pages():
+    assert preview_pages(10, 3) == [0, 1, 2]
+    assert preview_pages(2, 3) == [0, 1]
+    assert preview_pages(10, 3, sample=True) == [0, 4, 9]
+    assert preview_pages(100, 5, sample=True) == [0, 25, 50, 74, 99]
+    assert preview_pages(10, 1, sample=True) == [0]
+
+
+def test_render_preview():
+    converter = PDFDarkThemeConverter()
+    page_count, thumbnails = render_preview(converter, create_pdf_bytes(8), count=2, width=120)
+    assert page_count == 8
+    assert [t[0] for t in thumbnails] == [1, 2]
+    # Only the previewed pages were converted
+    assert converter.last_stats["pages"] == 2
+    number, width, height, image = thumbnails[0]
+    pix = fitz.Pixmap(image)
+    assert (pix.width, pix.height) == (width, height) and width == 120
+    # Dark background
+    assert pix.pixel(2, 2)[0] < 64
+
+    _, thumbnails = render_preview(converter, create_pdf_bytes(8), count=3, sample=True, image_format="jpeg")
+    assert [t[0] for t in thumbnails] == [1, 5, 8]
+    assert thumbnails[0][3].startswith(b"\xff\xd8")
+
+
+def test_preview_endpoint_cache():
+    from fastapi.testclient import TestClient
+    import app
+
+    data = create_pdf_bytes(5)
+    with TestClient(app.app) as client:
+        first = client.post("/preview?pages=2&width=100", files={"file": ("p.pdf", data, "application/pdf")})
+        assert first.status_code == 200
+        body = first.json()
+        assert body["pages"] == 5
+        assert [t["page"] for t in body["thumbnails"]] == [1, 2]
+        assert body["thumbnails"][0]["image"].startswith("data:image/png;base64,")
+
+        again = client.post("/preview?pages=2&width=100", files={"file": ("other.pdf", data, "application/pdf")})
+        assert again.headers["X-Preview-Cache"] == "hit"
+        assert again.json() == body
+        # Another size is another entry
+        other = client.post("/preview?pages=2&width=120", files={"file": ("p.pdf", data, "application/pdf")})
+        assert other.json()["thumbnails"][0]["width"] == 120
+
+        assert client.post("/preview?pages=50", files={"file": ("p.pdf", data, "application/pdf")}).status_code == 400
+        assert client.post("/preview?format=gif", files={"file": ("p.pdf", data, "application/pdf")}).status_code == 400
+        assert client.post("/preview", files={"file": ("p.pdf", b"not a pdf", "application/pdf")}).status_code == 400
+
+
+if __name__ == "__main__":
+    test_preview_pages()
+    test_render_preview()
+    test_preview_endpoint_cache()
+    print("Preview OK")
@@ -0,0 +1,119 @@
+import json
+import os
+import pstats
+import tempfile
+import fitz
+from converter import PDFDarkThemeConverter
+from profiling import ProfileStore, document_structure, profile_conversion
+from sample_pdf import create_pdf_bytes
+
+SECRET = "Quarterly figures nobody may see"
+
+
+def secret_pdf(pages):
+    return create_pdf_bytes(pages, SECRET, draw=lambda page: page.draw_rect(
+        fitz.Rect(72, 100, 300, 200), color=(0, 0, 0), fill=(1, 0, 0)))
+
+
+def test_profile_bundle():
+    data = secret_pdf(3)
+    converter = PDFDarkThemeConverter()
+    output, bundle, raw = profile_conversion(converter, data, trigger="test")
+    assert fitz.open(stream=output, filetype="pdf").page_count == 3
+    # The hook is gone again
+    assert converter.hooks == []
+
+    assert bundle["trigger"] == "test"
+    assert bundle["options"]["workers"] == 1
+    assert bundle["document"]["pages"] == 3
+    assert bundle["document"]["fonts"] == 1
+    assert bundle["stats"]["counts"]["spans"] == 3
+    assert bundle["stats"]["counts"]["paths"] == 3
+    assert len(bundle["slowest_pages"]) == 3
+    assert "paths" in bundle["slowest_pages"][0]["stages"]
+    assert any("convert_bytes" in row["function"] for row in bundle["functions_cumulative"])
+    assert bundle["functions_own_time"]
+    assert bundle["memory"]["peak_traced_bytes"] > 0
+    assert bundle["memory"]["top_allocations"]
+    # Measurements and structure only - no document content
+    assert SECRET not in json.dumps(bundle)
+    assert raw
+
+
+def test_document_structure():
+    structure = document_structure(secret_pdf(2))
+    assert structure["pages"] == 2
+    assert structure["page_sizes"] == {"595x842": 2}
+    assert structure["images"] == 0 and structure["annotations"] == 0
+    assert len(structure["sha256"]) == 64
+
+
+def test_profile_store():
+    data = secret_pdf(1)
+    with tempfile.TemporaryDirectory() as tmp:
+        store = ProfileStore(tmp, max_profiles=2)
+        ids = []
+        for n in range(3):
+            _, bundle, raw = profile_conversion(PDFDarkThemeConverter(), data, trigger=str(n))
+            ids.append(store.save(bundle, raw))
+        # Oldest dropped
+        assert [p["id"] for p in store.list()] == ids[:0:-1]
+        assert store.get(ids[0]) is None and store.pstats_path(ids[0]) is None
+        assert store.get(ids[2])["trigger"] == "2"
+        stats = pstats.Stats(store.pstats_path(ids[2]))
+        assert stats.total_calls > 0
+        # Ids are checked before they get near a path
+        assert store.get("../" + ids[2]) is None
+        assert store.pstats_path("..") is None
+        assert len(os.listdir(tmp)) == 4
+
+
+def test_profile_endpoints():
+    from fastapi.testclient import TestClient
+    import app
+
+    data = secret_pdf(2)
+    files = {"file": ("p.pdf", data, "application/pdf")}
+    old_token, old_store = app.ADMIN_TOKEN, app.profiles
+    with tempfile.TemporaryDirectory() as tmp, TestClient(app.app) as client:
+        app.profiles = ProfileStore(tmp)
+        try:
+            # No token configured: no admin endpoints
+            app.ADMIN_TOKEN = None
+            assert client.get("/admin/profiles").status_code == 404
+            assert client.post("/convert?profile=true", files=files).status_code == 404
+
+            app.ADMIN_TOKEN = "s3cret"
+            assert client.get("/admin/profiles").status_code == 403
+            assert client.get("/admin/profiles", headers={"X-Admin-Token": "wrong"}).status_code == 403
+            assert client.post("/convert", files=files, headers={"X-Profile": "1"}).status_code == 403
+
+            admin = {"X-Admin-Token": "s3cret"}
+            response = client.post("/convert", files=files, headers=dict(admin, **{"X-Profile": "1"}))
+            assert response.status_code == 200
+            assert response.content.startswith(b"%PDF")
+            profile_id = response.headers["X-Profile-Id"]
+
+            listed = client.get("/admin/profiles", headers=admin).json()
+            assert [p["id"] for p in listed] == [profile_id]
+            assert listed[0]["trigger"] == "request" and listed[0]["pages"] == 2
+            bundle = client.get(f"/admin/profiles/{profile_id}", headers=admin).json()
+            assert bundle["document"]["pages"] == 2
+            raw = client.get(f"/admin/profiles/{profile_id}/pstats", headers=admin)
+            assert raw.status_code == 200 and raw.content
+            assert client.get("/admin/profiles/" + "0" * 32, headers=admin).status_code == 404
+
+            # Plain conversions are not profiled
+            plain = client.post("/convert", files=files)
+            assert plain.status_code == 200 and "X-Profile-Id" not in plain.headers
+            assert len(app.profiles.list()) == 1
+        finally:
+            app.ADMIN_TOKEN, app.profiles = old_token, old_store
+
+
+if __name__ == "__main__":
+    test_profile_bundle()
+    test_document_structure()
+    test_profile_store()
+    test_profile_endpoints()
+    print("Profiling OK")
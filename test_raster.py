@@ -0,0 +1,75 @@
+import fitz
+from converter import PDFDarkThemeConverter
+from raster import darken_pixmap, pixmap_array
+
+
+def test_darken_pixmap_in_place():
+    pix = fitz.Pixmap(fitz.csRGB, fitz.IRect(0, 0, 3, 1), False)
+    pixels = pixmap_array(pix)
+    pixels[0, 0] = (255, 255, 255)  # paper
+    pixels[0, 1] = (0, 0, 0)        # ink
+    pixels[0, 2] = (255, 0, 0)      # red stays reddish
+
+    darken_pixmap(pix, (0.1, 0.1, 0.1), (0.96, 0.96, 0.96))
+
+    assert pix.pixel(0, 0) == (26, 26, 26)
+    assert pix.pixel(1, 0) == (245, 245, 245)
+    r, g, b = pix.pixel(2, 0)
+    assert r > g and r > b
+    # The array is a view on the pixmap, not a copy
+    assert tuple(pixels[0, 0]) == (26, 26, 26)
+
+
+def test_auto_mode_rasterizes_image_only_pages():
+    text_doc = fitz.open()
+    text_doc.new_page().insert_text((72, 72), "Scanned text", color=(0, 0, 0))
+    scan_pix = text_doc[0].get_pixmap(dpi=72)
+
+    src = fitz.open()
+    scanned = src.new_page()
+    scanned.insert_image(scanned.rect, pixmap=scan_pix)
+    src.new_page().insert_text((72, 72), "Real text", color=(0, 0, 0))
+
+    converter = PDFDarkThemeConverter()
+    converter.raster_dpi = 50
+    out = fitz.open(stream=converter.convert_bytes(src.tobytes(), mode="auto"), filetype="pdf")
+
+    # Image page: one new image, original size, dark paper
+    assert out[0].rect == src[0].rect
+    assert len(out[0].get_images()) == 1
+    assert out[0].get_pixmap(dpi=20).pixel(2, 2) == (26, 26, 26)
+    # Text page went through the overlay engine
+    assert "Real text" in out[1].get_text()
+
+
+def test_raster_mode_keeps_shared_content_streams():
+    text_doc = fitz.open()
+    text_doc.new_page().insert_text((72, 72), "Scanned text", color=(0, 0, 0), fontsize=40)
+    scan_pix = text_doc[0].get_pixmap(dpi=72)
+
+    # Deduplicated scan: every page draws the same content stream
+    src = fitz.open()
+    first = src.new_page()
+    first.insert_image(first.rect, pixmap=scan_pix)
+    contents = "%d 0 R" % first.get_contents()[0]
+    resources = src.xref_get_key(first.xref, "Resources")[1]
+    for _ in range(2):
+        page = src.new_page()
+        src.xref_set_key(page.xref, "Contents", contents)
+        src.xref_set_key(page.xref, "Resources", resources)
+
+    converter = PDFDarkThemeConverter()
+    converter.raster_dpi = 50
+    out = fitz.open(stream=converter.convert_bytes(src.tobytes(), mode="raster"), filetype="pdf")
+
+    renders = [page.get_pixmap(dpi=20).samples for page in out]
+    assert renders[1] == renders[0] and renders[2] == renders[0]
+    # Not a blank background page
+    assert len(set(renders[0])) > 1
+
+
+if __name__ == "__main__":
+    test_darken_pixmap_in_place()
+    test_auto_mode_rasterizes_image_only_pages()
+    test_raster_mode_keeps_shared_content_streams()
+    print("Raster mode OK")
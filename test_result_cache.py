@@ -0,0 +1,119 @@
+import os
+import shutil
+import tempfile
+from concurrent.futures import ProcessPoolExecutor
+from result_cache import ResultCache
+
+
+def make_cache(**caps):
+    return ResultCache(tempfile.mkdtemp(prefix="result_cache_"), **caps)
+
+
+def test_hit_and_miss():
+    cache = make_cache()
+    key = ResultCache.key(b"%PDF-input", {"mode": "overlay"})
+    assert key != ResultCache.key(b"%PDF-input", {"mode": "raster"})
+    assert cache.get(key) is None
+    cache.put(key, b"%PDF-output")
+    path = cache.get(key)
+    with open(path, "rb") as f:
+        assert f.read() == b"%PDF-output"
+    stats = cache.stats()
+    assert (stats["hits"], stats["misses"], stats["stores"]) == (1, 1, 1)
+    shutil.rmtree(cache.directory)
+
+
+def test_lru_eviction_by_bytes():
+    cache = make_cache(max_bytes=300)
+    for name in ("a", "b", "c"):
+        cache.put(name, b"x" * 100)
+    cache.get("a")                 # "b" is now the least recently used
+    cache.put("d", b"x" * 100)
+    assert cache.get("b") is None
+    assert cache.get("a") and cache.get("c") and cache.get("d")
+    assert not os.path.exists(cache.path("b"))
+    assert cache.stats()["evictions"] == 1
+    shutil.rmtree(cache.directory)
+
+
+def _writer(directory, worker):
+    cache = ResultCache(directory, max_bytes=5000, max_entries=8)
+    for i in range(25):
+        cache.put(f"w{worker}-{i}", os.urandom(100 + (i * 37) % 400))
+        cache.get(f"w{worker}-{i // 2}")
+
+
+def test_caps_hold_under_concurrent_writers():
+    cache = make_cache(max_bytes=5000, max_entries=8)
+    with ProcessPoolExecutor(max_workers=4) as pool:
+        for future in [pool.submit(_writer, cache.directory, w) for w in range(4)]:
+            future.result()
+
+    stats = cache.stats()
+    assert stats["stores"] == 100
+    assert stats["entries"] <= 8
+    assert stats["bytes"] <= 5000
+    assert stats["stores"] - stats["evictions"] == stats["entries"]
+    # Index and files agree
+    files = [f for f in os.listdir(cache.directory) if f.endswith(".pdf")]
+    assert len(files) == stats["entries"]
+    assert sum(os.path.getsize(os.path.join(cache.directory, f)) for f in files) == stats["bytes"]
+    shutil.rmtree(cache.directory)
+
+
+def test_convert_endpoint_serves_repeat_uploads_from_cache():
+    import fitz
+    from fastapi.testclient import TestClient
+    import app
+
+    doc = fitz.open()
+    doc.new_page().insert_text((72, 72), f"Cached upload {os.getpid()}")
+    data = doc.tobytes()
+    doc.close()
+
+    client = TestClient(app.app)
+    before = app.result_cache.stats()
+    first = client.post("/convert", files={"file": ("syllabus.pdf", data, "application/pdf")})
+    second = client.post("/convert", files={"file": ("syllabus.pdf", data, "application/pdf")})
+    after = client.get("/cache/stats").json()
+
+    assert first.status_code == second.status_code == 200
+    assert first.content == second.content
+    assert after["hits"] == before["hits"] + 1
+    assert 'filename="dark_syllabus.pdf"' in second.headers["content-disposition"]
+
+
+def test_entry_evicted_after_lookup_is_converted_again():
+    import fitz
+    from fastapi.testclient import TestClient
+    import app
+
+    doc = fitz.open()
+    doc.new_page().insert_text((72, 72), f"Evicted upload {os.getpid()}")
+    data = doc.tobytes()
+    doc.close()
+
+    # The lookup hits, but the file is gone by the time it is read
+    get = app.result_cache.get
+    app.result_cache.get = lambda key: os.path.join(app.result_cache.directory, "evicted.pdf")
+    try:
+        with TestClient(app.app) as client:
+            response = client.post("/convert", files={"file": ("notes.pdf", data, "application/pdf")})
+            job = client.post("/jobs", files={"file": ("notes.pdf", data, "application/pdf")})
+            with client.stream("GET", f"/jobs/{job.json()['id']}/events") as stream:
+                for _line in stream.iter_lines():
+                    pass
+            result = client.get(f"/jobs/{job.json()['id']}/result")
+    finally:
+        app.result_cache.get = get
+    assert response.status_code == result.status_code == 200
+    assert response.content.startswith(b"%PDF") and result.content.startswith(b"%PDF")
+
+
+if __name__ == "__main__":
+    test_hit_and_miss()
+    test_lru_eviction_by_bytes()
+    test_caps_hold_under_concurrent_writers()
+    test_convert_endpoint_serves_repeat_uploads_from_cache()
+    test_entry_evicted_after_lookup_is_converted_again()
+    print("Result cache OK")
@@ -0,0 +1,119 @@
+import fitz
+from content_rewriter import ContentStreamError, rewrite_stream
+from converter import PDFDarkThemeConverter
+
+
+def _swap(rgb, stroke):
+    if all(c < 0.1 for c in rgb):
+        return (1.0, 1.0, 1.0)
+    if all(c > 0.9 for c in rgb):
+        return (0.0, 0.0, 0.0)
+    return rgb
+
+
+def test_only_color_operators_change():
+    data = b"q 1 1 1 rg 0 0 50 50 re f Q BT /F1 12 Tf (black \\) text) Tj ET 0 0 1 RG 0 0 0 1 K"
+    out = rewrite_stream(data, _swap)
+    assert out == b"q 0 g 0 0 50 50 re f Q BT /F1 12 Tf (black \\) text) Tj ET 0 0 1 RG 1 G"
+
+
+def test_sc_in_unknown_space_is_left_alone():
+    data = b"/CS0 cs 0 0 0 sc /DeviceRGB cs 0 0 0 sc"
+    assert rewrite_stream(data, _swap, lambda name: None) == b"/CS0 cs 0 0 0 sc /DeviceRGB cs 1 g 1 g"
+
+
+def test_color_space_change_maps_its_initial_black():
+    # cs/CS alone resets the color to black: that black is mapped too
+    data = b"/DeviceRGB cs 0 0 100 100 re f /DeviceCMYK CS 0 0 m 9 9 l S"
+    out = rewrite_stream(data, _swap)
+    assert out == b"/DeviceRGB cs 1 g 0 0 100 100 re f /DeviceCMYK CS 1 G 0 0 m 9 9 l S"
+
+
+def test_inline_images_are_skipped():
+    data = b"BI /W 1 /H 1 /BPC 8 /CS /G ID \x00(\xffEI EI 0 g"
+    assert rewrite_stream(data, _swap).endswith(b"EI 1 g")
+
+
+def test_garbage_raises():
+    for data in (b"(unterminated", b"1 0 0 bogus"):
+        try:
+            rewrite_stream(data, _swap)
+        except ContentStreamError:
+            continue
+        raise AssertionError(f"{data!r} should not parse")
+
+
+def _render_center(page):
+    pix = page.get_pixmap(dpi=36)
+    return pix.pixel(2, 2)
+
+
+def test_rewrite_mode_keeps_fonts_and_geometry():
+    src = fitz.open()
+    src.new_page()
+    src.new_page()
+    page = src[0]
+    page.draw_rect(page.rect, fill=(1, 1, 1), color=None)
+    page.insert_text((72, 72), "Original font", fontname="tiro", color=(0, 0, 0))
+    # A Form XObject, shared by both pages
+    inner = fitz.open()
+    inner.new_page().insert_text((50, 50), "Inside a form", color=(0, 0, 0))
+    for target in src:
+        target.show_pdf_page(fitz.Rect(0, 400, 300, 700), inner, 0)
+
+    converter = PDFDarkThemeConverter()
+    out = fitz.open(stream=converter.convert_bytes(src.tobytes(), mode="rewrite"), filetype="pdf")
+
+    assert out[0].rect == src[0].rect
+    assert [f[3] for f in out[0].get_fonts()] == [f[3] for f in src[0].get_fonts()]
+    assert "Original font" in out[0].get_text()
+    assert _render_center(out[0]) == (25, 25, 25)
+    for page in out:
+        text = page.get_textpage().extractDICT()
+        colors = {span["color"] for b in text["blocks"] for l in b["lines"] for span in l["spans"]}
+        assert colors == {0xF5F5F5}
+
+
+def test_rewrite_mode_keeps_shared_content_streams():
+    src = fitz.open()
+    for _ in range(3):
+        page = src.new_page()
+        page.draw_rect(fitz.Rect(100, 100, 200, 150), color=(0, 0, 0), fill=(0.2, 0.4, 0.8))
+        page.insert_text((72, 800), "Footer", color=(0, 0, 0))
+    # garbage=4 merges the identical page contents into one shared stream
+    deduplicated = fitz.open(stream=src.tobytes(garbage=4), filetype="pdf")
+    assert len({tuple(page.get_contents()) for page in deduplicated}) == 1
+
+    converter = PDFDarkThemeConverter()
+    out = fitz.open(stream=converter.convert_bytes(deduplicated.tobytes(), mode="rewrite"), filetype="pdf")
+    for page in out:
+        # Rewritten in place (no overlay margin), rectangle and footer kept
+        assert page.rect == src[0].rect
+        r, g, b = page.get_pixmap(dpi=72).pixel(150, 125)[:3]
+        assert b > 150 and r < 100
+        assert "Footer" in page.get_text()
+
+
+def test_unparsable_page_falls_back_to_overlay():
+    src = fitz.open()
+    page = src.new_page()
+    page.insert_text((72, 72), "Still converted", color=(0, 0, 0))
+    src.update_stream(page.get_contents()[0], page.read_contents() + b"\n(broken")
+
+    converter = PDFDarkThemeConverter()
+    out = fitz.open(stream=converter.convert_bytes(src.tobytes(), mode="rewrite"), filetype="pdf")
+    # The overlay engine widens the page by its safety margin
+    assert out[0].rect.width > src[0].rect.width
+    assert "Still converted" in out[0].get_text()
+
+
+if __name__ == "__main__":
+    test_only_color_operators_change()
+    test_sc_in_unknown_space_is_left_alone()
+    test_color_space_change_maps_its_initial_black()
+    test_inline_images_are_skipped()
+    test_garbage_raises()
+    test_rewrite_mode_keeps_fonts_and_geometry()
+    test_rewrite_mode_keeps_shared_content_streams()
+    test_unparsable_page_falls_back_to_overlay()
+    print("Rewrite engine OK")
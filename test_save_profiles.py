@@ -0,0 +1,41 @@
+import fitz
+from converter import PDFDarkThemeConverter, SAVE_PROFILES
+from sample_pdf import create_pdf_bytes
+
+
+def test_every_profile_writes_the_same_document():
+    converter = PDFDarkThemeConverter()
+    data = create_pdf_bytes(3)
+    for profile in list(SAVE_PROFILES) + ["auto"]:
+        output = converter.convert_bytes(data, profile=profile)
+        doc = fitz.open(stream=output, filetype="pdf")
+        assert len(doc) == 3, profile
+        assert "Test page 2" in doc[1].get_text(), profile
+        doc.close()
+
+
+def test_auto_uses_smallest_then_fast_for_large_documents():
+    converter = PDFDarkThemeConverter()
+    # The policy derived from bench_save.py - never "balanced"
+    assert (converter.auto_fast_pages, converter.auto_fast_bytes) == (100, 20 * 1024 * 1024)
+    assert converter.select_save_profile(3, 10_000) == "smallest"
+    assert converter.select_save_profile(converter.auto_fast_pages - 1, 10_000) == "smallest"
+    assert converter.select_save_profile(converter.auto_fast_pages, 10_000) == "fast"
+    assert converter.select_save_profile(3, converter.auto_fast_bytes) == "fast"
+
+
+def test_unknown_profile_is_rejected():
+    converter = PDFDarkThemeConverter()
+    try:
+        converter.convert_bytes(create_pdf_bytes(3), profile="tiny")
+    except ValueError:
+        pass
+    else:
+        raise AssertionError("unknown profile accepted")
+
+
+if __name__ == "__main__":
+    test_every_profile_writes_the_same_document()
+    test_auto_uses_smallest_then_fast_for_large_documents()
+    test_unknown_profile_is_rejected()
+    print("Save profiles OK")
@@ -0,0 +1,38 @@
+import fitz
+from text_emitter import TextEmitter
+
+
+def test_adjacent_spans_are_merged():
+    doc = fitz.open()
+    page = doc.new_page()
+    emitter = TextEmitter(page.rect)
+    white = (1.0, 1.0, 1.0)
+    emitter.add("Hello ", (50, 100), 11, "helv", white, (50, 90, 80, 102))
+    emitter.add("World", (80, 100), 11, "helv", white, (80, 90, 110, 102))   # touching -> merged
+    emitter.add("Bold", (110, 100), 11, "hebo", white, (110, 90, 135, 102))  # other font -> new run
+    emitter.add("Next line", (50, 120), 11, "helv", white, (50, 110, 100, 122))
+    emitter.write(page)
+
+    assert emitter.spans_in == 4
+    assert emitter.runs_out == 3
+    assert "Hello World" in page.get_text()
+    doc.close()
+
+
+def test_one_content_append_per_page():
+    doc = fitz.open()
+    page = doc.new_page()
+    streams_before = len(page.get_contents())
+    emitter = TextEmitter(page.rect)
+    for i in range(200):
+        emitter.add(f"span {i}", (50, 20 + i * 4), 4, "helv", (1.0, 1.0, 1.0), (50, 16 + i * 4, 70, 21 + i * 4))
+    emitter.write(page)
+
+    assert len(page.get_contents()) == streams_before + 1
+    doc.close()
+
+
+if __name__ == "__main__":
+    test_adjacent_spans_are_merged()
+    test_one_content_append_per_page()
+    print("TextEmitter OK")
@@ -0,0 +1,56 @@
+import fitz
+from text_extract import extract_spans
+
+
+def create_page():
+    doc = fitz.open()
+    page = doc.new_page()
+    page.insert_text((72, 72), "Inside the page", fontsize=12)
+    page.insert_text((500, 200), "Past the right edge " + "-" * 40, fontsize=12, fontname="cour")
+    page.insert_text((72, page.rect.height + 40), "Below the bottom", fontsize=12)
+    page.insert_text((72, 300), "   ", fontsize=30)
+    pix = fitz.Pixmap(fitz.csRGB, fitz.IRect(0, 0, 50, 50), False)
+    pix.set_rect(pix.irect, (200, 30, 30))
+    page.insert_image(fitz.Rect(100, 400, 200, 500), pixmap=pix)
+    return doc, page
+
+
+def test_extract_spans():
+    doc, page = create_page()
+    spans, x1, y1 = extract_spans(page)
+    texts = [span[0] for span in spans]
+    # Out-of-bounds text is found, blank spans are left out
+    assert texts[0] == "Inside the page"
+    assert any(text.startswith("Past the right edge") for text in texts)
+    assert "Below the bottom" in texts
+    assert len(spans) == 3
+    assert x1 > page.rect.width and y1 > page.rect.height
+
+    text, origin, size, font, color, bbox = spans[0]
+    assert origin == (72.0, 72.0) and size == 12.0
+    assert font == "Helvetica" and color == 0
+    assert bbox[0] == 72.0
+    # Same spans as the full dict, minus its image block
+    full = page.get_text("dict", clip=fitz.Rect(-1000, -1000, 5000, 5000))
+    assert any(block["type"] == 1 for block in full["blocks"])
+    legacy = [span for block in full["blocks"] if block["type"] == 0
+              for line in block["lines"] for span in line["spans"] if span["text"].strip()]
+    assert [(s["text"], s["bbox"]) for s in legacy] == [(s[0], s[5]) for s in spans]
+    doc.close()
+
+
+def test_blank_spans_count_for_bounds():
+    doc = fitz.open()
+    page = doc.new_page()
+    page.insert_text((72, 900), "     ", fontsize=12)
+    spans, x1, y1 = extract_spans(page)
+    assert spans == [] and y1 > page.rect.height
+    # No text at all
+    assert extract_spans(doc.new_page()) == ([], 0, 0)
+    doc.close()
+
+
+if __name__ == "__main__":
+    test_extract_spans()
+    test_blank_spans_count_for_bounds()
+    print("Text extraction OK")
@@ -0,0 +1,47 @@
+import threading
+import fitz
+from fastapi.testclient import TestClient
+import app
+from sample_pdf import create_pdf_bytes
+
+
+def test_concurrent_uploads_with_the_same_name():
+    # Different documents, all called lecture.pdf, converted at the same time
+    texts = [f"Lecture notes of user {i}" for i in range(4)]
+    results = {}
+
+    with TestClient(app.app) as client:
+        def upload(text):
+            response = client.post("/convert", files={"file": ("lecture.pdf", create_pdf_bytes(label=text), "application/pdf")})
+            results[text] = response
+
+        threads = [threading.Thread(target=upload, args=(text,)) for text in texts]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+    for text in texts:
+        response = results[text]
+        assert response.status_code == 200
+        assert 'filename="dark_lecture.pdf"' in response.headers["content-disposition"]
+        doc = fitz.open(stream=response.content, filetype="pdf")
+        assert text in doc[0].get_text()
+        doc.close()
+
+
+def test_oversized_upload_is_refused():
+    saved = app.MAX_UPLOAD_BYTES
+    app.MAX_UPLOAD_BYTES = 1000
+    try:
+        with TestClient(app.app) as client:
+            response = client.post("/convert", files={"file": ("big.pdf", b"%PDF" + b"0" * 5000, "application/pdf")})
+    finally:
+        app.MAX_UPLOAD_BYTES = saved
+    assert response.status_code == 413
+
+
+if __name__ == "__main__":
+    test_concurrent_uploads_with_the_same_name()
+    test_oversized_upload_is_refused()
+    print("Upload path OK")
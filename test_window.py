@@ -0,0 +1,100 @@
+import io
+import os
+import tempfile
+import fitz
+from converter import ConversionTimeout, PDFDarkThemeConverter
+from hooks import PageLog
+
+
+def create_pdf_bytes(pages):
+    doc = fitz.open()
+    for i in range(pages):
+        page = doc.new_page()
+        page.insert_text((72, 72), f"Window page {i + 1}")
+        page.draw_rect(fitz.Rect(72, 100, 300, 200), color=(0, 0, 0), fill=(0.9, 0.9, 0.9))
+        if i:
+            page.insert_link({"kind": fitz.LINK_GOTO, "from": fitz.Rect(72, 300, 200, 320),
+                              "page": 0, "to": fitz.Point(72, 72)})
+    doc.set_toc([[1, "First", 1], [1, "Last", pages]])
+    doc.set_metadata({"title": "Windowed"})
+    data = doc.tobytes()
+    doc.close()
+    return data
+
+
+def test_windowed_matches_one_go():
+    data = create_pdf_bytes(7)
+    converter = PDFDarkThemeConverter()
+    whole = fitz.open(stream=converter.convert_bytes(data), filetype="pdf")
+    log = PageLog()
+    converter.hooks.append(log)
+    progress = []
+    converter.progress = lambda done, total: progress.append((done, total))
+    windowed = fitz.open(stream=converter.convert_bytes(data, window=3), filetype="pdf")
+
+    assert len(windowed) == len(whole) == 7
+    for a, b in zip(whole, windowed):
+        assert a.rect == b.rect
+        assert a.get_text() == b.get_text()
+        assert len(a.get_links()) == len(b.get_links())
+    # Links and outline point across windows
+    assert windowed[6].get_links()[0]["page"] == 0
+    assert windowed.get_toc() == [[1, "First", 1], [1, "Last", 7]]
+    assert windowed.metadata["title"] == "Windowed"
+    # Hooks and progress see document page numbers
+    assert [page[0] for page in log.pages] == list(range(7))
+    assert progress[-1] == (7, 7) and len(progress) == 7
+    assert converter.last_stats["pages"] == 7
+    assert converter.last_stats["counts"]["spans"] == 7
+    assert "save" in converter.last_stats["stages"]
+
+
+def test_windowed_file_and_stream():
+    data = create_pdf_bytes(5)
+    converter = PDFDarkThemeConverter()
+    converter.window_pages = 2
+    with tempfile.TemporaryDirectory() as tmp:
+        source = os.path.join(tmp, "in.pdf")
+        output = os.path.join(tmp, "out.pdf")
+        with open(source, "wb") as f:
+            f.write(data)
+        converter.convert(source, output, profile="smallest")
+        assert fitz.open(output).page_count == 5
+        # No temp files left behind
+        assert sorted(os.listdir(tmp)) == ["in.pdf", "out.pdf"]
+
+    stream = io.BytesIO()
+    converter.convert_stream(io.BytesIO(data), stream)
+    assert fitz.open(stream=stream.getvalue(), filetype="pdf").page_count == 5
+
+
+def test_window_limits():
+    converter = PDFDarkThemeConverter()
+    # A document that fits into one window is converted in one go
+    assert converter._resolve_window(10, create_pdf_bytes(3), None) is None
+    assert converter._resolve_window(2, create_pdf_bytes(3), None) == 2
+    try:
+        converter.convert_bytes(create_pdf_bytes(3), window=-1)
+        assert False, "negative window accepted"
+    except ValueError:
+        pass
+
+    converter.time_limit = 1e-9
+    with tempfile.TemporaryDirectory() as tmp:
+        source = os.path.join(tmp, "in.pdf")
+        with open(source, "wb") as f:
+            f.write(create_pdf_bytes(4))
+        try:
+            converter.convert(source, os.path.join(tmp, "out.pdf"), window=2)
+            assert False, "time limit ignored"
+        except ConversionTimeout as e:
+            assert "of 4" in str(e)
+        # No half-written output
+        assert os.listdir(tmp) == ["in.pdf"]
+
+
+if __name__ == "__main__":
+    test_windowed_matches_one_go()
+    test_windowed_file_and_stream()
+    test_window_limits()
+    print("Windowed conversion OK")
@@ -0,0 +1,121 @@
+import asyncio
+import os
+import time
+import fitz
+from converter import ConversionTimeout, PageLimitExceeded, PDFDarkThemeConverter
+from worker_pool import ConversionPool, PoolFull, WorkerCrashed
+
+
+def create_pdf_bytes(pages):
+    doc = fitz.open()
+    for i in range(pages):
+        page = doc.new_page()
+        for line in range(40):
+            page.insert_text((72, 60 + line * 18), f"Page {i + 1} line {line}: some text to convert")
+    data = doc.tobytes()
+    doc.close()
+    return data
+
+
+def test_event_loop_stays_responsive():
+    pool = ConversionPool(workers=1)
+
+    async def scenario():
+        job = asyncio.ensure_future(pool.convert(create_pdf_bytes(40)))
+        longest_gap = 0.0
+        last = time.monotonic()
+        while not job.done():
+            await asyncio.sleep(0.01)
+            now = time.monotonic()
+            longest_gap = max(longest_gap, now - last)
+            last = now
+        output, stats = job.result()
+        return output, stats, longest_gap
+
+    output, stats, longest_gap = asyncio.run(scenario())
+    pool.shutdown()
+    assert output.startswith(b"%PDF")
+    assert stats["pages"] == 40
+    assert longest_gap < 0.5
+
+
+def test_full_queue_is_rejected():
+    pool = ConversionPool(workers=1, queue_size=1)
+    data = create_pdf_bytes(20)
+    first = pool.submit(data)
+    second = pool.submit(data)
+    try:
+        pool.submit(data)
+    except PoolFull as e:
+        assert e.retry_after >= 1
+    else:
+        raise AssertionError("third job admitted")
+    first.result()
+    second.result()
+    assert pool.pending == 0
+    pool.submit(data).result()   # admitted again once the queue drained
+    pool.shutdown()
+
+
+def test_page_limit():
+    pool = ConversionPool({"max_pages": 2})
+    try:
+        pool.submit(create_pdf_bytes(3)).result()
+    except PageLimitExceeded:
+        pass
+    else:
+        raise AssertionError("page limit not enforced")
+    assert pool.pending == 0
+    pool.shutdown()
+
+
+def test_pool_recovers_from_a_dead_worker():
+    pool = ConversionPool(workers=1)
+    # The worker process dies mid-job, as on a segfault or an OOM kill
+    crashed = pool._submit("convert", os._exit, 1)
+    try:
+        asyncio.run(pool.wait(crashed))
+    except WorkerCrashed:
+        pass
+    else:
+        raise AssertionError("dead worker not reported")
+    output, stats = pool.submit(create_pdf_bytes(1)).result()
+    assert output.startswith(b"%PDF")
+    assert pool.pending == 0
+    pool.shutdown()
+
+
+def test_time_limit_stops_between_pages():
+    converter = PDFDarkThemeConverter()
+    converter.time_limit = 1e-6
+    try:
+        converter.convert_bytes(create_pdf_bytes(5))
+    except ConversionTimeout:
+        pass
+    else:
+        raise AssertionError("time limit not enforced")
+
+
+def test_convert_endpoint_sends_retry_after_when_full():
+    from fastapi.testclient import TestClient
+    import app
+
+    client = TestClient(app.app)
+    saved = app.pool.pending
+    app.pool.pending = app.pool.workers + app.pool.queue_size
+    try:
+        response = client.post("/convert", files={"file": ("full.pdf", create_pdf_bytes(1), "application/pdf")})
+    finally:
+        app.pool.pending = saved
+    assert response.status_code == 503
+    assert int(response.headers["retry-after"]) >= 1
+
+
+if __name__ == "__main__":
+    test_event_loop_stays_responsive()
+    test_full_queue_is_rejected()
+    test_page_limit()
+    test_pool_recovers_from_a_dead_worker()
+    test_time_limit_stops_between_pages()
+    test_convert_endpoint_sends_retry_after_when_full()
+    print("Worker pool OK")
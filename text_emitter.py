@@ -0,0 +1,78 @@
+import fitz  # PyMuPDF
+
+# fitz.Font objects are expensive to build (they load the font program),
+# so they are shared by every page converted in this process.
+_FONTS = {}
+
+
+def get_font(font_name: str) -> fitz.Font:
+    """
+    Return a cached fitz.Font for font_name.
+    Names MuPDF does not know as a builtin font fall back to Helvetica.
+    """
+    font = _FONTS.get(font_name)
+    if font is None:
+        try:
+            font = fitz.Font(font_name)
+        except Exception:
+            font = get_font("helv")
+        _FONTS[font_name] = font
+    return font
+
+
+class TextEmitter:
+    """
+    Collects the text spans of one page and writes them in a single pass.
+
+    Spans are appended to one fitz.TextWriter per color, so a page costs
+    one content-stream append per color instead of one insert_text call
+    per span. Adjacent spans on the same baseline that share font, size
+    and color are merged into a single run before they are appended.
+    """
+
+    def __init__(self, page_rect):
+        self.page_rect = page_rect
+        self.writers = {}      # color -> fitz.TextWriter
+        self.pending = None    # [text, origin, size, font_name, color, x1]
+        self.spans_in = 0
+        self.runs_out = 0
+        self.errors = 0        # runs dropped because TextWriter refused them
+
+    def add(self, text, origin, size, font_name, color, bbox):
+        """Queue a span. bbox is only used to decide if spans are adjacent."""
+        self.spans_in += 1
+        pending = self.pending
+        if pending is not None and \
+           pending[3] == font_name and pending[2] == size and pending[4] == color and \
+           abs(pending[1][1] - origin[1]) < 0.01 and \
+           abs(bbox[0] - pending[5]) <= size * 0.15:
+            # Same line, touching, same style - extend the current run
+            pending[0] += text
+            pending[5] = bbox[2]
+            return
+
+        self._flush_pending()
+        self.pending = [text, origin, size, font_name, color, bbox[2]]
+
+    def _flush_pending(self):
+        if self.pending is None:
+            return
+        text, origin, size, font_name, color, _ = self.pending
+        self.pending = None
+
+        writer = self.writers.get(color)
+        if writer is None:
+            writer = self.writers[color] = fitz.TextWriter(self.page_rect)
+        try:
+            writer.append(origin, text, font=get_font(font_name), fontsize=size)
+            self.runs_out += 1
+        except Exception:
+            # Unencodable text or a broken size - skip the run, keep the page
+            self.errors += 1
+
+    def write(self, page):
+        """Emit everything collected so far onto page (on top of its content)."""
+        self._flush_pending()
+        for color, writer in self.writers.items():
+            writer.write_text(page, color=color, overlay=True)
+        self.writers = {}
@@ -0,0 +1,39 @@
+import fitz  # PyMuPDF
+
+# The text the overlay engine redraws, and nothing else. The default
+# flags of get_text("dict") add image blocks (with their pixel data,
+# which Step 5 never looks at) and clip to the MediaBox; these keep
+# ligatures, whitespace and unknown-unicode handling as they were.
+TEXT_FLAGS = (fitz.TEXT_PRESERVE_LIGATURES | fitz.TEXT_PRESERVE_WHITESPACE
+              | fitz.TEXT_CID_FOR_UNKNOWN_UNICODE)
+
+# Everything the page draws up to PDF's largest page size (14,400 units
+# per side) - farther out it is junk, not content. Without a clip MuPDF
+# would stop at the MediaBox and miss out-of-bounds text.
+MAX_EXTENT = 14400
+CLIP = fitz.Rect(-MAX_EXTENT, -MAX_EXTENT, MAX_EXTENT, MAX_EXTENT)
+
+
+def extract_spans(page, flags=TEXT_FLAGS):
+    """
+    The text spans of page in a single pass. Returns (spans, x1, y1):
+    spans is a list of (text, origin, size, font, color, bbox) tuples,
+    blank spans left out; x1/y1 are the right and bottom edges of all
+    spans, blank ones included (they take up room too), or 0 for a page
+    without text.
+    """
+    spans = []
+    x1 = y1 = 0
+    for block in page.get_text("dict", flags=flags, clip=CLIP)["blocks"]:
+        # Only text blocks without TEXT_PRESERVE_IMAGES, but be sure
+        for line in block.get("lines", ()):
+            for span in line["spans"]:
+                bbox = span["bbox"]
+                if bbox[2] > x1:
+                    x1 = bbox[2]
+                if bbox[3] > y1:
+                    y1 = bbox[3]
+                text = span["text"]
+                if text and not text.isspace():
+                    spans.append((text, span["origin"], span["size"], span["font"], span["color"], bbox))
+    return spans, x1, y1
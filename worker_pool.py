@@ -0,0 +1,334 @@
+import asyncio
+import functools
+import math
+import os
+import signal
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+import fitz  # PyMuPDF
+from converter import ConversionTimeout, PDFDarkThemeConverter
+from page_cache import PageCache
+from jobs import JobStore, run_job
+from preview import render_preview
+from profiling import ProfileStore, profile_conversion
+from metrics import REQUEST_BUCKETS, MetricsHook, Registry
+
+# Conversions run in worker processes, so a large PDF never blocks the
+# event loop of the web worker (and its /health endpoint).
+
+
+class PoolFull(Exception):
+    """All workers are busy and the queue is full. retry_after is in seconds."""
+
+    def __init__(self, retry_after):
+        super().__init__(f"Conversion queue is full, retry in {retry_after} s")
+        self.retry_after = retry_after
+
+
+class WorkerCrashed(Exception):
+    """The worker process died (crash, out of memory) while running the job."""
+
+
+def make_converter(config):
+    """
+    Build a converter from a plain config dict (picklable, so every worker
+    process can build its own instance). Keys, all optional: palette,
+    mode, save_profile, max_pages, time_limit, window_pages,
+    page_cache_dir, page_cache_bytes.
+    """
+    converter = PDFDarkThemeConverter(config.get("palette", "dark"))
+    converter.mode = config.get("mode", converter.mode)
+    converter.save_profile = config.get("save_profile", converter.save_profile)
+    converter.max_pages = config.get("max_pages")
+    converter.time_limit = config.get("time_limit")
+    converter.window_pages = config.get("window_pages")
+    if config.get("page_cache_dir"):
+        converter.page_cache = PageCache(config["page_cache_dir"],
+                                         max_bytes=config.get("page_cache_bytes", 200 * 1024 * 1024))
+    return converter
+
+
+# --- Worker process side ---
+
+_worker_converter = None
+# Converter metrics of this worker since its last job, sent back with
+# every job's stats and merged into the web worker's registry
+_worker_metrics = None
+
+
+def _init_worker(config):
+    global _worker_converter, _worker_metrics
+    # Ctrl+C / gunicorn shutdown is handled by the parent
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    _worker_converter = make_converter(config)
+    _worker_metrics = Registry()
+    _worker_converter.hooks.append(MetricsHook(_worker_metrics))
+
+
+def _job_stats(stats, start):
+    """stats plus the job's duration and the metrics it produced."""
+    stats["job_seconds"] = time.monotonic() - start
+    stats["metrics"] = _worker_metrics.snapshot(reset=True)
+    return stats
+
+
+def _run_job(data, options):
+    """Convert data in the worker. Returns (PDF bytes, stats)."""
+    start = time.monotonic()
+    output = _worker_converter.convert_bytes(data, **options)
+    return output, _job_stats(dict(_worker_converter.last_stats), start)
+
+
+def _run_stored_job(store_dir, job_id, data, options):
+    """Run job job_id of the JobStore in store_dir. Returns (None, stats)."""
+    start = time.monotonic()
+    stats = dict(run_job(JobStore(store_dir), job_id, _worker_converter, data, options))
+    return None, _job_stats(stats, start)
+
+
+def _run_page(source_path, pno, dpi, options, converted=None):
+    """
+    Convert page pno of the PDF at source_path (or take the already
+    converted one-page PDF in converted) and render it as PNG if dpi is
+    given. Returns ((PDF bytes, PNG bytes or None), stats).
+    """
+    start = time.monotonic()
+    stats = {}
+    if converted is None:
+        converted = _worker_converter.convert_page(source_path, pno, **options)
+        stats = dict(_worker_converter.last_stats)
+    png = None
+    if dpi:
+        doc = fitz.open(stream=converted, filetype="pdf")
+        png = doc[0].get_pixmap(dpi=dpi, alpha=False).tobytes("png")
+        doc.close()
+    return (converted, png), _job_stats(stats, start)
+
+
+def _run_preview(data, options):
+    """Thumbnails of data (see preview.render_preview). Returns ((page count, thumbnails), stats)."""
+    start = time.monotonic()
+    result = render_preview(_worker_converter, data, **options)
+    return result, _job_stats(dict(_worker_converter.last_stats), start)
+
+
+def _run_profiled(store_dir, max_profiles, data, options, trigger):
+    """
+    Convert data under the profiler (see profiling.profile_conversion) and
+    keep the bundle in a ProfileStore(store_dir, max_profiles). Returns ((PDF bytes,
+    profile id), stats).
+    """
+    start = time.monotonic()
+    output, bundle, pstats_data = profile_conversion(_worker_converter, data, options, trigger=trigger)
+    profile_id = ProfileStore(store_dir, max_profiles).save(bundle, pstats_data)
+    return (output, profile_id), _job_stats(dict(_worker_converter.last_stats), start)
+
+
+# --- Web worker side ---
+
+class ConversionPool:
+    """
+    A bounded process pool for conversions with admission control.
+
+    At most workers jobs run at once and at most queue_size more wait;
+    submit() raises PoolFull beyond that, with a Retry-After estimate
+    based on recent job durations. Every worker process has its own
+    converter built from config (see make_converter), whose max_pages and
+    time_limit stop runaway documents. A job that does not come back
+    within time_limit + grace seconds (stuck inside a single page) gets
+    the pool's processes killed and the pool re-created.
+
+    Job counts and durations, and the converter metrics the workers send
+    back with their results, are recorded in metrics (a metrics.Registry).
+    """
+
+    def __init__(self, config=None, workers=1, queue_size=4, grace=30, metrics=None):
+        self.config = dict(config or {})
+        self.workers = workers
+        self.queue_size = queue_size
+        self.grace = grace
+        self.pending = 0            # running + queued jobs
+        self.job_seconds = None     # moving average of job durations
+        self._lock = threading.Lock()
+        self._executor = None
+        self._settings = None
+        self.metrics = metrics if metrics is not None else Registry()
+        self._jobs = self.metrics.counter(
+            "nightowl_pool_jobs_total", "Pool jobs by kind and outcome", ("kind", "outcome"))
+        self._job_time = self.metrics.histogram(
+            "nightowl_pool_job_seconds", "Seconds a pool job ran", ("kind",), buckets=REQUEST_BUCKETS)
+        self._rejected = self.metrics.counter(
+            "nightowl_pool_rejected_total", "Jobs refused because the queue was full")
+        self._rejected.inc(0)
+
+    def settings(self):
+        """Converter settings of the workers (for result cache keys)."""
+        if self._settings is None:
+            self._settings = make_converter(self.config).settings()
+        return self._settings
+
+    def _pool(self):
+        with self._lock:
+            if self._executor is None:
+                self._executor = ProcessPoolExecutor(
+                    max_workers=self.workers,
+                    initializer=_init_worker,
+                    initargs=(self.config,)
+                )
+            return self._executor
+
+    def _discard(self, executor):
+        """Drop executor if it is still the pool's (it broke); the next submit starts a new one."""
+        with self._lock:
+            if self._executor is not executor:
+                return
+            self._executor = None
+        executor.shutdown(wait=False, cancel_futures=True)
+
+    def retry_after(self):
+        """Seconds until a slot is likely free."""
+        per_job = self.job_seconds or 5.0
+        return max(1, math.ceil(per_job * (self.pending - self.workers + 1) / self.workers))
+
+    def _admit(self):
+        with self._lock:
+            if self.pending >= self.workers + self.queue_size:
+                self._rejected.inc()
+                raise PoolFull(self.retry_after())
+            self.pending += 1
+
+    def _release(self, seconds):
+        with self._lock:
+            self.pending -= 1
+            if seconds is not None:
+                if self.job_seconds is None:
+                    self.job_seconds = seconds
+                else:
+                    self.job_seconds = 0.8 * self.job_seconds + 0.2 * seconds
+
+    def submit(self, data, **options):
+        """
+        Queue a conversion and return a concurrent.futures.Future of
+        (PDF bytes, stats). options go to convert_bytes (mode, profile).
+        Raises PoolFull when the queue is full.
+        """
+        return self._submit("convert", _run_job, bytes(data), options)
+
+    def submit_job(self, store, job_id, data, **options):
+        """
+        Like submit(), for a job of a jobs.JobStore: progress, result and
+        errors go to the store. The future's result is (None, stats).
+        """
+        return self._submit("job", _run_stored_job, store.directory, job_id, bytes(data), options)
+
+    def submit_page(self, source_path, pno, dpi=None, converted=None, **options):
+        """
+        Convert a single page (0-based pno) of a stored PDF, or only render
+        converted (a one-page PDF) when given. The future's result is
+        ((PDF bytes, PNG bytes or None), stats).
+        """
+        return self._submit("page", _run_page, source_path, pno, dpi, options, converted)
+
+    def submit_preview(self, data, **options):
+        """
+        Render dark-mode thumbnails of a few pages of data; options go to
+        preview.render_preview (count, sample, width, image_format). The
+        future's result is ((page count, thumbnails), stats).
+        """
+        return self._submit("preview", _run_preview, bytes(data), options)
+
+    def submit_profiled(self, store, data, trigger=None, **options):
+        """
+        Like submit(), with the conversion profiled and the bundle saved in
+        store (a profiling.ProfileStore). Always single-process. The
+        future's result is ((PDF bytes, profile id), stats).
+        """
+        return self._submit("profile", _run_profiled, store.directory, store.max_profiles, bytes(data), options, trigger)
+
+    def _submit(self, kind, fn, *args):
+        self._admit()
+        try:
+            executor = self._pool()
+            try:
+                future = executor.submit(fn, *args)
+            except BrokenProcessPool:
+                # A worker died in an earlier job: start a new pool, once
+                self._discard(executor)
+                executor = self._pool()
+                future = executor.submit(fn, *args)
+        except Exception:
+            self._release(None)
+            raise
+        future.add_done_callback(functools.partial(self._job_done, kind, executor))
+        return future
+
+    def _job_done(self, kind, executor, future):
+        seconds = None
+        if future.cancelled():
+            outcome = "cancelled"
+        elif future.exception() is not None:
+            outcome = "failed"
+            if isinstance(future.exception(), BrokenProcessPool):
+                self._discard(executor)
+        else:
+            outcome = "ok"
+            stats = future.result()[1]
+            seconds = stats["job_seconds"]
+            self._job_time.observe(seconds, kind=kind)
+            self.metrics.merge(stats.get("metrics", {}))
+        self._jobs.inc(kind=kind, outcome=outcome)
+        self._release(seconds)
+
+    async def convert(self, data, **options):
+        """
+        Convert data in the pool without blocking the event loop.
+        Returns (PDF bytes, stats). Raises PoolFull, the converter's
+        ConversionError subclasses, or ConversionTimeout if a job hangs.
+        """
+        return await self.wait(self.submit(data, **options))
+
+    async def wait(self, future):
+        """
+        Await a future returned by submit()/submit_job(). Kills the pool
+        and raises ConversionTimeout if the job runs past time_limit + grace.
+        Raises WorkerCrashed if the worker process died; the next job gets
+        a new pool.
+        """
+        waiter = asyncio.wrap_future(future)
+        limit = self.config.get("time_limit")
+        started = None
+        while True:
+            done, _ = await asyncio.wait({waiter}, timeout=1.0)
+            if done:
+                try:
+                    return waiter.result()
+                except BrokenProcessPool:
+                    raise WorkerCrashed("Worker process died while converting this document") from None
+            if not limit:
+                continue
+            # Time in the queue does not count against the job
+            if started is None and future.running():
+                started = time.monotonic()
+            if started is not None and time.monotonic() - started > limit + self.grace:
+                self.recycle()
+                raise ConversionTimeout(f"Conversion did not finish within {limit + self.grace} seconds")
+
+    def recycle(self):
+        """Kill the worker processes (e.g. a stuck job) and start over on the next submit."""
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is None:
+            return
+        for process in list(getattr(executor, "_processes", {}).values()):
+            try:
+                os.kill(process.pid, signal.SIGKILL)
+            except (ProcessLookupError, AttributeError):
+                pass
+        executor.shutdown(wait=False, cancel_futures=True)
+
+    def shutdown(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=True, cancel_futures=True)
+            self._executor = None